@@ -0,0 +1,14 @@
+# simple test of olog tool
+# requires files/log.warning
+# log.warning has a WARNING line inside its thermo output
+
+o = olog("files/log.warning")
+
+print("# of vectors =",o.nvec)
+print("length of vectors =",o.nlen)
+print("names of vectors =",o.names)
+
+time,temp = o.get("Step","Temperature")
+print(time,temp)
+
+print("all done ... type CTRL-D to exit Pizza.py")
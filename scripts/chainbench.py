@@ -0,0 +1,42 @@
+#!/usr/bin/python
+
+# Script:  chainbench.py
+# Purpose: time chain.build() in blocks vs the legacy one-monomer-at-a-time build
+# Syntax:  chainbench.py nchain nper [legacy]
+#          nchain = # of chains to build
+#          nper = # of monomers in each chain
+#          legacy = # of chains to time legacy build on (def = nchain)
+#                   time is scaled up to nchain chains
+# Example: chainbench.py 10000 100 1000
+# Author:  Pizza.py developers
+
+# enable script to run from Python directly w/out Pizza.py
+
+import sys, time
+from chain import chain
+if "argv" not in globals(): argv = sys.argv
+
+# main script
+
+if len(argv) != 3 and len(argv) != 4:
+  raise Exception("Syntax: chainbench.py nchain nper [legacy]")
+
+nchain = int(argv[1])
+nper = int(argv[2])
+nlegacy = nchain
+if len(argv) == 4: nlegacy = min(int(argv[3]),nchain)
+
+def build(n,legacy):
+  c = chain(n*nper,0.85)
+  c.legacy = legacy
+  start = time.perf_counter()
+  c.build(n,nper)
+  return time.perf_counter() - start
+
+tblock = build(nchain,0)
+tlegacy = build(nlegacy,1) * nchain/nlegacy
+
+print("%d chains of %d monomers" % (nchain,nper))
+print("block build  %10.3f secs" % tblock)
+print("legacy build %10.3f secs" % tlegacy)
+print("speed-up     %10.1f" % (tlegacy/tblock))
@@ -0,0 +1,50 @@
+#!/usr/bin/python
+
+# Script:  startup.py
+# Purpose: time start-up of Pizza.py in batch mode, lazy vs eager tool loads
+# Syntax:  startup.py N tool1 tool2 ...
+#          N = # of times to launch Pizza.py for each case
+#          tools = tools a batch script would use (optional)
+# Example: startup.py 10 dump vec
+# Author:  Pizza.py developers
+
+# enable script to run from Python directly w/out Pizza.py
+
+import sys, os, subprocess, time
+if "argv" not in globals(): argv = sys.argv
+
+# main script
+
+if len(argv) < 2:
+  raise Exception("Syntax: startup.py N tool1 tool2 ...")
+
+n = int(argv[1])
+use = argv[2:]
+
+# pizza.py is __file__ when run via Pizza.py, else in ../src
+
+pizza = os.path.abspath(__file__)
+if os.path.basename(pizza) != "pizza.py":
+  pizza = os.path.join(os.path.dirname(pizza),"..","src","pizza.py")
+
+# each case is the -c command Pizza.py runs before quitting
+# lazy = only the given tools are imported
+# eager = every tool is imported, as Pizza.py did before lazy loading
+
+touch = "for t in %s: exec('try: globals()[t].load()\\nexcept Exception: pass')"
+cases = [("start-up only",None),
+         ("lazy, use %s" % ' '.join(use),touch % repr(use)),
+         ("eager, all tools",touch.replace("%s","tools"))]
+if not use: del cases[1]
+
+for label,cmd in cases:
+  args = [sys.executable,pizza,"-s","-q"]
+  if cmd: args += ["-c",cmd]
+  times = []
+  for i in range(n):
+    start = time.perf_counter()
+    subprocess.run(args,stdout=subprocess.DEVNULL,stderr=subprocess.DEVNULL)
+    times.append(time.perf_counter() - start)
+  times.sort()
+  print("%-30s min %.3f median %.3f max %.3f secs" % \
+        (label,times[0],times[len(times)//2],times[-1]))
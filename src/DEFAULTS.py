@@ -9,8 +9,8 @@
 # --------------
 # --------------
 
-# 3 variables used by Pizza.py
-# to use TOOLS or SCRIPTS, edit and uncomment the line
+# 4 variables used by Pizza.py
+# to use TOOLS, SCRIPTS or HELPCACHE, edit and uncomment the line
 # to use EXCLUDE, add to the existing list
 
 # TOOLS = list of extra directories that contain Pizza.py tools
@@ -22,10 +22,13 @@
 # EXCLUDE = Python files to NOT load as tools when Pizza.py starts
 #   typically done for auxiliary Python files that are not tools
 #   any non-tool Python files from your TOOLS dirs should be added to list
+# HELPCACHE = file where help strings of all tools are cached between runs
+#   tools themselves are only imported the first time they are used
 
 #PIZZA_TOOLS = ["~/mystuff/new_pizza_tools"]
 #PIZZA_SCRIPTS = ["~/mystuff/new_pizza_scripts"]
-PIZZA_EXCLUDE = ["pizza", "DEFAULTS", "vizinfo"]
+PIZZA_EXCLUDE = ["pizza", "DEFAULTS", "vizinfo", "vizarray", "dumpread"]
+#PIZZA_HELPCACHE = "~/.pizza/tools.json"
 
 # --------------
 # --------------
@@ -52,6 +55,13 @@ PIZZA_EXCLUDE = ["pizza", "DEFAULTS", "vizinfo"]
 
 # --------------
 
+# THUMBCACHE = directory where image thumbnails are cached between sessions
+# tools that use it: image
+
+#PIZZA_THUMBCACHE = "~/.pizza/thumbnails"
+
+# --------------
+
 # GNUPLOT = the GnuPlot plotting package
 # GNUTERM = terminal setting used by GnuPlot
 # tools that use it: gnu
@@ -63,7 +73,7 @@ PIZZA_EXCLUDE = ["pizza", "DEFAULTS", "vizinfo"]
 # --------------
 
 # GUNZIP = program to uncompress gzipped files
-# tools that use it: data dump log
+# tools that use it: data log
 
 #PIZZA_GUNZIP = "gunzip"
 
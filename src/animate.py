@@ -13,6 +13,11 @@ oneline = "Animate a series of image files"
 docstr = """
 a = animate("image*.png")     create GUI to animate set of image files
 a = animate("image*.png",1)   2nd arg = sort filenames, 0 = no sort, def = 1
+a = animate("image*.png",1,200)  3rd arg = max # of frames held in memory
+
+  frames are read from files when first displayed, not all up front
+  a background thread reads ahead of the current frame in play direction
+  least recently displayed frames are dropped when max is exceeded, def = 64
 
 Actions (same as GUI widgets):
 
@@ -30,6 +35,7 @@ a.delay(0.4)                  set delay slider
 
 # History
 #   8/05, Matt Jones (BYU): original version
+#   10/26: frames loaded on demand into bounded cache with read-ahead
 
 # ToDo list
 #   make image window non-resizable while displaying an image
@@ -38,19 +44,31 @@ a.delay(0.4)                  set delay slider
 # Variables
 #   tkroot = root of entire Tk
 #   files = list of file names
-#   images = list of Tkimage objects
+#   loader = frameloader that reads and caches images in background
+#   photo = Tkimage object of displayed frame
 #   nframes = number of images
 #   index = current frame (0 to N-1)
 #   loop_flag = set to 1 or -1 when play or back pushed
 #               set to 0 when stop is pushed
 #   delay_value = delay between frames (secs)
 #   delay_msec = delay in millisec
+#   direction = 1 or -1 = direction of last frame change, for read-ahead
+#   pending = Tk callback ID of slider update not yet displayed, or None
+#   win1,win2 = control and image windows
+#   closed = 1 once either window is closed and loader is stopped
 
 # Imports and external programs
 
-import sys, os, subprocess, re, glob
+import sys, os, subprocess, re, glob, threading
+from collections import OrderedDict
 from tkinter import *
-from ImageTk import PhotoImage
+try: from PIL import Image
+except ImportError: import Image
+try: from PIL.ImageTk import PhotoImage
+except ImportError: from ImageTk import PhotoImage
+
+NCACHE = 64           # default max # of decoded frames held in memory
+NAHEAD = 8            # # of frames read ahead of current one
 
 # Class definition
 
@@ -58,10 +76,13 @@ class animate:
 
     # --------------------------------------------------------------------
 
-    def __init__(self,filestr,sortflag=1):
+    def __init__(self,filestr,sortflag=1,ncache=NCACHE):
         self.loop_flag = 0
         self.delay_value = 0.0
         self.delay_msec = 0
+        self.direction = 1
+        self.pending = None
+        self.closed = 0
 
         # convert filestr into full list of files
 
@@ -72,11 +93,9 @@ class animate:
         if self.nframes == 0: raise Exception("No files to load")
         if sortflag: self.files.sort()
 
-        # load all images
+        # start background loader, images are read when needed
 
-        self.images = []
-        for i in range(self.nframes):
-            self.images.append(PhotoImage(file=self.files[i]))
+        self.loader = frameloader(self.files,ncache,NAHEAD)
 
         # grab Tk instance from main
 
@@ -87,6 +106,7 @@ class animate:
 
         win1 = Toplevel(tkroot)
         win1.title("Pizza.py animate tool")
+        self.win1 = win1
 
         holder1 = Frame(win1)
         button1 = Button(holder1,text="<<",command=self.first).pack(side=LEFT)
@@ -117,10 +137,17 @@ class animate:
         # image window
 
         win2 = Toplevel(tkroot)
-        self.image_pane = Label(win2,image=self.images[0])
+        self.win2 = win2
+        self.photo = PhotoImage(image=self.loader.get(0))
+        self.image_pane = Label(win2,image=self.photo)
         self.image_pane.pack(side=BOTTOM)
         tkroot.update_idletasks()              # force window to appear
 
+        # closing either window closes the other and stops the loader
+
+        win1.bind("<Destroy>",self.close)
+        win2.bind("<Destroy>",self.close)
+
         # display 1st image
 
         self.index = 0
@@ -142,12 +169,14 @@ class animate:
 
     def previous(self):
         if self.index > 0: self.index -= 1
+        self.direction = -1
         self.display(self.index)
 
     # --------------------------------------------------------------------
 
     def __next__(self):
         if self.index < self.nframes - 1: self.index += 1
+        self.direction = 1
         self.display(self.index)
 
     # --------------------------------------------------------------------
@@ -155,6 +184,7 @@ class animate:
     def back(self):
         if self.loop_flag != 0: return
         self.loop_flag = -1
+        self.direction = -1
         if self.index == 0:
             self.index = self.nframes - 1
             self.display(self.index)
@@ -165,6 +195,7 @@ class animate:
     def play(self):
         if self.loop_flag != 0: return
         self.loop_flag = 1
+        self.direction = 1
         if self.index == self.nframes - 1:
             self.index = 0
             self.display(self.index)
@@ -192,17 +223,29 @@ class animate:
 
     # --------------------------------------------------------------------
     # display a frame corresponding to iframe
+    # then have loader read ahead of it in current direction
 
     def display(self,iframe):
-        self.image_pane.configure(image=self.images[iframe])
+        self.photo = PhotoImage(image=self.loader.get(iframe))
+        self.image_pane.configure(image=self.photo)
         self.slider_frame.set(iframe)
         textstr = "Frame: %d    File: %s" % (iframe,self.files[iframe])
         self.label_frame.configure(text=textstr)
+        self.loader.seek(iframe,self.direction)
 
     # --------------------------------------------------------------------
+    # slider callbacks can arrive faster than frames are read
+    # only display the latest value once Tk is idle
 
     def frame(self,value):
+        if int(value) < self.index: self.direction = -1
+        elif int(value) > self.index: self.direction = 1
         self.index = int(value)
+        if self.pending is None:
+            self.pending = self.tkroot.after_idle(self.scrub)
+
+    def scrub(self):
+        self.pending = None
         self.display(self.index)
 
     # --------------------------------------------------------------------
@@ -211,3 +254,127 @@ class animate:
         self.delay_value = float(value)
         self.slider_delay.set(self.delay_value)
         self.delay_msec = int(1000*self.delay_value)
+
+    # --------------------------------------------------------------------
+    # Destroy event of a window or one of its widgets
+    # when a window goes, stop animation and loader thread, close other window
+
+    def close(self,event):
+        if event.widget is not self.win1 and event.widget is not self.win2:
+            return
+        if self.closed: return
+        self.closed = 1
+        self.loop_flag = 0
+        if self.pending is not None:
+            self.tkroot.after_cancel(self.pending)
+            self.pending = None
+        self.loader.stop()
+        for win in (self.win1,self.win2):
+            if win is not event.widget: win.destroy()
+
+# --------------------------------------------------------------------
+# frameloader class
+# images are decoded from files on demand and held in an LRU cache
+# background thread decodes up to nahead frames past start in direction
+# cache holds at most ncache images, least recently used are dropped
+
+class frameloader:
+
+    def __init__(self,files,ncache,nahead):
+        self.files = files
+        self.ncache = max(ncache,1)
+        self.nahead = min(nahead,self.ncache-1)
+        self.start = 0
+        self.direction = 1
+        self.images = OrderedDict()
+        self.inflight = -1
+        self.done = 0
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    # --------------------------------------------------------------------
+    # list of frame indices to read ahead of start
+
+    def window(self):
+        indices = []
+        for i in range(1,self.nahead+1):
+            index = self.start + i*self.direction
+            if index < 0 or index >= len(self.files): break
+            indices.append(index)
+        return indices
+
+    # --------------------------------------------------------------------
+    # move read-ahead window to follow frame index
+
+    def seek(self,index,direction):
+        with self.cond:
+            self.start = index
+            self.direction = direction
+            self.cond.notify_all()
+
+    # --------------------------------------------------------------------
+    # return decoded image for frame index
+    # wait if background thread is decoding it, else decode it here
+
+    def get(self,index):
+        with self.cond:
+            while self.inflight == index: self.cond.wait()
+            if index in self.images:
+                self.images.move_to_end(index)
+                return self.images[index]
+        image = decode(self.files[index])
+        with self.cond: self.insert(index,image)
+        return image
+
+    # --------------------------------------------------------------------
+    # add image to cache as most recently used, drop oldest beyond ncache
+    # caller must hold cond
+
+    def insert(self,index,image):
+        self.images[index] = image
+        self.images.move_to_end(index)
+        while len(self.images) > self.ncache: self.images.popitem(last=False)
+
+    # --------------------------------------------------------------------
+
+    def stop(self):
+        with self.cond:
+            self.done = 1
+            self.images.clear()
+            self.cond.notify_all()
+
+    # --------------------------------------------------------------------
+    # thread loop: decode 1st frame in window not already cached
+
+    def run(self):
+        while 1:
+            with self.cond:
+                index = -1
+                while not self.done:
+                    for i in self.window():
+                        if i not in self.images:
+                            index = i
+                            break
+                    if index >= 0: break
+                    self.cond.wait()
+                if self.done: return
+                self.inflight = index
+
+            try: image = decode(self.files[index])
+            except Exception: image = None
+
+            with self.cond:
+                self.inflight = -1
+                if image is not None and not self.done: self.insert(index,image)
+                self.cond.notify_all()
+                if image is None: self.cond.wait()
+
+# --------------------------------------------------------------------
+# read image file and decode its pixels
+
+def decode(file):
+    image = Image.open(file)
+    image.load()
+    return image
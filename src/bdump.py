@@ -17,6 +17,9 @@ b = bdump("dump.*")               wildcard expands to multiple files
 b = bdump("dump.*",0)             two args = store filenames, but don't read
 
   incomplete and duplicate snapshots are deleted
+  atoms of a snapshot are read from its file when first used,
+    so files should not be changed while b exists (except gzipped ones)
+    a non-number in a row after the 1st is only found then, error names snapshot
   no column name assignment is performed
 
 time = b.next()                   read next snapshot from dump files
@@ -32,6 +35,7 @@ b.map(1,"id",3,"x")               assign names to atom columns (1-N)
   must assign id,type,atom1,atom2
 
 time,box,atoms,bonds,tris,lines = b.viz(index)   return list of viz objects
+time,box,atoms,bonds,tris,lines = b.viz_arrays(index)   return 2d arrays
 
   viz() returns line info for specified timestep index
     can also call as viz(time,1) and will find index of preceding snapshot
@@ -41,10 +45,12 @@ time,box,atoms,bonds,tris,lines = b.viz(index)   return list of viz objects
     bonds = id,type,atom1,atom2 for each line as 2d array
     tris = NULL
     lines = NULL
+  viz_arrays() returns same info as 2d NumPy arrays, no rows for NULL
 """
 
 # History
 #   11/10, Steve Plimpton (SNL): original version
+#   10/26, snapshots read via dumpread, atoms parsed in bulk on 1st use
 
 # Variables
 #   flist = list of dump file names
@@ -63,7 +69,6 @@ time,box,atoms,bonds,tris,lines = b.viz(index)   return list of viz objects
 # Imports and external programs
 
 import sys, subprocess, re, glob, types
-from os import popen
 
 try:
     import numpy as np
@@ -72,8 +77,7 @@ except:
     import Numeric as np
     oldnumeric = True
 
-try: from DEFAULTS import PIZZA_GUNZIP
-except: PIZZA_GUNZIP = "gunzip"
+import vizarray, dumpread
 
 # Class definition
 
@@ -107,27 +111,18 @@ class bdump:
     def read_all(self):
 
         # read all snapshots from each file
-        # test for gzipped files
+        # atoms of each snapshot are read on 1st use
 
         for file in self.flist:
-            if file[-3:] == ".gz":
-                f = popen("%s -c %s" % (PIZZA_GUNZIP,file),'r')
-            else: f = open(file)
-
-            snap = self.read_snapshot(f)
-            while snap:
+            for snap in dumpread.snapshots(file,Snap,self.read_header,1):
                 self.snaps.append(snap)
                 print(snap.time, end=' ')
                 sys.stdout.flush()
-                snap = self.read_snapshot(f)
-
-            f.close()
         print()
 
         # sort entries by timestep, cull duplicates
 
-        self.snaps.sort(self.compare_time)
-        self.cull()
+        dumpread.sort_cull(self.snaps)
         self.nsnaps = len(self.snaps)
         print("read %d snapshots" % self.nsnaps)
 
@@ -143,9 +138,9 @@ class bdump:
         # if new snapshot time stamp already exists, read next snapshot
 
         while 1:
-            f = open(self.flist[self.nextfile],'rb')
+            f = dumpread.open_file(self.flist[self.nextfile])
             f.seek(self.eof)
-            snap = self.read_snapshot(f)
+            snap = dumpread.read_snapshot(f,Snap(),self.read_header)
             if not snap:
                 self.nextfile += 1
                 if self.nextfile == len(self.flist): return -1
@@ -166,44 +161,19 @@ class bdump:
         return snap.time
 
     # --------------------------------------------------------------------
-    # read a single snapshot from file f
-    # return snapshot or 0 if failed
-    # assign column names if not already done and file is self-describing
-    # convert xs,xu to x
-
-    def read_snapshot(self,f):
-        try:
-            snap = Snap()
-            item = f.readline()
-            snap.time = int(f.readline().split()[0])    # just grab 1st field
-            item = f.readline()
-            snap.natoms = int(f.readline())
-            item = f.readline()
-
-            f.readline()    # read past BOX BOUNDS
-            f.readline()
-            f.readline()
-            f.readline()
-
-            if snap.natoms:
-                words = f.readline().split()
-                ncol = len(words)
-                for i in range(1,snap.natoms):
-                    words += f.readline().split()
-                floats = list(map(float,words))
-                if oldnumeric: atoms = np.zeros((snap.natoms,ncol),np.Float)
-                else: atoms = np.zeros((snap.natoms,ncol),np.float)
-                start = 0
-                stop = ncol
-                for i in range(snap.natoms):
-                    atoms[i] = floats[start:stop]
-                    start = stop
-                    stop += ncol
-            else: atoms = None
-            snap.atoms = atoms
-            return snap
-        except:
-            return 0
+    # read header of a snapshot from file f, after its timestep
+    # return name of snap attribute for the atoms and # of atoms
+
+    def read_header(self,f,snap):
+        item = dumpread.readline(f)
+        snap.natoms = int(dumpread.readline(f))
+        item = dumpread.readline(f)
+
+        dumpread.readline(f)    # read past BOX BOUNDS
+        dumpread.readline(f)
+        dumpread.readline(f)
+        dumpread.readline(f)
+        return "atoms",snap.natoms
 
     # --------------------------------------------------------------------
     # map atom column names
@@ -227,26 +197,9 @@ class bdump:
         return vec
 
     # --------------------------------------------------------------------
-    # sort snapshots on time stamp
 
-    def compare_time(self,a,b):
-        if a.time < b.time:
-            return -1
-        elif a.time > b.time:
-            return 1
-        else:
-            return 0
-
-    # --------------------------------------------------------------------
-    # delete successive snapshots with duplicate time stamp
-
-    def cull(self):
-        i = 1
-        while i < len(self.snaps):
-            if self.snaps[i].time == self.snaps[i-1].time:
-                del self.snaps[i]
-            else:
-                i += 1
+    def findtime(self,n):
+        return dumpread.findtime(self,n)
 
     # --------------------------------------------------------------------
     # return list of bonds to viz for snapshot isnap
@@ -281,8 +234,38 @@ class bdump:
 
         return time,None,None,bonds,None,None
 
+    # --------------------------------------------------------------------
+    # return 2d array of bonds to viz for snapshot isnap
+    # if called with flag, then index is timestep, so convert to snapshot index
+
+    def viz_arrays(self,index,flag=0):
+        if not flag: isnap = index
+        else:
+            times = self.time()
+            n = len(times)
+            i = 0
+            while i < n:
+                if times[i] > index: break
+                i += 1
+            isnap = i - 1
+        snap = self.snaps[isnap]
+
+        time = snap.time
+        cols = [self.names["id"],self.names["type"],
+                self.names["atom1"],self.names["atom2"]]
+
+        # abs() of type since could be negative
+
+        if snap.natoms: bonds = np.trunc(snap.atoms[:,cols])
+        else: bonds = np.zeros((0,4))
+        bonds[:,1] = np.fabs(bonds[:,1])
+
+        return time,None,np.zeros((0,vizarray.NATOM)),bonds, \
+            np.zeros((0,vizarray.NTRI)),np.zeros((0,vizarray.NLINE))
+
 # --------------------------------------------------------------------
 # one snapshot
 
 class Snap:
-    pass
+    def __getattr__(self,name):
+        return dumpread.load(self,name)
@@ -0,0 +1,199 @@
+# Pizza.py toolkit, www.cs.sandia.gov/~sjplimp/pizza.html
+# Steve Plimpton, sjplimp@sandia.gov, Sandia National Laboratories
+#
+# Copyright (2005) Sandia Corporation.  Under the terms of Contract
+# DE-AC04-94AL85000 with Sandia Corporation, the U.S. Government retains
+# certain rights in this software.  This software is distributed under
+# the GNU General Public License.
+
+# blocks tool
+
+oneline = "Block averages and correlation times of thermo time series"
+
+docstr = """
+b = blocks(l)                       time series of all vectors in l but 1st
+b = blocks(l,"Temp","Press",...)    only listed vectors
+
+  l = log, olog, vec or any object with names and get()
+  1st vector is skipped by default since it is the time step
+  get allows abbreviated (uniquely) vector names
+
+b.skip(N)                           discard first N samples of all vectors
+
+nvec = b.nvec                       # of vectors
+nlen = b.nlen                       # of samples in each vector
+names = b.names                     list of vector names
+
+aves = b.average(M)                 averages of M equal blocks, one list per block
+ave,dev,err = b.stats(M)            mean, std dev and std error of block averages
+
+  M blocks of nlen/M samples, leftover samples at end are not used
+  each return is one value per vector
+
+sizes,errs = b.sweep()              std error of mean for block sizes 1,2,4,...
+sizes,errs = b.sweep([10,20,50])    for listed block sizes
+
+  errs = one list per block size, one value per vector in each
+  block sizes leaving fewer than 4 blocks are not used
+  errs grow with block size until blocks are uncorrelated, then plateau
+
+tau = b.tau()                       integrated autocorrelation time of each vector
+g = b.inefficiency()                statistical inefficiency = 1 + 2 tau
+t0,g,neff = b.equilibrate()         detect end of equilibration in each vector
+t0,g,neff = b.equilibrate(N)        try N start samples, def = 20
+
+  tau and g are in samples, from FFT autocorrelation, summed to its 1st zero
+  # of uncorrelated samples is nlen/g, std error of mean is dev*sqrt(g/nlen)
+  equilibrate picks start t0 that maximizes neff = (nlen-t0)/g of samples after it
+    t0 is an index into the vectors, g is for samples from t0 on
+"""
+
+# History
+#   10/26: original version
+
+# ToDo list
+
+# Variables
+#   nvec = # of vectors
+#   nlen = # of samples in each vector
+#   names = list of vector names
+#   data[i][j] = 2d array of floats, i = 0 to nlen-1, j = 0 to nvec-1
+
+# Imports and external programs
+
+import numpy as np
+
+# Class definition
+
+class blocks:
+
+    # --------------------------------------------------------------------
+
+    def __init__(self,obj,*keys):
+        if len(keys) == 0: keys = obj.names[1:]
+        if len(keys) == 0: raise Exception("no vectors for blocks")
+
+        vecs = obj.get(*keys)
+        if len(keys) == 1: vecs = [vecs]
+        self.data = np.array(vecs,dtype=np.float64).T.copy()
+        self.names = list(keys)
+        self.nvec = len(self.names)
+        self.nlen = len(self.data)
+
+    # --------------------------------------------------------------------
+
+    def skip(self,n):
+        if n < 0 or n >= self.nlen:
+            raise Exception("cannot skip %d of %d samples" % (n,self.nlen))
+        self.data = self.data[n:]
+        self.nlen = len(self.data)
+
+    # --------------------------------------------------------------------
+
+    def average(self,nblocks):
+        return block_means(self.data,self.block_size(nblocks)).tolist()
+
+    # --------------------------------------------------------------------
+
+    def stats(self,nblocks):
+        means = block_means(self.data,self.block_size(nblocks))
+        ave = means.mean(axis=0)
+        dev = means.std(axis=0,ddof=1) if nblocks > 1 else np.zeros(self.nvec)
+        return ave.tolist(),dev.tolist(),(dev/np.sqrt(nblocks)).tolist()
+
+    # --------------------------------------------------------------------
+    # power-of-2 sizes halve the series by pairwise averages, one per level
+    # listed sizes are each averaged by a reshape of the series
+
+    def sweep(self,sizes=None):
+        errs = []
+        if sizes is None:
+            sizes = []
+            means = self.data
+            size = 1
+            while len(means) >= 4:
+                sizes.append(size)
+                errs.append(std_error(means))
+                n = len(means) // 2
+                means = 0.5*(means[0:2*n:2] + means[1:2*n:2])
+                size *= 2
+        else:
+            sizes = [size for size in sizes if size > 0 and self.nlen // size >= 4]
+            for size in sizes: errs.append(std_error(block_means(self.data,size)))
+        return sizes,[err.tolist() for err in errs]
+
+    # --------------------------------------------------------------------
+
+    def tau(self):
+        return ((inefficiency(self.data) - 1.0) / 2.0).tolist()
+
+    # --------------------------------------------------------------------
+
+    def inefficiency(self):
+        return inefficiency(self.data).tolist()
+
+    # --------------------------------------------------------------------
+    # each start t0 is tried for all vectors at once
+
+    def equilibrate(self,ntry=20):
+        if self.nlen < 4: raise Exception("too few samples to detect equilibration")
+        starts = np.unique(np.linspace(0,self.nlen-4,max(1,ntry)).astype(int))
+        g = np.array([inefficiency(self.data[t0:]) for t0 in starts])
+        neff = (self.nlen - starts)[:,None] / g
+        best = neff.argmax(axis=0)
+        cols = np.arange(self.nvec)
+        return starts[best].tolist(),g[best,cols].tolist(),neff[best,cols].tolist()
+
+    # --------------------------------------------------------------------
+
+    def block_size(self,nblocks):
+        if nblocks < 1 or nblocks > self.nlen:
+            raise Exception("invalid # of blocks %d for %d samples" % \
+                            (nblocks,self.nlen))
+        return self.nlen // nblocks
+
+# --------------------------------------------------------------------
+# averages of consecutive blocks of size rows of data, leftover rows dropped
+
+def block_means(data,size):
+    nblocks = len(data) // size
+    return data[:nblocks*size].reshape(nblocks,size,-1).mean(axis=1)
+
+# --------------------------------------------------------------------
+# std error of mean of each column, treating rows as independent
+
+def std_error(data):
+    return data.std(axis=0,ddof=1) / np.sqrt(len(data))
+
+# --------------------------------------------------------------------
+# normalized autocorrelation function of each column via FFT
+# C(t) = average of dx(i)*dx(i+t) over n-t pairs, divided by variance
+# constant columns have C = 0 for t > 0
+
+def autocorrelation(data):
+    n = len(data)
+    dx = data - data.mean(axis=0)
+    nfft = 1 << (2*n-1).bit_length()
+    f = np.fft.rfft(dx,nfft,axis=0)
+    acf = np.fft.irfft(f*np.conj(f),nfft,axis=0)[:n]
+    acf /= (n - np.arange(n))[:,None]
+    var = acf[0].copy()
+    constant = var <= 0.0
+    var[constant] = 1.0
+    acf /= var
+    acf[1:,constant] = 0.0
+    return acf
+
+# --------------------------------------------------------------------
+# statistical inefficiency g of each column of data
+# g = 1 + 2 * sum of (1-t/n) C(t) for t from 1 up to 1st t with C(t) <= 0
+# g is at least 1
+
+def inefficiency(data):
+    n = len(data)
+    if n < 2: return np.ones(data.shape[1])
+    acf = autocorrelation(data)[1:]
+    positive = np.cumprod(acf > 0.0,axis=0,dtype=bool)
+    weight = (1.0 - np.arange(1,n)/n)[:,None]
+    g = 1.0 + 2.0*(weight*acf*positive).sum(axis=0)
+    return np.maximum(g,1.0)
@@ -56,6 +56,9 @@ c.bins(ID,nx,ny)                   set binning parameters for a surf
   triangulation of a shell is just done for the outer sphere
   for surftri(), one or more tri indices (1-N) must be listed
   for surfselect(), test is string like "$x < 2.0 and $y > 0.0"
+    test is applied to all vertices at once, so and/or/not and chained
+      comparisons are evaluated element-wise
+    selected tris share vertices as in id-surf, unused vertices are dropped
   bins are used when particles are created inside/outside a surf
 
 c.part(ID,n,id_in)                 create N particles inside object id_in
@@ -124,6 +127,7 @@ c.append("file",id1,id2,...)       append only listed & selected objects
 
 index,time,flag = c.iterator(0/1)          loop over single snapshot
 time,box,atoms,bonds,tris,lines = c.viz(index)   return list of viz objects
+time,box,atoms,bonds,tris,lines = c.viz_arrays(index)   return 2d arrays
 
   iterator() and viz() are compatible with equivalent dump calls
   iterator() called with arg = 0 first time, with arg = 1 on subsequent calls
@@ -142,10 +146,14 @@ time,box,atoms,bonds,tris,lines = c.viz(index)   return list of viz objects
     lines = id,type,x1,y1,z1,x2,y2,z2 for each line as 2d array
       NULL if lines do not exist
     types are assigned to each object of same style in ascending order
+  viz_arrays() returns same info as 2d NumPy arrays, no rows for NULL
 """
 
 # History
 #   11/05, Steve Plimpton (SNL): original version
+#   10/26, inside_many() tests of many points at once, used by part()
+#   10/26, surf, group, line coords and indices stored as NumPy arrays
+#   10/26, surfselect() evaluates its test on vertex arrays
 
 # ToDo list
 
@@ -156,10 +164,12 @@ time,box,atoms,bonds,tris,lines = c.viz(index)   return list of viz objects
 
 # Imports and external programs
 
-import sys, glob
+import sys, glob, ast
 from os import popen
 from math import sqrt,pi,cos,sin,fabs
 from copy import deepcopy
+import numpy as np
+import vizarray
 
 try: from DEFAULTS import PIZZA_GUNZIP
 except: PIZZA_GUNZIP = "gunzip"
@@ -224,22 +234,13 @@ class cdata:
                         raise Exception("ID %s is already in use" % id)
 
                     f.readline()
-                    vertices = []
-                    for i in range(nvert):
-                        list = f.readline().split()
-                        vertices.append([float(value) for value in list[1:]])
+                    vertices = read_rows(f,nvert,3,np.float64)
                     f.readline()
-                    triangles = []
-                    for i in range(ntri):
-                        list = f.readline().split()
-                        triangles.append([int(value) for value in list[1:]])
+                    triangles = read_rows(f,ntri,3,np.int64)
 
                     if flag == "triangles":
                         f.readline()
-                        connections = []
-                        for i in range(ntri):
-                            list = f.readline().split()
-                            connections.append([int(value) for value in list[1:]])
+                        connections = read_rows(f,ntri,6,np.int64)
                     else:
                         connections = connect(nvert,ntri,triangles)
 
@@ -270,10 +271,7 @@ class cdata:
                         raise Exception("ID %s is already in use" % id)
 
                     f.readline()
-                    xyz = []
-                    for i in range(npart):
-                        list = f.readline().split()
-                        xyz.append([float(value) for value in list[1:]])
+                    xyz = read_rows(f,npart,3,np.float64)
 
                     obj = Group()
                     obj.select = 1
@@ -412,7 +410,7 @@ class cdata:
         obj.id = id
         obj.style = LINE
         obj.nline = 0
-        obj.pairs = []
+        obj.pairs = np.zeros((0,6))
 
         obj.addline(args)
 
@@ -429,7 +427,7 @@ class cdata:
         obj.id = id
         obj.style = LINE
         obj.nline = 0
-        obj.pairs = []
+        obj.pairs = np.zeros((0,6))
 
         xlo,ylo,zlo,xhi,yhi,zhi = args
         obj.addline([xlo,ylo,zlo,xhi,ylo,zlo])
@@ -463,9 +461,9 @@ class cdata:
         obj.style = SURFACE
         obj.nvert = region.nvert
         obj.ntri = region.ntri
-        obj.vertices = deepcopy(region.vertices)
-        obj.triangles = deepcopy(region.triangles)
-        obj.connections = deepcopy(region.connections)
+        obj.vertices = np.array(region.vertices,dtype=np.float64).reshape(-1,3)
+        obj.triangles = np.array(region.triangles,dtype=np.int64).reshape(-1,3)
+        obj.connections = np.array(region.connections,dtype=np.int64).reshape(-1,6)
         obj.center()
 
     # --------------------------------------------------------------------
@@ -484,28 +482,10 @@ class cdata:
         self.objs.append(obj)
         obj.id = id
         obj.style = SURFACE
-        obj.nvert = 0
-        obj.ntri = 0
-        obj.vertices = []
-        obj.triangles = []
-
-        # subtract 1 from tri and vert to convert to C indexing from (1-N)
-
-        for i in list:
-            v1 = o.triangles[i-1][0]
-            v2 = o.triangles[i-1][1]
-            v3 = o.triangles[i-1][2]
-            obj.vertices.append(o.vertices[v1-1][:])
-            obj.vertices.append(o.vertices[v2-1][:])
-            obj.vertices.append(o.vertices[v3-1][:])
-            obj.triangles.append([obj.nvert+1,obj.nvert+2,obj.nvert+3])
-            obj.nvert += 3
-            obj.ntri += 1
-
-        # make any connections in new set of triangles
-
-        obj.connections = connect(obj.nvert,obj.ntri,obj.triangles)
-        obj.center()
+
+        # subtract 1 from tri indices to convert to C indexing from (1-N)
+
+        obj.select_tris(o,np.array(list,dtype=np.int64) - 1)
 
     # --------------------------------------------------------------------
     # create a triangulated surface object
@@ -523,50 +503,14 @@ class cdata:
         self.objs.append(obj)
         obj.id = id
         obj.style = SURFACE
-        obj.nvert = 0
-        obj.ntri = 0
-        obj.vertices = []
-        obj.triangles = []
-
-        # replace $var with o.vertices reference and compile test string
-
-        cmd1 = teststr.replace("$x","o.vertices[v1][0]")
-        cmd1 = cmd1.replace("$y","o.vertices[v1][1]")
-        cmd1 = "flag1 = " + cmd1.replace("$z","o.vertices[v1][2]")
-        ccmd1 = compile(cmd1,'','single')
-
-        cmd2 = teststr.replace("$x","o.vertices[v2][0]")
-        cmd2 = cmd2.replace("$y","o.vertices[v2][1]")
-        cmd2 = "flag2 = " + cmd2.replace("$z","o.vertices[v2][2]")
-        ccmd2 = compile(cmd2,'','single')
-
-        cmd3 = teststr.replace("$x","o.vertices[v3][0]")
-        cmd3 = cmd3.replace("$y","o.vertices[v3][1]")
-        cmd3 = "flag3 = " + cmd3.replace("$z","o.vertices[v3][2]")
-        ccmd3 = compile(cmd3,'','single')
-
-        # loop over triangles in id_surf
-        # 3 vertices must satisfy all 3 tests for tri's inclusion in new surf obj
-
-        for tri in o.triangles:
-            v1 = tri[0] - 1
-            v2 = tri[1] - 1
-            v3 = tri[2] - 1
-            exec(ccmd1)
-            exec(ccmd2)
-            exec(ccmd3)
-            if flag1 and flag2 and flag3:
-                obj.vertices.append(o.vertices[v1][:])
-                obj.vertices.append(o.vertices[v2][:])
-                obj.vertices.append(o.vertices[v3][:])
-                obj.triangles.append([obj.nvert+1,obj.nvert+2,obj.nvert+3])
-                obj.nvert += 3
-                obj.ntri += 1
-
-        # make any connections in new set of triangles
-
-        obj.connections = connect(obj.nvert,obj.ntri,obj.triangles)
-        obj.center()
+
+        # evaluate test string once per vertex on columns of o.vertices
+        # 3 vertices must satisfy test for tri's inclusion in new surf obj
+
+        flag = vertex_test(teststr,o.vertices)
+        keep = np.nonzero(flag[o.triangles-1].all(axis=1))[0]
+
+        obj.select_tris(o,keep)
 
     # --------------------------------------------------------------------
     # set binning parameters for a surface
@@ -594,7 +538,6 @@ class cdata:
         obj.style = GROUP
         obj.on_id = ""
         obj.npart = npart
-        obj.xyz = []
 
         in_obj = self.objs[self.ids[in_id]]
         if out_id: out_obj = self.objs[self.ids[out_id]]
@@ -612,21 +555,50 @@ class cdata:
         zsize = zhi-zlo
 
         # generate particles until have enough that satisfy in/out constraints
+        # test blocks of candidate points at once, block size from success rate
+        # reset random # state to just after last accepted point
+        #   so same particles are created as by testing one point at a time
+
+        lo = np.array([xlo,ylo,zlo])
+        size = np.array([xsize,ysize,zsize])
 
         count = attempt = 0
+        blocks = []
         while count < npart:
-            attempt += 1
-            x = xlo + self.random() * xsize
-            y = ylo + self.random() * ysize
-            z = zlo + self.random() * zsize
-            if not in_obj.inside(x,y,z): continue
-            if out_id and out_obj.inside(x,y,z): continue
-            obj.xyz.append([x,y,z])
-            count += 1
-
+            nneed = npart - count
+            if count: nblock = int(nneed * float(attempt)/count) + 1
+            else: nblock = 2*nneed
+            nblock = min(nblock,PARTBLOCK)
+
+            pts,seeds = self.random_points(nblock,lo,size)
+            flag = in_obj.inside_many(pts) != 0
+            if out_id: flag &= out_obj.inside_many(pts) == 0
+            accept = np.nonzero(flag)[0][:nneed]
+
+            if len(accept) == nneed:
+                self.random.seed = seeds[accept[-1]]
+                attempt += accept[-1] + 1
+            else: attempt += nblock
+            blocks.append(pts[accept])
+            count += len(accept)
+
+        obj.xyz = np.concatenate(blocks).reshape(-1,3)
         obj.center()
         print("Created %d particles in %d attempts" % (count,attempt))
 
+    # --------------------------------------------------------------------
+    # return n random points in box with corner lo and size as N x 3 array
+    # also return random # state after each point
+
+    def random_points(self,n,lo,size):
+        values = np.zeros((n,3))
+        seeds = n*[0]
+        random = self.random
+        for i in range(n):
+            values[i] = (random(),random(),random())
+            seeds[i] = random.seed
+        return lo + values*size,seeds
+
     # --------------------------------------------------------------------
     # create a group object with npart 2d particles on surface of on_id object
 
@@ -642,7 +614,6 @@ class cdata:
         obj.style = GROUP
         obj.on_id = on_id
         obj.npart = npart
-        obj.xyz = []
 
         on_obj = self.objs[self.ids[on_id]]
         if on_obj.style != SURFACE and on_obj.style != REGION and \
@@ -650,10 +621,11 @@ class cdata:
             raise Exception("Illegal ID to place particles on")
         totalarea = on_obj.area()
 
+        obj.xyz = np.zeros((npart,3))
         for count in range(npart):
             area = self.random() * totalarea
             pt,norm = on_obj.loc2d(area,self.random)
-            obj.xyz.append(pt)
+            obj.xyz[count] = pt
 
         obj.center()
         print("Created %d particles on area of %g" % (npart,totalarea))
@@ -676,15 +648,13 @@ class cdata:
         obj.style = GROUP
         obj.on_id = ""
         obj.npart = nx * ny * nz
-        obj.xyz = []
 
-        for k in range(nz):
-            znew = z + k*dz
-            for j in range(ny):
-                ynew = y + j*dy
-                for i in range(nx):
-                    xnew = x + i*dx
-                    obj.xyz.append([xnew,ynew,znew])
+        # x varies fastest, then y, then z
+
+        k,j,i = np.meshgrid(np.arange(nz),np.arange(ny),np.arange(nx),
+                            indexing="ij")
+        obj.xyz = np.column_stack((x + i.ravel()*dx,y + j.ravel()*dy,
+                                   z + k.ravel()*dz))
 
         obj.center()
         print("Created %d particles" % (nx*ny*nz))
@@ -706,23 +676,13 @@ class cdata:
         obj.style = GROUP
         obj.on_id = ""
         obj.npart = n
-        obj.xyz = []
 
-        deltheta = 2.0*pi / n
-        for i in range(n):
-            if axis == 'x':
-                xnew = x
-                ynew = y + r * cos(i*deltheta)
-                znew = z + r * sin(i*deltheta)
-            elif axis == 'y':
-                xnew = x + r * cos(i*deltheta)
-                ynew = y
-                znew = z + r * sin(i*deltheta)
-            elif axis == 'z':
-                xnew = x + r * cos(i*deltheta)
-                ynew = y + r * sin(i*deltheta)
-                znew = z
-            obj.xyz.append([xnew,ynew,znew])
+        theta = np.arange(n) * (2.0*pi / n)
+        c = r * np.cos(theta)
+        s = r * np.sin(theta)
+        if axis == 'x': obj.xyz = np.column_stack((np.full(n,float(x)),y + c,z + s))
+        elif axis == 'y': obj.xyz = np.column_stack((x + c,np.full(n,float(y)),z + s))
+        elif axis == 'z': obj.xyz = np.column_stack((x + c,y + s,np.full(n,float(z))))
 
         obj.center()
         print("Created %d particles" % n)
@@ -779,63 +739,57 @@ class cdata:
         # move along dir until get within EPS of surf
         # factor = multiply bracketing distance by this amount each iteration
         # maxscale = max multiple of dir vector to bracket in each direction
+        # all particles are advanced in lockstep as arrays,
+        #   each iteration tests only particles not yet bracketed or converged
 
         factor = 2
         maxscale = 10.0
 
-        for i in range(obj.npart):
-            x,y,z = obj.xyz[i]
-            if flag: dir = [dx-x,dy-y,dz-z]
-            else: dir = [dx,dy,dz]
-            normalize(dir)
-
-            # start = in/out at starting pt
-            # stop = in/out at bracketing pt
-
-            start = obj_on.inside(x,y,z)
-            if start: stop = 0
-            else: stop = 1
-
-            # iterate to find bracketing point or until scale dist > maxdist
-            # bracket pt = xyz +/- scale*dir
-            # multiply scale by factor each iteration
-
-            scale = EPS
-            bracket = start
-            while scale < maxscale:
-                xnew,ynew,znew = x+scale*dir[0], y+scale*dir[1], z+scale*dir[2]
-                bracket = obj_on.inside(xnew,ynew,znew)
-                #print "BBB",xnew,ynew,znew,scale,bracket
-                if bracket == stop: break
-                xnew,ynew,znew = x-scale*dir[0], y-scale*dir[1], z-scale*dir[2]
-                bracket = obj_on.inside(xnew,ynew,znew)
-                #print "CCC",xnew,ynew,znew,scale,bracket
-                if bracket == stop: break
-                scale *= factor
-
-            if bracket == start:
-                raise Exception("Could not find bracket point for particle %d" % i)
-
-            # bisection search to zoom in to within EPS of surface
-            # separation = distance between 2 points
-
-            delx = xnew-x; dely = ynew-y; delz = znew-z
-            separation = sqrt(delx*delx + dely*dely + delz*delz)
-            while separation > EPS:
-                xmid = 0.5 * (x + xnew)
-                ymid = 0.5 * (y + ynew)
-                zmid = 0.5 * (z + znew)
-                value = obj_on.inside(xmid,ymid,zmid)
-                if value == start:
-                    x = xmid; y = ymid; z = zmid
-                else:
-                    xnew = xmid; ynew = ymid; znew = zmid
-                delx = xnew-x; dely = ynew-y; delz = znew-z
-                separation = sqrt(delx*delx + dely*dely + delz*delz)
-
-            obj.xyz[i][0] = x
-            obj.xyz[i][1] = y
-            obj.xyz[i][2] = z
+        xyz = np.array(obj.xyz,dtype=np.float64).reshape(-1,3)
+        if flag: dir = np.array([dx,dy,dz]) - xyz
+        else: dir = np.tile(np.array([dx,dy,dz],dtype=np.float64),(len(xyz),1))
+        length = np.sqrt((dir*dir).sum(axis=1))
+        length[length == 0.0] = 1.0
+        dir /= length[:,None]
+
+        # start = in/out at starting pt
+        # stop = in/out at bracketing pt
+
+        start = obj_on.inside_many(xyz)
+        stop = 1 - start
+
+        # iterate to find bracketing point or until scale dist > maxdist
+        # bracket pt = xyz +/- scale*dir, + side is tested first
+        # multiply scale by factor each iteration
+
+        xyznew = xyz.copy()
+        todo = np.arange(len(xyz))
+        scale = EPS
+        while scale < maxscale and len(todo):
+            for sign in (1.0,-1.0):
+                trial = xyz[todo] + sign*scale*dir[todo]
+                found = obj_on.inside_many(trial) == stop[todo]
+                xyznew[todo[found]] = trial[found]
+                todo = todo[~found]
+            scale *= factor
+
+        if len(todo):
+            raise Exception("Could not find bracket point for particle %d" % todo[0])
+
+        # bisection search to zoom in to within EPS of surface
+        # separation = distance between 2 points
+
+        todo = np.arange(len(xyz))
+        while len(todo):
+            delta = xyznew[todo] - xyz[todo]
+            separation = np.sqrt((delta*delta).sum(axis=1))
+            todo = todo[separation > EPS]
+            mid = 0.5 * (xyz[todo] + xyznew[todo])
+            same = obj_on.inside_many(mid) == start[todo]
+            xyz[todo[same]] = mid[same]
+            xyznew[todo[~same]] = mid[~same]
+
+        obj.xyz = xyz
 
         obj.on_id = id2
         obj.center()
@@ -861,18 +815,10 @@ class cdata:
         obj.yc += dy
         obj.zc += dz
 
-        # apply translation to each vertex or part coord
+        # apply translation to all vertices or part coords
 
-        if obj.style == SURFACE:
-            for i in range(obj.nvert):
-                obj.vertices[i][0] += dx
-                obj.vertices[i][1] += dy
-                obj.vertices[i][2] += dz
-        elif obj.style == GROUP:
-            for i in range(obj.npart):
-                obj.xyz[i][0] += dx
-                obj.xyz[i][1] += dy
-                obj.xyz[i][2] += dz
+        if obj.style == SURFACE: obj.vertices += (dx,dy,dz)
+        elif obj.style == GROUP: obj.xyz += (dx,dy,dz)
 
     # --------------------------------------------------------------------
     # rotate an object so current coord xyz axes align with new ones
@@ -907,30 +853,13 @@ class cdata:
         normalize(ynew)
         normalize(znew)
 
-        # apply rotation matrix of direction cosines to each vertex or part coord
+        # apply rotation matrix of direction cosines to all vertices or part coords
+        # rows of L = new axes, vertices use L, part coords use its transpose
 
-        if obj.style == SURFACE:
-            for i in range(obj.nvert):
-                x = obj.vertices[i][0] - obj.xc
-                y = obj.vertices[i][1] - obj.yc
-                z = obj.vertices[i][2] - obj.zc
-                xn = xnew[0]*x + xnew[1]*y + xnew[2]*z
-                yn = ynew[0]*x + ynew[1]*y + ynew[2]*z
-                zn = znew[0]*x + znew[1]*y + znew[2]*z
-                obj.vertices[i][0] = xn + obj.xc
-                obj.vertices[i][1] = yn + obj.yc
-                obj.vertices[i][2] = zn + obj.zc
-        elif obj.style == GROUP:
-            for i in range(obj.npart):
-                x = obj.xyz[i][0] - obj.xc
-                y = obj.xyz[i][1] - obj.yc
-                z = obj.xyz[i][2] - obj.zc
-                xn = xnew[0]*x + ynew[0]*y + znew[0]*z
-                yn = xnew[1]*x + ynew[1]*y + znew[1]*z
-                zn = xnew[2]*x + ynew[2]*y + znew[2]*z
-                obj.xyz[i][0] = xn + obj.xc
-                obj.xyz[i][1] = yn + obj.yc
-                obj.xyz[i][2] = zn + obj.zc
+        L = np.array([xnew,ynew,znew],dtype=np.float64)
+        c = np.array([obj.xc,obj.yc,obj.zc],dtype=np.float64)
+        if obj.style == SURFACE: obj.vertices = (obj.vertices - c) @ L.T + c
+        elif obj.style == GROUP: obj.xyz = (obj.xyz - c) @ L + c
 
     # --------------------------------------------------------------------
     # scale an object by sx,sy,sz factors
@@ -940,16 +869,11 @@ class cdata:
         obj = self.objs[self.ids[id]]
         if obj.style != SURFACE and obj.style != GROUP:
             raise Exception("Can only use scale() on a surface or group object")
+        c = np.array([obj.xc,obj.yc,obj.zc],dtype=np.float64)
         if obj.style == SURFACE:
-            for i in range(obj.nvert):
-                obj.vertices[i][0] = obj.xc + sx * (obj.vertices[i][0] - obj.xc)
-                obj.vertices[i][1] = obj.yc + sy * (obj.vertices[i][1] - obj.yc)
-                obj.vertices[i][2] = obj.zc + sz * (obj.vertices[i][2] - obj.zc)
+            obj.vertices = c + (sx,sy,sz) * (obj.vertices - c)
         elif obj.style == GROUP:
-            for i in range(obj.npart):
-                obj.xyz[i][0] = obj.xc + sx * (obj.xyz[i][0] - obj.xc)
-                obj.xyz[i][1] = obj.yc + sy * (obj.xyz[i][1] - obj.yc)
-                obj.xyz[i][2] = obj.zc + sz * (obj.xyz[i][2] - obj.zc)
+            obj.xyz = c + (sx,sy,sz) * (obj.xyz - c)
 
     # --------------------------------------------------------------------
     # create union object from list of other objects
@@ -980,60 +904,50 @@ class cdata:
         obj.id = id
         obj.style = style
 
-        if style == GROUP:
-            obj.on_id = self.objs[self.ids[list[0]]].on_id
-            obj.npart = 0
-            obj.xyz = []
-        elif style == SURFACE:
-            obj.nvert = obj.ntri = 0
-            obj.vertices = []
-            obj.triangles = []
-            obj.connections = []
-        elif style == LINE:
-            obj.nline = 0
-            obj.pairs = []
-
+        objs = []
         for id in list:
             o = self.objs[self.ids[id]]
             if o.style != style:
                 raise Exception("All joined objects must be of same style")
+            objs.append(o)
 
-            # force deep copy of particle coords
+        # concatenate particle coords
 
-            if style == GROUP:
+        if style == GROUP:
+            obj.on_id = objs[0].on_id
+            for o in objs:
                 if o.on_id != obj.on_id:
                     raise Exception("Particle group surfaces do not match")
-                for i in range(o.npart):
-                    xyz = o.xyz[i][:]
-                    obj.xyz.append(xyz)
-                obj.npart += o.npart
-                obj.center()
-
-            # force deep copy of triangle vertices and indices
-            # increment vertex and triangle indices b/c now have previous surfaces
-
-            elif style == SURFACE:
-                for i in range(o.nvert):
-                    vert = o.vertices[i][:]
-                    obj.vertices.append(vert)
-                for i in range(o.ntri):
-                    tri = [iv+obj.nvert for iv in o.triangles[i]]
-                    obj.triangles.append(tri)
-                    connect = o.connections[i][:]
-                    if connect[0]: connect[0] += obj.ntri
-                    if connect[2]: connect[2] += obj.ntri
-                    if connect[4]: connect[4] += obj.ntri
-                    obj.connections.append(connect)
-                obj.nvert += o.nvert
-                obj.ntri += o.ntri
-                obj.center()
-
-            # force deep copy of line pt pairs
-
-            elif style == LINE:
-                pairs = o.pairs[:]
-                obj.pairs += (pairs)
-                obj.nline += o.nline
+            obj.xyz = np.concatenate([o.xyz for o in objs])
+            obj.npart = len(obj.xyz)
+            obj.center()
+
+        # concatenate triangle vertices and indices
+        # offset vertex and triangle indices by counts of previous surfaces
+        # connection triangle of 0 = no connection, stays 0
+
+        elif style == SURFACE:
+            voffset = np.cumsum([0] + [o.nvert for o in objs[:-1]])
+            toffset = np.cumsum([0] + [o.ntri for o in objs[:-1]])
+            obj.vertices = np.concatenate([o.vertices for o in objs])
+            obj.triangles = np.concatenate([o.triangles + voffset[i]
+                                            for i,o in enumerate(objs)])
+            connections = []
+            for i,o in enumerate(objs):
+                connect = o.connections.copy()
+                tri = connect[:,0::2]
+                tri[tri > 0] += toffset[i]
+                connections.append(connect)
+            obj.connections = np.concatenate(connections)
+            obj.nvert = len(obj.vertices)
+            obj.ntri = len(obj.triangles)
+            obj.center()
+
+        # concatenate line pt pairs
+
+        elif style == LINE:
+            obj.pairs = np.concatenate([o.pairs for o in objs])
+            obj.nline = len(obj.pairs)
 
     # --------------------------------------------------------------------
     # delete each object in list
@@ -1098,7 +1012,7 @@ class cdata:
     # open a new file
 
     def write(self,file,*list):
-        if not len(list): vlist = list(range(len(self.objs)))
+        if not len(list): vlist = range(len(self.objs))
         else:
             vlist = []
             for id in list: vlist.append(self.ids[id])
@@ -1112,7 +1026,7 @@ class cdata:
     # open existing file for appending
 
     def append(self,file,*list):
-        if not len(list): vlist = list(range(len(self.objs)))
+        if not len(list): vlist = range(len(self.objs))
         else:
             vlist = []
             for id in list: vlist.append(self.ids[id])
@@ -1135,24 +1049,16 @@ class cdata:
                 else:
                     print("particles %s %d %s" % (obj.id,obj.npart,obj.on_id), file=fp)
                 print(file=fp)
-                for i in range(obj.npart):
-                    print(i+1,obj.xyz[i][0],obj.xyz[i][1],obj.xyz[i][2], file=fp)
+                write_rows(fp,obj.xyz,"%r")
                 print(file=fp)
             if obj.style == SURFACE:
                 print("triangles %s %d %d" % (obj.id,obj.nvert,obj.ntri), file=fp)
                 print(file=fp)
-                for i in range(obj.nvert):
-                    print(i+1,obj.vertices[i][0],obj.vertices[i][1], \
-                          obj.vertices[i][2], file=fp)
+                write_rows(fp,obj.vertices,"%r")
                 print(file=fp)
-                for i in range(obj.ntri):
-                    print(i+1,obj.triangles[i][0],obj.triangles[i][1], \
-                          obj.triangles[i][2], file=fp)
+                write_rows(fp,obj.triangles,"%d")
                 print(file=fp)
-                for i in range(obj.ntri):
-                    print(i+1,obj.connections[i][0],obj.connections[i][1], \
-                          obj.connections[i][2],obj.connections[i][3], \
-                          obj.connections[i][4],obj.connections[i][5], file=fp)
+                write_rows(fp,obj.connections,"%d")
             if obj.style == REGION:
                 print("region %s" % obj.command(), file=fp)
 
@@ -1165,60 +1071,51 @@ class cdata:
 
     # --------------------------------------------------------------------
     # return list of atoms and triangles and lines to viz for cdata object
+    # lists are converted from the arrays of viz_arrays()
 
     def viz(self,isnap):
+        time,box,atoms,bonds,tris,lines = self.viz_arrays(isnap)
+        return [time,box] + vizarray.lists(atoms,bonds,tris,lines)
+
+    # --------------------------------------------------------------------
+    # return 2d arrays of atoms and triangles and lines to viz for cdata object
+    # same ids and types as viz()
+
+    def viz_arrays(self,isnap):
         if isnap:
             raise Exception("cannot call cdata.viz() with isnap != 0")
 
-        # create atom list from sum of all particle groups
-        # id = running count
-        # type = running type of particle group
+        # stack particle group coords, type = running type of particle group
 
-        id = itype = 0
-        atoms = []
+        coords = []
         for obj in self.objs:
             if obj.style != GROUP: continue
             if not obj.select: continue
-            itype += 1
-            for xyz in obj.xyz:
-                id += 1
-                atoms.append([id,itype,xyz[0],xyz[1],xyz[2]])
-
-        # no bonds
+            coords.append(obj.xyz)
+        atoms = stack_objects(coords,vizarray.NATOM)
 
-        bonds = []
+        bonds = np.zeros((0,vizarray.NBOND))
 
-        # create triangle list from sum of all surfaces and regions
-        # id = running count
-        # type = type of set of tris
+        # gather triangle corners from vertices of each surface and region
 
-        id = itype = 0
-        tris = []
+        corners = []
         for obj in self.objs:
             if obj.style != SURFACE and obj.style != REGION: continue
             if not obj.select: continue
             if obj.style == REGION: obj.triangulate()
-            itype += 1
-            for tri in obj.triangles:
-                v1 = obj.vertices[tri[0]-1]
-                v2 = obj.vertices[tri[1]-1]
-                v3 = obj.vertices[tri[2]-1]
-                list = v1 + v2 + v3
-                n = normal(list[0:3],list[3:6],list[6:9])
-                id += 1
-                tris.append([id,itype] + list + n)
-
-        # create line list from sum of all line objects
-
-        id = itype = 0
-        lines = []
+            vertices = np.asarray(obj.vertices,dtype=np.float64).reshape(-1,3)
+            triangles = np.asarray(obj.triangles,dtype=np.int64).reshape(-1,3) - 1
+            corners.append(vertices[triangles].reshape(-1,9))
+        tris = stack_objects(corners,vizarray.NTRI-3)
+        n = vizarray.normals(tris[:,2:5],tris[:,5:8],tris[:,8:11])
+        tris = np.column_stack((tris,n))
+
+        pairs = []
         for obj in self.objs:
             if obj.style != LINE: continue
             if not obj.select: continue
-            itype += 1
-            for pair in obj.pairs:
-                id += 1
-                lines.append([id,itype] + pair)
+            pairs.append(obj.pairs)
+        lines = stack_objects(pairs,vizarray.NLINE)
 
         return 0,self.bbox(),atoms,bonds,tris,lines
 
@@ -1257,6 +1154,8 @@ class cdata:
 # object styles
 
 EPSILON = 1.0e-6
+PARTBLOCK = 100000        # max candidate points tested at once by part()
+INSIDEBLOCK = 10000       # points per block in Surface.inside_many()
 BIG = 1.0e20
 
 REGION =  1
@@ -1285,7 +1184,7 @@ class Random:
         self.seed = seed
 
     def __call__(self):
-        k = self.seed/IQ
+        k = self.seed//IQ
         self.seed = IA*(self.seed-k*IQ) - IR*k
         if self.seed < 0: self.seed += IM
         return AM*self.seed
@@ -1293,6 +1192,10 @@ class Random:
 # --------------------------------------------------------------------
 # triangulated surface
 
+# vertices = Nvert x 3 array of coords
+# triangles = Ntri x 3 array of vertex indices (1-N)
+# connections = Ntri x 6 array of connected triangle (1-N) and edge per edge
+
 class Surface:
 
     def __init__(self):
@@ -1301,17 +1204,20 @@ class Surface:
     # bounding box
 
     def bbox(self):
-        list = [float(vert[0]) for vert in self.vertices]
-        xlo = min(list)
-        xhi = max(list)
-        list = [float(vert[1]) for vert in self.vertices]
-        ylo = min(list)
-        yhi = max(list)
-        list = [float(vert[2]) for vert in self.vertices]
-        zlo = min(list)
-        zhi = max(list)
-
-        return (xlo,ylo,zlo,xhi,yhi,zhi)
+        return array_bbox(self.vertices)
+
+    # set vertices,triangles,connections to copy of tris (0-N) of surf o
+    # only vertices used by tris are copied, in their original order,
+    #   and tri vertex indices are remapped to them
+
+    def select_tris(self,o,tris):
+        used,remap = np.unique(o.triangles[tris],return_inverse=True)
+        self.ntri = len(tris)
+        self.nvert = len(used)
+        self.vertices = o.vertices[used-1]
+        self.triangles = remap.reshape(-1,3) + 1
+        self.connections = connect(self.nvert,self.ntri,self.triangles)
+        self.center()
 
     # set center point explicitly or set to middle of bounding box
 
@@ -1329,7 +1235,13 @@ class Surface:
     # bin 2d-projected triangles into xy plane for nbinx by nbiny bins
     # each bin overlayed by triangle's xy bounding box stores the triangle index
     # EPSILON insures that bins completely overlay surface bounding box
-    # self.xlo, self.ylo, self.dxinv, self.dyinv, self.bin are used by inside()
+    # bins are stored as one array of triangle indices, ordered by bin
+    #   binstart[ibin] = index of 1st triangle of bin ibin = i*nbiny + j
+    # also precompute per-triangle coeffs so inside_many() does no setup:
+    #   edges[m][k] = A,B,C so that edge fn of 2d tri edge k = A*x + B*y + C
+    #   plane[m] = a,b,c so that z of 3d tri plane = a*x + b*y + c
+    #   c = -BIG for a tri parallel to z, which a z ray cannot cross
+    # self.xlo, self.ylo, self.dxinv, self.dyinv, etc are used by inside_many()
 
     def inside_prep(self):
         self.xlo,self.ylo,self.zlo,self.xhi,self.yhi,self.zhi = self.bbox()
@@ -1347,27 +1259,45 @@ class Surface:
         print("Binning %d triangles into %d by %d bins ..." % \
               (self.ntri,self.nbinx,self.nbiny))
 
-        self.bin = []
-        for i in range(self.nbinx):
-            self.bin.append(self.nbiny*[0])
-            for j in range(self.nbiny):
-                self.bin[i][j] = []
-
-        for m in range(self.ntri):
-            v1 = self.vertices[self.triangles[m][0]-1]
-            v2 = self.vertices[self.triangles[m][1]-1]
-            v3 = self.vertices[self.triangles[m][2]-1]
-            xmin = min((v1[0],v2[0],v3[0]))
-            xmax = max((v1[0],v2[0],v3[0]))
-            ymin = min((v1[1],v2[1],v3[1]))
-            ymax = max((v1[1],v2[1],v3[1]))
-            ilo = int((xmin - self.xlo) * self.dxinv)
-            ihi = int((xmax - self.xlo) * self.dxinv)
-            jlo = int((ymin - self.ylo) * self.dyinv)
-            jhi = int((ymax - self.ylo) * self.dyinv)
-            for i in range(ilo,ihi+1):
-                for j in range(jlo,jhi+1):
-                    self.bin[i][j].append(m)
+        triangles = self.triangles - 1
+        v1 = self.vertices[triangles[:,0]]
+        v2 = self.vertices[triangles[:,1]]
+        v3 = self.vertices[triangles[:,2]]
+        corners = np.stack((v1,v2,v3),axis=1)
+
+        # each triangle covers ni by nj bins starting at ilo,jlo
+
+        xymin = corners[:,:,0:2].min(axis=1)
+        xymax = corners[:,:,0:2].max(axis=1)
+        ilo = ((xymin[:,0] - self.xlo) * self.dxinv).astype(int)
+        ihi = ((xymax[:,0] - self.xlo) * self.dxinv).astype(int)
+        jlo = ((xymin[:,1] - self.ylo) * self.dyinv).astype(int)
+        jhi = ((xymax[:,1] - self.ylo) * self.dyinv).astype(int)
+        nj = jhi - jlo + 1
+        counts = (ihi - ilo + 1) * nj
+
+        tri = np.repeat(np.arange(self.ntri),counts)
+        k = np.arange(len(tri)) - np.repeat(np.cumsum(counts) - counts,counts)
+        ibin = (ilo[tri] + k // nj[tri])*self.nbiny + jlo[tri] + k % nj[tri]
+        order = np.argsort(ibin,kind="stable")
+        self.bintri = tri[order]
+        self.binstart = np.searchsorted(ibin[order],
+                                        np.arange(self.nbinx*self.nbiny+1))
+
+        edge = np.roll(corners,-1,axis=1) - corners
+        self.edges = np.stack((-edge[:,:,1],edge[:,:,0],
+                               edge[:,:,1]*corners[:,:,0] -
+                               edge[:,:,0]*corners[:,:,1]),axis=2)
+
+        n = np.cross(v2-v1,v3-v1)
+        self.plane = np.zeros((self.ntri,3))
+        self.plane[:,2] = -BIG
+        flat = n[:,2] != 0.0
+        nz = n[flat,2]
+        self.plane[flat,0] = -n[flat,0]/nz
+        self.plane[flat,1] = -n[flat,1]/nz
+        self.plane[flat,2] = v1[flat,2] + \
+            (n[flat,0]*v1[flat,0] + n[flat,1]*v1[flat,1])/nz
 
         print("Done with binning")
 
@@ -1378,98 +1308,69 @@ class Surface:
     # if pt is outside bins, don't need to check
     # x,y,z is inside surf if line segment intersects an odd number of triangles
     # intersection test:
-    #   is xy pt in bounding rectangle of tri in xy plane ?
     #   is xy pt inside tri in xy plane (including edges and vertices) ?
+    #     edge fns of all 3 edges must not have opposite signs
     #   compute ztri = z value of xy pt on plane of 3d tri
     #   if z of pt is <= ztri, then line segment intersects the tri
+    # inside_many() tests N x 3 array of points, returns array of 1,0
+    # (point,triangle) pairs are formed in blocks of INSIDEBLOCK points
 
     def inside(self,x,y,z):
-        ix = int((x - self.xlo) * self.dxinv)
-        iy = int((y - self.ylo) * self.dyinv)
-        if ix < 0 or ix >= self.nbinx or iy < 0 or iy >= self.nbiny: return 0
-        n = len(self.bin[ix][iy])
-
-        hit = 0
-        for m in range(n):
-            itri = self.bin[ix][iy][m]
-            tri = self.triangles[itri]
-
-            v1 = self.vertices[tri[0]-1]
-            v2 = self.vertices[tri[1]-1]
-            v3 = self.vertices[tri[2]-1]
-
-            # is x,y in bounding box of 2d triangle ?
-
-            if x < v1[0] and x < v2[0] and x < v3[0]: continue
-            if x > v1[0] and x > v2[0] and x > v3[0]: continue
-            if y < v1[1] and y < v2[1] and y < v3[1]: continue
-            if y > v1[1] and y > v2[1] and y > v3[1]: continue
-
-            # is x,y inside 2d triangle ?
-            # cross product of each edge with vertex-to-point must have same sign
-            # cross product = 0 is OK, means point is on edge or vertex
-
-            c1 = (v2[0]-v1[0])*(y-v1[1]) - (v2[1]-v1[1])*(x-v1[0])
-            c2 = (v3[0]-v2[0])*(y-v2[1]) - (v3[1]-v2[1])*(x-v2[0])
-            c3 = (v1[0]-v3[0])*(y-v3[1]) - (v1[1]-v3[1])*(x-v3[0])
-            if c1 < 0:
-                if c2 > 0 or c3 > 0: continue
-            elif c1 > 0:
-                if c2 < 0 or c3 < 0: continue
-            else:
-                if c2 < 0 and c3 > 0: continue
-                if c2 > 0 and c3 < 0: continue
-
-            # represent x,y point in basis of 2 triangle edge vectors
-            # p = (x,y) - v1, v = v2 - v1, w = v3 - v2
-            # find alpha,beta such that p = alpha v + beta w
-            #   by solving system of 2 linear eqs for their intersection
-            # denom (vx - vy * wx/xy) cannot be 0 since would imply vx/vy = wx/wy
-            #   and thus e1 would be parallel to e2
-            # if wy = 0, vy cannot be 0, since e1 would be parallel to e2
-
-            px = x - v1[0];
-            py = y - v1[1]
-            vx = v2[0] - v1[0]
-            vy = v2[1] - v1[1]
-            wx = v3[0] - v2[0]
-            wy = v3[1] - v2[1]
-            if wy: alpha = (px - py * wx/wy) / (vx - vy * wx/wy)
-            else: alpha = py/vy
-            if wx: beta = (px - alpha * vx) / wx
-            else: beta = (py - alpha * vy) / wy
-            pz = alpha * (v2[2] - v1[2]) + beta * (v3[2] - v2[2])
-            if z <= pz + v1[2]: hit += 1
-
-        return hit % 2
+        return int(self.inside_many(np.array([[x,y,z]]))[0])
+
+    def inside_many(self,points):
+        if not hasattr(self,"binstart"): self.inside_prep()
+        points = np.asarray(points,dtype=np.float64).reshape(-1,3)
+        hits = np.zeros(len(points),dtype=int)
+
+        ix = np.trunc((points[:,0] - self.xlo) * self.dxinv)
+        iy = np.trunc((points[:,1] - self.ylo) * self.dyinv)
+        valid = (ix >= 0) & (ix < self.nbinx) & (iy >= 0) & (iy < self.nbiny)
+        which = np.nonzero(valid)[0]
+        ibin = (ix[which]*self.nbiny + iy[which]).astype(int)
+
+        for start in range(0,len(which),INSIDEBLOCK):
+            ipt = which[start:start+INSIDEBLOCK]
+            first = self.binstart[ibin[start:start+INSIDEBLOCK]]
+            count = self.binstart[ibin[start:start+INSIDEBLOCK]+1] - first
+            pair = np.repeat(ipt,count)
+            k = np.arange(len(pair)) - np.repeat(np.cumsum(count) - count,count)
+            tri = self.bintri[np.repeat(first,count) + k]
+
+            x = points[pair,0]
+            y = points[pair,1]
+            z = points[pair,2]
+            e = self.edges[tri]
+            c = e[:,:,0]*x[:,None] + e[:,:,1]*y[:,None] + e[:,:,2]
+            flag = ~((c < 0.0).any(axis=1) & (c > 0.0).any(axis=1))
+            p = self.plane[tri]
+            flag &= z <= p[:,0]*x + p[:,1]*y + p[:,2]
+            hits += np.bincount(pair[flag],minlength=len(points))
+
+        return hits % 2
 
     # surface area
     # areas = cummulative total area of all triangles
     # triangle area = 1/2 of magnitude of cross product of 2 edge vectors
 
     def area(self):
-        a = 3*[0]
-        self.areas = []
-        sum = 0.0
-        for tri in self.triangles:
-            v1 = self.vertices[tri[0]-1]
-            v2 = self.vertices[tri[1]-1]
-            v3 = self.vertices[tri[2]-1]
-            a[0] = (v2[1]-v1[1])*(v3[2]-v1[2]) - (v2[2]-v1[2])*(v3[1]-v1[1])
-            a[1] = (v2[2]-v1[2])*(v3[0]-v1[0]) - (v2[0]-v1[0])*(v3[2]-v1[2])
-            a[2] = (v2[0]-v1[0])*(v3[1]-v1[1]) - (v2[1]-v1[1])*(v3[0]-v1[0])
-            sum += 0.5 * sqrt(a[0]*a[0] + a[1]*a[1] + a[2]*a[2])
-            self.areas.append(sum)
-        return sum
+        triangles = self.triangles - 1
+        v1 = self.vertices[triangles[:,0]]
+        v2 = self.vertices[triangles[:,1]]
+        v3 = self.vertices[triangles[:,2]]
+        a = np.cross(v2-v1,v3-v1)
+        self.areas = np.cumsum(0.5 * np.sqrt((a*a).sum(axis=1)))
+        if not len(self.areas): return 0.0
+        return float(self.areas[-1])
 
     # return a random location on one of triangles
+    # 1st triangle whose cummulative area exceeds area, else last one
 
     def loc2d(self,area,random):
-        for i in range(self.ntri):
-            if area < self.areas[i]: break
-        v1 = self.vertices[self.triangles[i][0]-1]
-        v2 = self.vertices[self.triangles[i][1]-1]
-        v3 = self.vertices[self.triangles[i][2]-1]
+        i = min(int(np.searchsorted(self.areas,area,side="right")),self.ntri-1)
+        v1 = self.vertices[self.triangles[i][0]-1].tolist()
+        v2 = self.vertices[self.triangles[i][1]-1].tolist()
+        v3 = self.vertices[self.triangles[i][2]-1].tolist()
         r1 = random()
         r2 = random()
         if r2 > r1:
@@ -1485,19 +1386,11 @@ class Surface:
 # --------------------------------------------------------------------
 # group of particles
 
+# xyz = Npart x 3 array of coords
+
 class Group:
     def bbox(self):
-        list = [xyz[0] for xyz in self.xyz]
-        xlo = min(list)
-        xhi = max(list)
-        list = [xyz[1] for xyz in self.xyz]
-        ylo = min(list)
-        yhi = max(list)
-        list = [xyz[2] for xyz in self.xyz]
-        zlo = min(list)
-        zhi = max(list)
-
-        return (xlo,ylo,zlo,xhi,yhi,zhi)
+        return array_bbox(self.xyz)
 
     # set center point explicitly or set to middle of bounding box
 
@@ -1538,6 +1431,14 @@ class Box:
         if z < self.zlo or z > self.zhi: return 0
         return 1
 
+    # return array of 1,0 for N x 3 array of points inside/outside the region
+
+    def inside_many(self,points):
+        points = np.asarray(points,dtype=np.float64).reshape(-1,3)
+        lo = (self.xlo,self.ylo,self.zlo)
+        hi = (self.xhi,self.yhi,self.zhi)
+        return np.all((points >= lo) & (points <= hi),axis=1).astype(int)
+
     # triangulate the region
     # set nvert,ntri,vertices,triangles,connections
     # convert vertices from unit box to lo/hi box
@@ -1634,6 +1535,13 @@ class Sphere:
         if rsq > self.rsq: return 0
         return 1
 
+    # return array of 1,0 for N x 3 array of points inside/outside the region
+
+    def inside_many(self,points):
+        d = np.asarray(points,dtype=np.float64).reshape(-1,3) - (self.x,self.y,self.z)
+        rsq = (d*d).sum(axis=1)
+        return (rsq <= self.rsq).astype(int)
+
     # triangulate the region
     # set nvert,ntri,vertices,triangles,connections
     # convert vertices from unit box to sphere at (x,y,z) with radius r
@@ -1701,6 +1609,11 @@ class Shell(Sphere):
         if rsq > self.rsq or rsq < self.innersq: return 0
         return 1
 
+    def inside_many(self,points):
+        d = np.asarray(points,dtype=np.float64).reshape(-1,3) - (self.x,self.y,self.z)
+        rsq = (d*d).sum(axis=1)
+        return ((rsq <= self.rsq) & (rsq >= self.innersq)).astype(int)
+
     def command(self):
         return "%s shell %g %g %g %g %g" % (self.id,self.x,self.y,self.z,
                                             self.r,self.rinner)
@@ -1753,6 +1666,13 @@ class Cylinder:
         if d3 < self.lo or d3 > self.hi: return 0
         return 1
 
+    # return array of 1,0 for N x 3 array of points inside/outside the region
+
+    def inside_many(self,points):
+        d1,d2,d3 = axis_coords(points,self.axis,self.c1,self.c2)
+        rsq = d1*d1 + d2*d2
+        return ((rsq <= self.rsq) & (d3 >= self.lo) & (d3 <= self.hi)).astype(int)
+
     # triangulate the region
     # set nvert,ntri,vertices,triangles,connections
     # convert vertices from unit box to cylinder with correct axis
@@ -1883,7 +1803,7 @@ class Capped:
             d1 = y - self.c1
             d2 = z - self.c2
             d3 = x
-        elif sef.axis == 'y':
+        elif self.axis == 'y':
             d1 = x - self.c1
             d2 = z - self.c2
             d3 = y
@@ -1900,6 +1820,15 @@ class Capped:
             if d1*d1 + d2*d2 + (d3-self.hi)*(d3-self.hi) > self.rsq: return 0
         return 1
 
+    # return array of 1,0 for N x 3 array of points inside/outside the region
+    # distance along axis beyond lo/hi is distance into an end cap
+
+    def inside_many(self,points):
+        d1,d2,d3 = axis_coords(points,self.axis,self.c1,self.c2)
+        dcap = np.maximum(self.lo - d3,0.0) + np.maximum(d3 - self.hi,0.0)
+        rsq = d1*d1 + d2*d2 + dcap*dcap
+        return (rsq <= self.rsq).astype(int)
+
     # triangulate the region
     # set nvert,ntri,vertices,triangles,connections
     # convert vertices from unit box to cylinder with correct axis
@@ -2029,24 +1958,15 @@ class Capped:
 # --------------------------------------------------------------------
 # set of line segments
 
+# pairs = Nline x 6 array of end pt coords
+
 class Line:
     def bbox(self):
-        list = [pair[0] for pair in self.pairs]
-        list += [pair[3] for pair in self.pairs]
-        xlo = min(list)
-        xhi = max(list)
-        list = [pair[1] for pair in self.pairs]
-        list += [pair[4] for pair in self.pairs]
-        ylo = min(list)
-        yhi = max(list)
-        list = [pair[2] for pair in self.pairs]
-        list += [pair[5] for pair in self.pairs]
-        zlo = min(list)
-        zhi = max(list)
-        return (xlo,ylo,zlo,xhi,yhi,zhi)
+        return array_bbox(self.pairs.reshape(-1,3))
 
     def addline(self,coords):
-        self.pairs.append(list(coords))
+        self.pairs = np.vstack((self.pairs,np.array(coords,dtype=np.float64)))
+        self.nline = len(self.pairs)
 
 # --------------------------------------------------------------------
 # union object that contains other objects
@@ -2084,6 +2004,11 @@ class Union:
             if obj.inside(x,y,z): return 1
         return 0
 
+    def inside_many(self,points):
+        flag = np.zeros(len(points),dtype=int)
+        for obj in self.objs: flag |= obj.inside_many(points)
+        return flag
+
     # surface area of union
     # areas = cummulative total area for child objects
 
@@ -2103,6 +2028,16 @@ class Union:
         if i > 0: area -= self.areas[i]
         return self.objs[i].loc2d(area,random)
 
+# --------------------------------------------------------------------
+# return d1,d2 = coords of N x 3 points relative to axis at c1,c2
+# and d3 = coord of points along axis = 'x','y','z'
+
+def axis_coords(points,axis,c1,c2):
+    points = np.asarray(points,dtype=np.float64).reshape(-1,3)
+    if axis == 'x': return points[:,1]-c1,points[:,2]-c2,points[:,0]
+    elif axis == 'y': return points[:,0]-c1,points[:,2]-c2,points[:,1]
+    elif axis == 'z': return points[:,0]-c1,points[:,1]-c2,points[:,2]
+
 # --------------------------------------------------------------------
 # return c = a x b
 
@@ -2123,6 +2058,17 @@ def normalize(a):
     a[1] /= length
     a[2] /= length
 
+# --------------------------------------------------------------------
+# stack per-object arrays of values into one array with ncol columns
+# prepend id = running count and type = index of object (1-N)
+
+def stack_objects(arrays,ncol):
+    out = np.zeros((sum([len(a) for a in arrays]),ncol))
+    out[:,0] = np.arange(1,len(out)+1)
+    out[:,1] = np.repeat(np.arange(1,len(arrays)+1),[len(a) for a in arrays])
+    if arrays: out[:,2:] = np.concatenate(arrays)
+    return out
+
 # --------------------------------------------------------------------
 # compute normal for a triangle with 3 vertices
 
@@ -2155,68 +2101,82 @@ def normal(x,y,z):
 def connect(nvert,ntri,triangles):
 
     # triangles have list of 3 vertices
-    # create inverted v2tri where each vertex has list of triangles it is in
-
-    v2tri = []
-    for i in range(nvert): v2tri.append([]);
-
-    for i in range(ntri):
-        for vert in triangles[i]: v2tri[vert-1].append(i)
-
-    # loop over triangles to reset connections
-
-    connections = []
-    for i in range(ntri):
-
-        # zero connections
-
-        connect = 6*[0]
-        connections.append(connect)
-
-        # tri123 = list of tris attached to each vertex of triangle i
-
-        v = triangles[i]
-        tri1 = v2tri[v[0]-1]
-        tri2 = v2tri[v[1]-1]
-        tri3 = v2tri[v[2]-1]
-
-        # loop over attached tris and look for 2nd vertex in each of 3 edges
-        # when find it, set connection triangle and edge values
-
-        for itri in tri1:
-            if itri == i: continue
-            if v[1] in triangles[itri]:
-                connect[0] = itri+1
-                m = triangles[itri].index(v[0])
-                n = triangles[itri].index(v[1])
-                if (m == 0 and n == 1) or (m == 1 and n == 0): connect[1] = 1
-                elif (m == 1 and n == 2) or (m == 2 and n == 1): connect[1] = 2
-                else: connect[1] = 3
-                break
-
-        for itri in tri2:
-            if itri == i: continue
-            if v[2] in triangles[itri]:
-                connect[2] = itri+1
-                m = triangles[itri].index(v[1])
-                n = triangles[itri].index(v[2])
-                if (m == 0 and n == 1) or (m == 1 and n == 0): connect[3] = 1
-                elif (m == 1 and n == 2) or (m == 2 and n == 1): connect[3] = 2
-                else: connect[3] = 3
-                break
-
-        for itri in tri3:
-            if itri == i: continue
-            if v[0] in triangles[itri]:
-                connect[4] = itri+1
-                m = triangles[itri].index(v[2])
-                n = triangles[itri].index(v[0])
-                if (m == 0 and n == 1) or (m == 1 and n == 0): connect[5] = 1
-                elif (m == 1 and n == 2) or (m == 2 and n == 1): connect[5] = 2
-                else: connect[5] = 3
-                break
-
-    return connections
+    # pair triangles sharing an edge via sorted edge keys
+
+    return vizarray.edge_connect(triangles[:ntri])
+
+# --------------------------------------------------------------------
+# read n lines of "index values ..." from open file
+# return n x ncol array of values, index is dropped
+
+def read_rows(f,n,ncol,dtype):
+    rows = [f.readline().split()[1:] for i in range(n)]
+    return np.array(rows,dtype=dtype).reshape(n,ncol)
+
+# --------------------------------------------------------------------
+# write rows of 2d array to open file, prepended by index (1-N)
+# fmt is applied to each value of a row, %r gives same text as print()
+
+def write_rows(f,array,fmt):
+    line = "%d" + array.shape[1]*(" " + fmt) + "\n"
+    f.writelines([line % ((i+1,) + tuple(row))
+                  for i,row in enumerate(array.tolist())])
+
+# --------------------------------------------------------------------
+# evaluate test string like "$x < 2.0 and $y > 0.0" on N x 3 vertices
+# $x,$y,$z become columns of vertices, return N boolean flags
+
+def vertex_test(teststr,vertices):
+    expr = teststr.replace("$x","x").replace("$y","y").replace("$z","z")
+    tree = ast.fix_missing_locations(ArrayLogic().visit(ast.parse(expr,mode="eval")))
+    names = {"x": vertices[:,0],"y": vertices[:,1],"z": vertices[:,2],"np": np,
+             "sqrt": np.sqrt,"cos": np.cos,"sin": np.sin,"fabs": np.fabs,"pi": pi}
+    flag = eval(compile(tree,"","eval"),names)
+    return np.broadcast_to(np.asarray(flag,dtype=bool),(len(vertices),))
+
+# --------------------------------------------------------------------
+# rewrite and/or/not and chained comparisons in a parsed expression
+# into NumPy logical functions so they apply element-wise to arrays
+
+class ArrayLogic(ast.NodeTransformer):
+    def call(self,func,args):
+        attr = ast.Attribute(value=ast.Name(id="np",ctx=ast.Load()),
+                             attr=func,ctx=ast.Load())
+        return ast.Call(func=attr,args=args,keywords=[])
+
+    def visit_BoolOp(self,node):
+        self.generic_visit(node)
+        if isinstance(node.op,ast.And): func = "logical_and"
+        else: func = "logical_or"
+        expr = node.values[0]
+        for value in node.values[1:]: expr = self.call(func,[expr,value])
+        return expr
+
+    def visit_UnaryOp(self,node):
+        self.generic_visit(node)
+        if isinstance(node.op,ast.Not): return self.call("logical_not",[node.operand])
+        return node
+
+    def visit_Compare(self,node):
+        self.generic_visit(node)
+        if len(node.ops) == 1: return node
+        left = node.left
+        expr = None
+        for op,right in zip(node.ops,node.comparators):
+            pair = ast.Compare(left=left,ops=[op],comparators=[right])
+            if expr is None: expr = pair
+            else: expr = self.call("logical_and",[expr,pair])
+            left = right
+        return expr
+
+# --------------------------------------------------------------------
+# return bounding box of N x 3 array of points as tuple of floats
+
+def array_bbox(points):
+    lo = points.min(axis=0)
+    hi = points.max(axis=0)
+    return (float(lo[0]),float(lo[1]),float(lo[2]),
+            float(hi[0]),float(hi[1]),float(hi[2]))
 
 # --------------------------------------------------------------------
 # add a vertex v to vertices list unless already exists in vdict dictionary
@@ -37,6 +37,8 @@ c.single(N,"file")      write snapshot for timestep N to file.cfg
 # Imports and external programs
 
 import sys
+import numpy as np
+import vizarray
 
 # Class definition
 
@@ -59,7 +61,7 @@ class cfg:
         while 1:
             which,time,flag = self.data.iterator(flag)
             if flag == -1: break
-            time,box,atoms,bonds,tris,lines = self.data.viz(which)
+            time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(self.data,which)
 
             xlen = box[3]-box[0]
             ylen = box[4]-box[1]
@@ -78,13 +80,7 @@ class cfg:
             print("H0(3,3) = %20.10f A " % zlen, file=f)
             print("#", file=f)
 
-            for atom in atoms:
-                itype = int(atom[1])
-                xfrac = (atom[2]-box[0])/xlen
-                yfrac = (atom[3]-box[1])/ylen
-                zfrac = (atom[4]-box[2])/zlen
-#        print >>f,"1.0  %d   %15.10f  %15.10f  %15.10f  %15.10f  %15.10f  %15.10f " % (itype,xfrac,yfrac,zfrac,atom[5],atom[6],atom[7])
-                print("1.0  %d   %15.10f  %15.10f  %15.10f  0.0 0.0 0.0 " % (itype,xfrac,yfrac,zfrac), file=f)
+            write_atoms(f,box,atoms)
 
             print(time, end=' ')
             sys.stdout.flush()
@@ -103,7 +99,7 @@ class cfg:
         while 1:
             which,time,flag = self.data.iterator(flag)
             if flag == -1: break
-            time,box,atoms,bonds,tris,lines = self.data.viz(which)
+            time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(self.data,which)
 
             if n < 10:
                 file = root + "000" + str(n)
@@ -133,13 +129,7 @@ class cfg:
             print("H0(3,3) = %20.10f A " % zlen, file=f)
             print("#", file=f)
 
-            for atom in atoms:
-                itype = int(atom[1])
-                xfrac = (atom[2]-box[0])/xlen
-                yfrac = (atom[3]-box[1])/ylen
-                zfrac = (atom[4]-box[2])/zlen
-#        print >>f,"1.0  %d   %15.10f  %15.10f  %15.10f  %15.10f  %15.10f  %15.10f " % (itype,xfrac,yfrac,zfrac,atom[5],atom[6],atom[7])
-                print("1.0  %d   %15.10f  %15.10f  %15.10f  0.0 0.0 0.0 " % (itype,xfrac,yfrac,zfrac), file=f)
+            write_atoms(f,box,atoms)
 
             print(time, end=' ')
             sys.stdout.flush()
@@ -156,7 +146,7 @@ class cfg:
         else: file = args[0] + ".cfg"
 
         which = self.data.findtime(time)
-        time,box,atoms,bonds,tris,lines = self.data.viz(which)
+        time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(self.data,which)
         f = open(file,"w")
 
         xlen = box[3]-box[0]
@@ -176,12 +166,17 @@ class cfg:
         print("H0(3,3) = %20.10f A " % zlen, file=f)
         print("#", file=f)
 
-        for atom in atoms:
-            itype = int(atom[1])
-            xfrac = (atom[2]-box[0])/xlen
-            yfrac = (atom[3]-box[1])/ylen
-            zfrac = (atom[4]-box[2])/zlen
-#        print >>f,"1.0  %d   %15.10f  %15.10f  %15.10f  %15.10f  %15.10f  %15.10f " % (itype,xfrac,yfrac,zfrac,atom[5],atom[6],atom[7])
-            print("1.0  %d   %15.10f  %15.10f  %15.10f  0.0 0.0 0.0 " % (itype,xfrac,yfrac,zfrac), file=f)
+        write_atoms(f,box,atoms)
 
         f.close()
+
+# --------------------------------------------------------------------
+# write atoms from viz array to open file as fractional box coords
+
+def write_atoms(f,box,atoms):
+    lo = np.array(box[0:3])
+    length = np.array(box[3:6]) - lo
+    frac = (atoms[:,2:5] - lo) / length
+#  fmt = "1.0  %d   %15.10f  %15.10f  %15.10f  %15.10f  %15.10f  %15.10f "
+    fmt = "1.0  %d   %15.10f  %15.10f  %15.10f  0.0 0.0 0.0 "
+    np.savetxt(f,np.column_stack((atoms[:,1],frac)),fmt=fmt)
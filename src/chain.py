@@ -19,6 +19,7 @@ c.mtype = 2                 set type of monomers (def = 1)
 c.btype = 1                 set type of bonds (def = 1)
 c.blen = 0.97               set length of bonds (def = 0.97)
 c.dmin = 1.02               set min dist from i-1 to i+1 site (def = 1.02)
+c.legacy = 1                build one monomer at a time (def = 0)
 
 c.id = "chain"              set molecule ID to chain # (default)
 c.id = "end1"               set molecule ID to count from one end of chain
@@ -28,12 +29,27 @@ c.build(100,10)             create 100 chains, each of length 10
 
   can be invoked multiple times interleaved with different settings
   must fill box with total of N monomers
+  chains are built in blocks, all bonds of a block at once
+    a chain longer than a block is built in several, one after the other
+    same seed and same sequence of build() calls give same chains
+    setting seed to a new value restarts the random # sequence
+  legacy = 1 builds with the scalar loop and Park-Miller generator
+    of earlier Pizza.py versions, giving their chains for a seed
 
 c.write("data.file")        write out all built chains to LAMMPS data file
+
+c.stream("data.file")       stream chains to data file as they are built
+c.write()                   finish streamed data file
+
+  stream() must be called before build()
+  streamed atoms and bonds are not stored in the chain object
 """
 
 # History
 #   8/05, Steve Plimpton (SNL): original version
+#   10/26, streamed output of built chains via stream()
+#   10/26, chains built in vectorized blocks, old builder kept as legacy
+#   10/26, chains longer than NBLOCK built in segments of NBLOCK monomers
 
 # ToDo list
 
@@ -41,13 +57,19 @@ c.write("data.file")        write out all built chains to LAMMPS data file
 #   n = number of monomers
 #   rhostar = reduced density
 #   seed = 12345
+#   rng,rngseed = NumPy generator for build(), seed it was created with
+#   legacy = 1 to build with scalar loop and random()
 #   mtype = type of monomers
 #   btype = type of bonds
 #   blen = length of bonds
 #   dmin = minimum distance from i-1 to i+1
 #   id = "chain","end1",or "end2"
-#   atoms = list of atoms
-#   bonds = list of bonds
+#   atoms = list of 2d arrays of built atoms, one per block
+#   bonds = list of 2d arrays of built bonds, one per block
+#   natoms,nbonds = # of atoms,bonds built so far
+#   idmol = molecule ID of last built atom
+#   atypes,btypes = max atom,bond type built so far
+#   writer = datastream when streaming, else None
 #   xprd,yprd,zprd = x,y,z box size
 #   xlo,ylo,zlo = -xyz prd / 2
 #   xhi,yhi,zhi = x,y,zprd /2
@@ -55,23 +77,30 @@ c.write("data.file")        write out all built chains to LAMMPS data file
 # Imports and external programs
 
 import math
+import numpy as np
 from data import data
 
+NBLOCK = 100000           # monomers per block of chains built at once
+                          # changing it changes the chains for a seed
+
 # Class definition
 
 class chain:
 
     # --------------------------------------------------------------------
 
-    def __init__(self,n,rhostar,*list):
+    def __init__(self,n,rhostar,*args):
         self.n = n
         self.rhostar = rhostar
         xaspect = yaspect = zaspect = 1.0
-        if len(list):
-            xaspect = list[0]
-            yaspect = list[1]
-            zaspect = list[2]
+        if len(args):
+            xaspect = args[0]
+            yaspect = args[1]
+            zaspect = args[2]
         self.seed = 12345
+        self.rng = None
+        self.rngseed = None
+        self.legacy = 0
         self.mtype = 1
         self.btype = 1
         self.blen = 0.97
@@ -79,6 +108,9 @@ class chain:
         self.id = "chain"
         self.atoms = []
         self.bonds = []
+        self.natoms = self.nbonds = self.idmol = 0
+        self.atypes = self.btypes = 0
+        self.writer = None
 
         volume = n/rhostar
         prd = pow(volume/xaspect/yaspect/zaspect,1.0/3.0)
@@ -97,111 +129,273 @@ class chain:
     # --------------------------------------------------------------------
 
     def build(self,n,nper):
-        for ichain in range(n):
-            atoms = []
-            bonds = []
-            id_atom_prev = id_mol_prev = id_bond_prev = 0
-            if len(self.atoms):
-                id_atom_prev = self.atoms[-1][0]
-                id_mol_prev = self.atoms[-1][1]
-            if len(self.bonds):
-                id_bond_prev = self.bonds[-1][0]
-
-            for imonomer in range(nper):
-                if imonomer == 0:
-                    x = self.xlo + self.random()*self.xprd
-                    y = self.ylo + self.random()*self.yprd
-                    z = self.zlo + self.random()*self.zprd
-                    ix = iy = iz = 0
-                else:
-                    restriction = True
-                    while restriction:
-                        rsq = 2.0
-                        while rsq > 1.0:
-                            dx = 2.0*self.random() - 1.0
-                            dy = 2.0*self.random() - 1.0
-                            dz = 2.0*self.random() - 1.0
-                            rsq = dx*dx + dy*dy + dz*dz
-                        r = math.sqrt(rsq)
-                        dx,dy,dz = dx/r,dy/r,dz/r
-                        x = atoms[-1][3] + dx*self.blen
-                        y = atoms[-1][4] + dy*self.blen
-                        z = atoms[-1][5] + dz*self.blen
-                        restriction = False
-                        if imonomer >= 2:
-                            dx = x - atoms[-2][3]
-                            dy = y - atoms[-2][4]
-                            dz = z - atoms[-2][5]
-                            if math.sqrt(dx*dx + dy*dy + dz*dz) <= self.dmin:
-                                restriction = True
-
-                x,y,z,ix,iy,iz = self.pbc(x,y,z,ix,iy,iz)
-                idatom = id_atom_prev + imonomer + 1
-                if self.id == "chain":
-                    idmol = id_mol_prev + 1
-                elif self.id == "end1":
-                    idmol = imonomer + 1
-                elif self.id == "end2":
-                    idmol = imonomer + 1
-                    if idmol > nper/2:
-                        idmol = nper - imonomer
-                else:
-                    raise Exception("chain ID is not a valid value")
-
-                atoms.append([idatom,idmol,self.mtype,x,y,z,ix,iy,iz])
-                if imonomer:
-                    bondid = id_bond_prev + imonomer
-                    bonds.append([bondid,self.btype,idatom-1,idatom])
-
-            self.atoms += atoms
-            self.bonds += bonds
+        if self.id not in ("chain","end1","end2"):
+            raise Exception("chain ID is not a valid value")
+        if self.legacy:
+            for ichain in range(n): self.build_legacy(nper)
+            return
+
+        if self.rng is None or self.seed != self.rngseed:
+            self.rng = np.random.default_rng(self.seed)
+            self.rngseed = self.seed
+
+        # chains up to NBLOCK long are built several at a time
+        # longer chains are built one at a time in segments of NBLOCK monomers,
+        #   each continuing the walk from the end of the previous one
+
+        if nper <= NBLOCK:
+            nblock = NBLOCK // max(1,nper)
+            for first in range(0,n,nblock):
+                m = min(nblock,n-first)
+                x,image,carry = self.walk(m,nper)
+                self.add_chains(nper,0,x,image)
+        else:
+            for ichain in range(n):
+                carry = None
+                for start in range(0,nper,NBLOCK):
+                    x,image,carry = self.walk(1,min(NBLOCK,nper-start),carry)
+                    self.add_chains(nper,start,x,image)
+
+    # --------------------------------------------------------------------
+    # add atoms and bonds of monomers start to start+k-1 of m chains of nper
+    # x,image = m x k x 3 arrays of their coords and image flags
+    # 1st monomer of a chain starts a new molecule for id = "chain"
+
+    def add_chains(self,nper,start,x,image):
+        m,k = x.shape[:2]
+
+        # molecule ID of each monomer, by chain or position in chain
+
+        imonomer = np.tile(start + np.arange(k),m)
+        if self.id == "chain":
+            idmol = self.idmol + (start == 0) + np.repeat(np.arange(m),k)
+        elif self.id == "end1":
+            idmol = imonomer + 1
+        else:
+            idmol = np.where(imonomer + 1 > nper/2,nper - imonomer,imonomer + 1)
+
+        atoms = np.empty((m*k,9))
+        atoms[:,0] = self.natoms + 1 + np.arange(m*k)
+        atoms[:,1] = idmol
+        atoms[:,2] = self.mtype
+        atoms[:,3:6] = x.reshape(-1,3)
+        atoms[:,6:9] = image.reshape(-1,3)
+
+        # bond to each monomer but the 1st of its chain from the previous one
+
+        second_atom = atoms[imonomer > 0,0]
+        bonds = np.empty((len(second_atom),4))
+        bonds[:,0] = self.nbonds + 1 + np.arange(len(bonds))
+        bonds[:,1] = self.btype
+        bonds[:,2] = second_atom - 1
+        bonds[:,3] = second_atom
+        self.add(atoms,bonds)
+
+    # --------------------------------------------------------------------
+    # random walks of m chains of nper monomers, each bond of length blen
+    # return wrapped coords and image flags as m x nper x 3 arrays
+    #   and carry = (unwrapped coords,bond rotation) of last monomer of each chain
+    # if carry is passed, walks continue from it, all nper monomers are new
+    # direction of each bond is previous one turned by a random rotation,
+    #   so all bond directions are a running product of rotations
+    # rotation = polar angle from previous bond, uniform azimuth around it
+    #   cos(polar) is uniform, as for a random unit vector,
+    #   resampled where i-1 to i+1 distance would be <= dmin
+
+    def walk(self,m,nper,carry=None):
+        rng = self.rng
+        lo = np.array([self.xlo,self.ylo,self.zlo])
+        prd = np.array([self.xprd,self.yprd,self.zprd])
+        x = np.empty((m,nper,3))
+
+        # 1st bond of a new chain is unrestricted
+
+        if carry is None:
+            x[:,0] = lo + rng.random((m,3))*prd
+            nb = nper - 1
+            nfree = 1
+            last = x[:,:1]
+            rotation = np.broadcast_to(np.eye(3),(m,3,3))
+        else:
+            nb = nper
+            nfree = 0
+            last = carry[0][:,None]
+            rotation = carry[1]
+
+        if nb > 0:
+            cos = rng.uniform(-1.0,1.0,(m,nb))
+            phi = rng.uniform(0.0,2.0*math.pi,(m,nb))
+
+            # |x(i+1) - x(i-1)| = blen * sqrt(2 + 2 cos)
+
+            cosmin = 0.5*(self.dmin/self.blen)**2 - 1.0
+            if nb > nfree and cosmin >= 1.0:
+                raise Exception("chain dmin is too large for bond length")
+            turn = cos[:,nfree:]
+            bad = turn <= cosmin
+            while bad.any():
+                turn[bad] = rng.uniform(-1.0,1.0,bad.sum())
+                bad = turn <= cosmin
+
+            # rotation for each bond maps z axis to its turn from previous bond
+
+            sin = np.sqrt(1.0 - cos*cos)
+            cphi = np.cos(phi)
+            sphi = np.sin(phi)
+            rot = np.zeros((m,nb,3,3))
+            rot[...,0,0] = cphi*cos
+            rot[...,0,1] = -sphi
+            rot[...,0,2] = cphi*sin
+            rot[...,1,0] = sphi*cos
+            rot[...,1,1] = cphi
+            rot[...,1,2] = sphi*sin
+            rot[...,2,0] = -sin
+            rot[...,2,2] = cos
+
+            product = running_product(rot)
+            if carry is not None: product = rotation[:,None] @ product
+            rotation = product[:,-1]
+            x[:,nper-nb:] = last + self.blen*np.cumsum(product[...,:,2],axis=1)
+
+        carry = (x[:,-1].copy(),rotation)
+
+        # wrap into box, same as pbc() for bonds shorter than box
+
+        image = np.floor((x - lo)/prd)
+        x -= image*prd
+        over = x >= lo + prd
+        x[over] -= np.broadcast_to(prd,x.shape)[over]
+        image[over] += 1
+        return x,image,carry
+
+    # --------------------------------------------------------------------
+    # build one chain a monomer at a time with random()
+
+    def build_legacy(self,nper):
+        atoms = []
+        bonds = []
+        id_atom_prev = self.natoms
+        id_mol_prev = self.idmol
+        id_bond_prev = self.nbonds
+
+        for imonomer in range(nper):
+            if imonomer == 0:
+                x = self.xlo + self.random()*self.xprd
+                y = self.ylo + self.random()*self.yprd
+                z = self.zlo + self.random()*self.zprd
+                ix = iy = iz = 0
+            else:
+                restriction = True
+                while restriction:
+                    rsq = 2.0
+                    while rsq > 1.0:
+                        dx = 2.0*self.random() - 1.0
+                        dy = 2.0*self.random() - 1.0
+                        dz = 2.0*self.random() - 1.0
+                        rsq = dx*dx + dy*dy + dz*dz
+                    r = math.sqrt(rsq)
+                    dx,dy,dz = dx/r,dy/r,dz/r
+                    x = atoms[-1][3] + dx*self.blen
+                    y = atoms[-1][4] + dy*self.blen
+                    z = atoms[-1][5] + dz*self.blen
+                    restriction = False
+                    if imonomer >= 2:
+                        dx = x - atoms[-2][3]
+                        dy = y - atoms[-2][4]
+                        dz = z - atoms[-2][5]
+                        if math.sqrt(dx*dx + dy*dy + dz*dz) <= self.dmin:
+                            restriction = True
+
+            x,y,z,ix,iy,iz = self.pbc(x,y,z,ix,iy,iz)
+            idatom = id_atom_prev + imonomer + 1
+            if self.id == "chain":
+                idmol = id_mol_prev + 1
+            elif self.id == "end1":
+                idmol = imonomer + 1
+            elif self.id == "end2":
+                idmol = imonomer + 1
+                if idmol > nper/2:
+                    idmol = nper - imonomer
+
+            atoms.append([idatom,idmol,self.mtype,x,y,z,ix,iy,iz])
+            if imonomer:
+                bondid = id_bond_prev + imonomer
+                bonds.append([bondid,self.btype,idatom-1,idatom])
+
+        self.add(np.array(atoms).reshape(-1,9),np.array(bonds).reshape(-1,4))
+
+    # --------------------------------------------------------------------
+    # store or stream atoms and bonds of built chains, update counts
+
+    def add(self,atoms,bonds):
+        if self.writer:
+            self.atomrows.extend(atoms)
+            self.bondrows.extend(bonds)
+        else:
+            self.atoms.append(atoms)
+            self.bonds.append(bonds)
+
+        self.natoms += len(atoms)
+        self.nbonds += len(bonds)
+        if len(atoms): self.idmol = int(atoms[-1,1])
+        self.atypes = max(self.atypes,self.mtype)
+        if len(bonds): self.btypes = max(self.btypes,self.btype)
+
+    # --------------------------------------------------------------------
+    # open data file that build() streams atoms and bonds into
+
+    def stream(self,file):
+        if self.natoms: raise Exception("chain stream() must precede build()")
+        self.open(file)
 
     # --------------------------------------------------------------------
 
-    def write(self,file):
-        if len(self.atoms) != self.n:
+    def write(self,*args):
+        if self.natoms != self.n:
             raise Exception("%d monomers instead of requested %d" % \
-                                 (len(self.atoms),self.n))
+                                 (self.natoms,self.n))
+
+        # if not streamed, stream all stored atoms and bonds to the data file
+        # header counts are set by close()
 
-        list = [atom[2] for atom in self.atoms]
-        atypes = max(list)
+        if not self.writer:
+            self.open(args[0])
+            for atoms in self.atoms: self.atomrows.extend(atoms)
+            for bonds in self.bonds: self.bondrows.extend(bonds)
 
-        btypes = 0
-        if len(self.bonds):
-            list = [bond[1] for bond in self.bonds]
-            btypes = max(list)
+        d = self.writer.data
+        d.headers["atom types"] = self.atypes
+        d.headers["bond types"] = self.btypes
+        d.sections["Masses"] = self.masses()
+        self.writer.close()
+        self.writer = None
+
+    # --------------------------------------------------------------------
+    # open data file to stream atoms and bonds into
 
-        # create the data file
+    def open(self,file):
+        self.writer = self.header().stream(file,"Atoms","Bonds")
+        self.atomrows = self.writer.section("Atoms","%d %d %d %g %g %g %d %d %d")
+        self.bondrows = self.writer.section("Bonds","%d %d %d %d")
 
+    # --------------------------------------------------------------------
+    # data object with title and box of data file
+
+    def header(self):
         d = data()
         d.title = "LAMMPS FENE chain data file"
-        d.headers["atoms"] = len(self.atoms)
-        d.headers["bonds"] = len(self.bonds)
-        d.headers["atom types"] = atypes
-        d.headers["bond types"] = btypes
         d.headers["xlo xhi"] = (self.xlo,self.xhi)
         d.headers["ylo yhi"] = (self.ylo,self.yhi)
         d.headers["zlo zhi"] = (self.zlo,self.zhi)
+        return d
 
-        lines = []
-        for i in range(atypes): lines.append("%d 1.0\n" % (i+1))
-        d.sections["Masses"] = lines
-
-        lines = []
-        for atom in self.atoms:
-            line = "%d %d %d %g %g %g %d %d %d\n" % \
-                   (atom[0], atom[1], atom[2], atom[3], atom[4], atom[5],
-                    atom[6], atom[7], atom[8])
-            lines.append(line)
-        d.sections["Atoms"] = lines
+    # --------------------------------------------------------------------
+    # lines of Masses section, mass = 1.0 for each atom type
 
+    def masses(self):
         lines = []
-        for bond in self.bonds:
-            line = "%d %d %d %d\n" % (bond[0], bond[1], bond[2], bond[3])
-            lines.append(line)
-        d.sections["Bonds"] = lines
-
-        d.write(file)
+        for i in range(self.atypes): lines.append("%d 1.0\n" % (i+1))
+        return lines
 
     # --------------------------------------------------------------------
 
@@ -229,12 +423,34 @@ class chain:
     # --------------------------------------------------------------------
 
     def random(self):
-        k = self.seed/IQ
+        k = self.seed//IQ
         self.seed = IA*(self.seed-k*IQ) - IR*k
         if self.seed < 0:
             self.seed += IM
         return AM*self.seed
 
+# --------------------------------------------------------------------
+# running product of rotation matrices along 2nd to last axis of rot
+# out[...,i,:,:] = rot[...,0,:,:] @ ... @ rot[...,i,:,:]
+# products are formed within segments of NSEG matrices,
+#   then each segment is multiplied by running product of all segments before it
+
+NSEG = 16
+
+def running_product(rot):
+    n = rot.shape[-3]
+    nseg = -(-n // NSEG)
+    out = np.empty(rot.shape[:-3] + (nseg*NSEG,3,3))
+    out[...,:n,:,:] = rot
+    out[...,n:,:,:] = np.eye(3)
+    seg = out.reshape(rot.shape[:-3] + (nseg,NSEG,3,3))
+    for i in range(1,NSEG):
+        seg[...,i,:,:] = seg[...,i-1,:,:] @ seg[...,i,:,:]
+    if nseg > 1:
+        before = running_product(seg[...,:-1,NSEG-1,:,:])
+        seg[...,1:,:,:,:] = before[...,None,:,:] @ seg[...,1:,:,:,:]
+    return out[...,:n,:,:]
+
 # --------------------------------------------------------------------
 # random # generator constants
 
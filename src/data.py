@@ -22,6 +22,13 @@ q = d.get("Atoms",4)
   1 arg = all columns returned as 2d array of floats
   2 args = Nth column returned as vector of floats
 
+a = d.section("Atoms")           return section as 2d array, not a copy
+rows = d.rows(ids)               return Atoms row index of each atom ID
+
+  sections are parsed once into 2d arrays when data file is read
+  sections that are not all numeric (e.g. Bodies) are kept as lines
+  rows() uses an ID index, so atoms need not be sorted by ID
+
 d.reorder("Atoms",1,3,2,4,5)     reorder columns (1-N) in a data file section
 
   1,3,2,4,5 = new order of previous columns, can delete columns this way
@@ -29,6 +36,7 @@ d.reorder("Atoms",1,3,2,4,5)     reorder columns (1-N) in a data file section
 d.title = "My LAMMPS data file"  set title of the data file
 d.headers["atoms"] = 1500        set a header value
 d.sections["Bonds"] = lines      set a section to list of lines (with newlines)
+d.sections["Bonds"] = array      set a section to 2d array of values
 d.delete("bonds")                delete a keyword or section of data file
 d.delete("Bonds")
 d.replace("Atoms",5,vec)         replace Nth column of section with vector
@@ -39,6 +47,7 @@ d.newxyz(dmp,1000)               replace xyz in Atoms with xyz of snapshot N
 
 index,time,flag = d.iterator(0/1)          loop over single data file snapshot
 time,box,atoms,bonds,tris,lines = d.viz(index)   return list of viz objects
+time,box,atoms,bonds,tris,lines = d.viz_arrays(index)   return 2d arrays
 
   iterator() and viz() are compatible with equivalent dump calls
   iterator() called with arg = 0 first time, with arg = 1 on subsequent calls
@@ -53,13 +62,32 @@ time,box,atoms,bonds,tris,lines = d.viz(index)   return list of viz objects
       NULL if bonds do not exist
     tris = NULL
     lines = NULL
+  viz_arrays() returns same info as 2d NumPy arrays, no rows for NULL
 
 d.write("data.new")             write a LAMMPS data file
+
+w = d.stream("data.new","Atoms","Bonds")   stream sections to a data file
+rows = w.section("Atoms",fmt)   buffer of rows for section, fmt is optional
+rows.append(row)                append one row (list of values) to section
+rows.extend(array)              append all rows of a 2d array to section
+w.close()                       finish streamed data file
+
+  streamed rows are buffered and written in blocks, so few are in memory
+  fmt is a np.savetxt() format for the lines of that section
+  close() sets header counts of streamed sections, writes d.headers
+    and the other sections in d.sections
+
+  write() converts arrays to text, integer-valued columns are written as ints
+    "#" comments of rows read from a file are written after them
+    as long as the # of rows in the section is unchanged
 """
 
 # History
 #   8/05, Steve Plimpton (SNL): original version
 #   11/07, added triclinic box support
+#   10/26, sections stored as parsed 2d arrays, ID index for atom lookup
+#   10/26, streamed writing of large sections via stream()
+#   10/26, "#" comments of section rows kept and written back
 
 # ToDo list
 
@@ -67,16 +95,27 @@ d.write("data.new")             write a LAMMPS data file
 #   title = 1st line of data file
 #   names = dictionary with atom attributes as keys, col #s as values
 #   headers = dictionary with header name as key, value or tuple as values
-#   sections = dictionary with section name as key, array of lines as values
+#   sections = dictionary with section name as key, 2d array as values
+#     or list of lines if section was set that way or is not all numeric
+#   comments = dictionary with section name as key, list of "#" comment
+#     of each row as values, or None if the section has no comments
+#   idindex = (Atoms array,its IDs,sorted order of IDs) cached by rows()
 #   nselect = 1 = # of snapshots
 
 # Imports and external programs
 
+import io, shutil, tempfile
 from os import popen
+import numpy as np
+import vizarray
 
 try: tmp = PIZZA_GUNZIP
 except: PIZZA_GUNZIP = "gunzip"
 
+NBUFFER = 100000          # rows per block of a streamed section
+HEADER_LINES = 32         # lines of space reserved for streamed header
+HEADER_LINE = 63          # width of each reserved line
+
 # Class definition
 
 class data:
@@ -91,6 +130,8 @@ class data:
             self.names = {}
             self.headers = {}
             self.sections = {}
+            self.comments = {}
+            self.idindex = None
             return
 
         file = list[0]
@@ -123,6 +164,7 @@ class data:
                 break
 
         sections = {}
+        comments = {}
         while 1:
             found = 0
             for pair in skeywords:
@@ -134,7 +176,9 @@ class data:
                     f.readline()
                     list = []
                     for i in range(headers[length]): list.append(f.readline())
-                    sections[keyword] = list
+                    sections[keyword] = parse_lines(list)
+                    if isinstance(sections[keyword],np.ndarray):
+                        comments[keyword] = line_comments(list)
             if not found:
                 raise Exception("invalid section %s in data file" % line)
             f.readline()
@@ -146,6 +190,8 @@ class data:
         f.close()
         self.headers = headers
         self.sections = sections
+        self.comments = comments
+        self.idindex = None
 
     # --------------------------------------------------------------------
     # assign names to atom columns
@@ -162,56 +208,59 @@ class data:
 
     def get(self,*list):
         if len(list) == 1:
-            field = list[0]
-            array = []
-            lines = self.sections[field]
-            for line in lines:
-                words = line.split()
-                values = list(map(float,words))
-                array.append(values)
-            return array
+            return self.section(list[0]).copy()
         elif len(list) == 2:
-            field = list[0]
-            n = list[1] - 1
-            vec = []
-            lines = self.sections[field]
-            for line in lines:
-                words = line.split()
-                vec.append(float(words[n]))
-            return vec
+            return self.section(list[0])[:,list[1]-1].copy()
         else:
             raise Exception("invalid arguments for data.get()")
 
+    # --------------------------------------------------------------------
+    # return named section as 2d array
+    # a section set as list of lines is parsed and stored back as an array
+
+    def section(self,name):
+        values = self.sections[name]
+        if isinstance(values,np.ndarray): return values
+        array = parse_lines(values)
+        if not isinstance(array,np.ndarray):
+            raise Exception("data section %s is not all numeric" % name)
+        self.sections[name] = array
+        self.comments[name] = line_comments(values)
+        return array
+
+    # --------------------------------------------------------------------
+    # return row index in Atoms section of each atom ID in ids
+    # sorted ID index is built once and reused until Atoms changes
+
+    def rows(self,ids):
+        atoms = self.section("Atoms")
+        if self.idindex is None or self.idindex[0] is not atoms:
+            atomids = atoms[:,self.names["id"]]
+            self.idindex = (atoms,atomids,np.argsort(atomids,kind="stable"))
+        atoms,atomids,order = self.idindex
+        ids = np.asarray(ids,dtype=np.float64)
+        if not len(atomids):
+            raise Exception("atom ID not found in Atoms section")
+        pos = np.searchsorted(atomids,ids,sorter=order)
+        pos[pos == len(atomids)] = 0
+        index = order[pos]
+        if not np.all(atomids[index] == ids):
+            raise Exception("atom ID not found in Atoms section")
+        return index
+
     # --------------------------------------------------------------------
     # reorder columns in a data file field
 
     def reorder(self,name,*order):
-        n = len(order)
-        natoms = len(self.sections[name])
-        oldlines = self.sections[name]
-        newlines = natoms*[""]
-        for index in order:
-            for i in range(len(newlines)):
-                words = oldlines[i].split()
-                newlines[i] += words[index-1] + " "
-        for i in range(len(newlines)):
-            newlines[i] += "\n"
-        self.sections[name] = newlines
+        cols = [index-1 for index in order]
+        self.sections[name] = self.section(name)[:,cols]
 
     # --------------------------------------------------------------------
     # replace a column of named section with vector of values
 
     def replace(self,name,icol,vector):
-        lines = self.sections[name]
-        newlines = []
-        j = icol - 1
-        for i in range(len(lines)):
-            line = lines[i]
-            words = line.split()
-            words[j] = str(vector[i])
-            newline = ' '.join(words) + '\n'
-            newlines.append(newline)
-        self.sections[name] = newlines
+        self.section(name)[:,icol-1] = vector
+        if name == "Atoms": self.idindex = None
 
     # --------------------------------------------------------------------
     # replace x,y,z in Atoms with x,y,z values from snapshot ntime of dump object
@@ -240,7 +289,10 @@ class data:
     def delete(self,keyword):
 
         if keyword in self.headers: del self.headers[keyword]
-        elif keyword in self.sections: del self.sections[keyword]
+        elif keyword in self.sections:
+            del self.sections[keyword]
+            self.comments.pop(keyword,None)
+            if keyword == "Atoms": self.idindex = None
         else: raise Exception("keyword not found in data object")
 
     # --------------------------------------------------------------------
@@ -249,25 +301,20 @@ class data:
     def write(self,file):
         f = open(file,"w")
         print(self.title, file=f)
-        for keyword in hkeywords:
-            if keyword in self.headers:
-                if keyword == "xlo xhi" or keyword == "ylo yhi" or \
-                       keyword == "zlo zhi":
-                    pair = self.headers[keyword]
-                    print(pair[0],pair[1],keyword, file=f)
-                elif keyword == "xy xz yz":
-                    triple = self.headers[keyword]
-                    print(triple[0],triple[1],triple[2],keyword, file=f)
-                else:
-                    print(self.headers[keyword],keyword, file=f)
+        write_headers(f,self.headers)
         for pair in skeywords:
             keyword = pair[0]
             if keyword in self.sections:
-                print("\n%s\n" % keyword, file=f)
-                for line in self.sections[keyword]:
-                    print(line, end=' ', file=f)
+                write_section(f,keyword,self.sections[keyword],
+                              self.comments.get(keyword))
         f.close()
 
+    # --------------------------------------------------------------------
+    # open a LAMMPS data file for streamed output of named sections
+
+    def stream(self,file,*names):
+        return datastream(self,file,names)
+
     # --------------------------------------------------------------------
     # iterator called from other tools
 
@@ -286,49 +333,37 @@ class data:
     # return list of atoms and bonds to viz for data object
 
     def viz(self,isnap):
+        time,box,atoms,bonds,tris,lines = self.viz_arrays(isnap)
+        return [time,box] + vizarray.lists(atoms,bonds,tris,lines)
+
+    # --------------------------------------------------------------------
+    # return 2d arrays of atoms and bonds to viz for data object
+    # bond atoms are looked up by ID, so atoms need not be sorted
+
+    def viz_arrays(self,isnap):
         if isnap: raise Exception("cannot call data.viz() with isnap != 0")
 
-        id = self.names["id"]
-        type = self.names["type"]
-        x = self.names["x"]
-        y = self.names["y"]
-        z = self.names["z"]
+        cols = [self.names["id"],self.names["type"],
+                self.names["x"],self.names["y"],self.names["z"]]
 
         xlohi = self.headers["xlo xhi"]
         ylohi = self.headers["ylo yhi"]
         zlohi = self.headers["zlo zhi"]
         box = [xlohi[0],ylohi[0],zlohi[0],xlohi[1],ylohi[1],zlohi[1]]
 
-        # create atom list needed by viz from id,type,x,y,z
-
-        atoms = []
-        atomlines = self.sections["Atoms"]
-        for line in atomlines:
-            words = line.split()
-            atoms.append([int(words[id]),int(words[type]),
-                          float(words[x]),float(words[y]),float(words[z])])
-
-        # create list of current bond coords from list of bonds
-        # assumes atoms are sorted so can lookup up the 2 atoms in each bond
-
-        bonds = []
-        if "Bonds" in self.sections:
-            bondlines = self.sections["Bonds"]
-            for line in bondlines:
-                words = line.split()
-                bid,btype   = int(words[0]),int(words[1])
-                atom1,atom2 = int(words[2]),int(words[3])
-                atom1words  = atomlines[atom1-1].split()
-                atom2words  = atomlines[atom2-1].split()
-                bonds.append([bid,btype,
-                              float(atom1words[x]),float(atom1words[y]),
-                              float(atom1words[z]),
-                              float(atom2words[x]),float(atom2words[y]),
-                              float(atom2words[z]),
-                              float(atom1words[type]),float(atom2words[type])])
-
-        tris = []
-        lines = []
+        atoms = np.zeros((0,vizarray.NATOM))
+        if len(self.section("Atoms")): atoms = self.section("Atoms")[:,cols]
+
+        bonds = np.zeros((0,vizarray.NBOND))
+        if "Bonds" in self.sections and len(self.section("Bonds")):
+            bondlist = self.section("Bonds")
+            i = self.rows(bondlist[:,2])
+            j = self.rows(bondlist[:,3])
+            bonds = np.column_stack((bondlist[:,0:2],atoms[i,2:5],atoms[j,2:5],
+                                     atoms[i,1],atoms[j,1]))
+
+        tris = np.zeros((0,vizarray.NTRI))
+        lines = np.zeros((0,vizarray.NLINE))
         return 0,box,atoms,bonds,tris,lines
 
     # --------------------------------------------------------------------
@@ -346,6 +381,189 @@ class data:
     def maxtype(self):
         return self.headers["atom types"]
 
+# --------------------------------------------------------------------
+# parse lines of a data file section into 2d array of floats
+# text after "#" is ignored
+# return lines unchanged if they are not a table of numbers
+
+def parse_lines(lines):
+    if not lines: return np.zeros((0,0))
+    try: return np.loadtxt(lines,dtype=np.float64,comments="#",ndmin=2)
+    except ValueError: return lines
+
+# --------------------------------------------------------------------
+# return "#" comment of each line, "" for lines without one
+# return None if no line has a comment
+
+def line_comments(lines):
+    if not any("#" in line for line in lines): return None
+    return [line[line.index("#"):].rstrip() if "#" in line else ""
+            for line in lines]
+
+# --------------------------------------------------------------------
+# write 2d array of section values to open file, one line per row
+# columns with all integer values are written as ints
+# comments = "#" comment to append to each row, ignored if # of rows differs
+
+def write_array(f,array,comments=None):
+    if not len(array): return
+    integer = np.all(array == np.floor(array),axis=0)
+    fmt = ["%d" if flag else "%.16g" for flag in integer]
+    if comments is None or len(comments) != len(array):
+        np.savetxt(f,array,fmt=fmt)
+        return
+    text = io.StringIO()
+    np.savetxt(text,array,fmt=fmt)
+    rows = text.getvalue().split("\n")
+    f.writelines([row + " " + comment + "\n" if comment else row + "\n"
+                  for row,comment in zip(rows,comments)])
+
+# --------------------------------------------------------------------
+# write header values in hkeywords order to open file
+
+def write_headers(f,headers):
+    for keyword in hkeywords:
+        if keyword in headers:
+            if keyword == "xlo xhi" or keyword == "ylo yhi" or \
+                   keyword == "zlo zhi":
+                pair = headers[keyword]
+                print(pair[0],pair[1],keyword, file=f)
+            elif keyword == "xy xz yz":
+                triple = headers[keyword]
+                print(triple[0],triple[1],triple[2],keyword, file=f)
+            else:
+                print(headers[keyword],keyword, file=f)
+
+# --------------------------------------------------------------------
+# write one section, as 2d array or list of lines, to open file
+# comments = "#" comments of rows of a 2d array, or None
+
+def write_section(f,keyword,values,comments=None):
+    print("\n%s\n" % keyword, file=f)
+    if isinstance(values,np.ndarray): write_array(f,values,comments)
+    else:
+        for line in values: print(line, end=' ', file=f)
+
+# --------------------------------------------------------------------
+# streamed output of a LAMMPS data file
+# rows of each streamed section are buffered in fixed-size arrays
+#   and written in blocks of nbuffer rows
+# 1st streamed section is written directly after space reserved for header
+# other streamed sections go to temporary files, appended by close()
+# close() fills in header, with counts of streamed rows,
+#   then appends non-streamed sections of data object
+
+class datastream:
+
+    def __init__(self,d,file,names):
+        self.data = d
+        self.names = names
+        self.nbuffer = NBUFFER
+        self.f = open(file,"w")
+        print(d.title, file=self.f)
+        self.headerpos = self.f.tell()
+        self.f.write((HEADER_LINE*" " + "\n")*HEADER_LINES)
+        self.buffers = {}
+        for name in names: self.buffers[name] = streambuffer(self,name)
+
+    # return buffer for named section, set format of its lines if specified
+
+    def section(self,name,fmt=None):
+        buffer = self.buffers[name]
+        if fmt: buffer.fmt = fmt
+        return buffer
+
+    # flush all buffers, write headers and remaining sections, close file
+
+    def close(self):
+        headers = self.data.headers
+        for name in self.names:
+            buffer = self.buffers[name]
+            buffer.flush()
+            if buffer.n:
+                for pair in skeywords:
+                    if pair[0] == name: headers[pair[1]] = buffer.n
+
+        f = self.f
+        for pair in skeywords:
+            keyword = pair[0]
+            if keyword == self.names[0]: continue
+            if keyword in self.buffers:
+                tmp = self.buffers[keyword].file
+                if tmp:
+                    tmp.seek(0)
+                    shutil.copyfileobj(tmp,f)
+                    tmp.close()
+            elif keyword in self.data.sections:
+                write_section(f,keyword,self.data.sections[keyword],
+                              self.data.comments.get(keyword))
+
+        text = io.StringIO()
+        write_headers(text,headers)
+        text = text.getvalue()
+        nreserve = (HEADER_LINE+1)*HEADER_LINES
+        if len(text) > nreserve:
+            raise Exception("data file header does not fit in reserved space")
+        f.seek(self.headerpos)
+        f.write(text)
+
+        # pad rest of reserved space with blank lines of at most HEADER_LINE
+
+        nline,extra = divmod(nreserve-len(text),HEADER_LINE+1)
+        f.write((HEADER_LINE*" " + "\n")*nline)
+        if extra: f.write((extra-1)*" " + "\n")
+        f.close()
+
+# --------------------------------------------------------------------
+# fixed-size array buffer of rows for one streamed data file section
+# len() = # of rows appended so far
+
+class streambuffer:
+
+    def __init__(self,stream,name):
+        self.stream = stream
+        self.name = name
+        self.fmt = None
+        self.array = None
+        self.nbuf = 0
+        self.n = 0
+        self.file = None
+
+    def __len__(self):
+        return self.n
+
+    def append(self,row):
+        if self.array is None:
+            self.array = np.zeros((self.stream.nbuffer,len(row)))
+        elif self.nbuf == len(self.array): self.flush()
+        self.array[self.nbuf] = row
+        self.nbuf += 1
+        self.n += 1
+
+    def extend(self,rows):
+        rows = np.asarray(rows,dtype=np.float64)
+        if not len(rows): return
+        if self.array is None:
+            self.array = np.zeros((self.stream.nbuffer,rows.shape[1]))
+        i = 0
+        while i < len(rows):
+            if self.nbuf == len(self.array): self.flush()
+            m = min(len(rows)-i,len(self.array)-self.nbuf)
+            self.array[self.nbuf:self.nbuf+m] = rows[i:i+m]
+            self.nbuf += m
+            i += m
+        self.n += len(rows)
+
+    def flush(self):
+        if not self.nbuf: return
+        if self.file is None:
+            if self.name == self.stream.names[0]: self.file = self.stream.f
+            else: self.file = tempfile.TemporaryFile("w+")
+            print("\n%s\n" % self.name, file=self.file)
+        if self.fmt: np.savetxt(self.file,self.array[:self.nbuf],fmt=self.fmt)
+        else: write_array(self.file,self.array[:self.nbuf])
+        self.nbuf = 0
+
 # --------------------------------------------------------------------
 # data file keywords, both header and main sections
 
@@ -19,6 +19,9 @@ d = dump("dump.*",0)              two args = store filenames, but don't read
   incomplete and duplicate snapshots are deleted
   atoms will be unscaled if stored in files as scaled
   self-describing column names assigned
+  atoms of a snapshot are read from its file when first used,
+    so files should not be changed while d exists (except gzipped ones)
+    a non-number in a row after the 1st is only found then, error names snapshot
 
 time = d.next()                   read next snapshot from dump files
 
@@ -116,6 +119,7 @@ fx,fy,... = d.vecs(1000,"fx","fy",...)  return vector(s) for timestep N
 
 index,time,flag = d.iterator(0/1)          loop over dump snapshots
 time,box,atoms,bonds,tris,lines = d.viz(index)   return list of viz objects
+time,box,atoms,bonds,tris,lines = d.viz_arrays(index)   return 2d arrays
 d.atype = "color"                          set column returned as "type" by viz
 d.extra(obj)                               extract bond/tri/line info from obj
 
@@ -135,6 +139,8 @@ d.extra(obj)                               extract bond/tri/line info from obj
       if extra() used to define tris, else NULL
     lines = id,type,x1,y1,z1,x2,y2,z2 for each line as 2d array
       if extra() used to define lines, else NULL
+  viz_arrays() returns same info as viz() but as 2d NumPy arrays
+    one row per atom/bond/tri/line, no rows if none exist
   atype is column name viz() will return as atom type (def = "type")
   extra() extracts bonds/tris/lines from obj each time viz() is called
     obj can be data object for bonds, cdata object for tris and lines,
@@ -145,9 +151,10 @@ d.extra(obj)                               extract bond/tri/line info from obj
 # History
 #   8/05, Steve Plimpton (SNL): original version
 #   12/09, David Hart (SNL): allow use of NumPy or Numeric
+#   10/26, snapshots read via dumpread, atoms parsed in bulk on 1st use
+#   10/26, owrap() via ID lookup on atoms array, passes IDs to objextra
 
 # ToDo list
-#   try to optimize this line in read_snap: words += f.readline().split()
 #   allow $name in aselect.test() and set() to end with non-space
 #   should next() snapshot be auto-unscaled ?
 
@@ -166,11 +173,11 @@ d.extra(obj)                               extract bond/tri/line info from obj
 #   aselect = class for atom selection
 #   atype = name of vector used as atom type by viz extract
 #   bondflag = 0 if no bonds, 1 if they are defined statically, 2 if dynamic
-#   bondlist = static list of bonds to return w/ viz() for all snapshots
+#   bondlist = static array of bonds to return w/ viz() for all snapshots
 #   triflag = 0 if no tris, 1 if they are defined statically, 2 if dynamic
-#   trilist = static list of tris to return w/ viz() for all snapshots
+#   trilist = static array of tris to return w/ viz() for all snapshots
 #   lineflag = 0 if no lines, 1 if they are defined statically, 2 if dynamic
-#   linelist = static list of lines to return w/ viz() for all snapshots
+#   linelist = static array of lines to return w/ viz() for all snapshots
 #   objextra = object to get bonds,tris,lines from dynamically
 #   Snap = one snapshot
 #     time = time stamp
@@ -186,7 +193,6 @@ d.extra(obj)                               extract bond/tri/line info from obj
 # Imports and external programs
 
 import sys, subprocess, re, glob, types
-from os import popen
 from math import *             # any function could be used by set()
 
 try:
@@ -196,8 +202,7 @@ except:
     import Numeric as np
     oldnumeric = True
 
-try: from DEFAULTS import PIZZA_GUNZIP
-except: PIZZA_GUNZIP = "gunzip"
+import vizarray, dumpread
 
 # Class definition
 
@@ -241,27 +246,18 @@ class dump:
     def read_all(self):
 
         # read all snapshots from each file
-        # test for gzipped files
+        # atoms of each snapshot are read on 1st use
 
         for file in self.flist:
-            if file[-3:] == ".gz":
-                f = popen("%s -c %s" % (PIZZA_GUNZIP,file),'r')
-            else: f = open(file)
-
-            snap = self.read_snapshot(f)
-            while snap:
+            for snap in dumpread.snapshots(file,Snap,self.read_header,1):
                 self.snaps.append(snap)
                 print(snap.time, end=' ')
                 sys.stdout.flush()
-                snap = self.read_snapshot(f)
-
-            f.close()
         print()
 
         # sort entries by timestep, cull duplicates
 
-        self.snaps.sort(key = lambda s: s.time) #self.compare_time)
-        self.cull()
+        dumpread.sort_cull(self.snaps)
         self.nsnaps = len(self.snaps)
         print("read %d snapshots" % self.nsnaps)
 
@@ -299,9 +295,9 @@ class dump:
         # if new snapshot time stamp already exists, read next snapshot
 
         while 1:
-            f = open(self.flist[self.nextfile],'rb')
+            f = dumpread.open_file(self.flist[self.nextfile])
             f.seek(self.eof)
-            snap = self.read_snapshot(f)
+            snap = dumpread.read_snapshot(f,Snap(),self.read_header)
             if not snap:
                 self.nextfile += 1
                 if self.nextfile == len(self.flist): return -1
@@ -328,99 +324,77 @@ class dump:
         return snap.time
 
     # --------------------------------------------------------------------
-    # read a single snapshot from file f
-    # return snapshot or 0 if failed
+    # read header of a snapshot from file f, after its timestep
+    # return name of snap attribute for the atoms and # of atoms
     # for first snapshot only:
     #   assign column names (file must be self-describing)
     #   set scale_original to 0/1/-1 for unscaled/scaled/unknown
     #   convert xs,xu to x in names
 
-    def read_snapshot(self,f):
-        try:
-            snap = Snap()
-            item = f.readline()
-            snap.time = int(f.readline().split()[0])    # just grab 1st field
-            item = f.readline()
-            snap.natoms = int(f.readline())
-
-            snap.aselect = np.zeros(snap.natoms)
-
-            item = f.readline()
-            words = item.split("BOUNDS ")
-            if len(words) == 1: snap.boxstr = ""
-            else: snap.boxstr = words[1].strip()
-            if "xy" in snap.boxstr: snap.triclinic = 1
-            else: snap.triclinic = 0
-
-            words = f.readline().split()
-            if len(words) == 2:
-                snap.xlo,snap.xhi,snap.xy = float(words[0]),float(words[1]),0.0
-            else:
-                snap.xlo,snap.xhi,snap.xy = \
-                    float(words[0]),float(words[1]),float(words[2])
+    def read_header(self,f,snap):
+        item = dumpread.readline(f)
+        snap.natoms = int(dumpread.readline(f))
 
-            words = f.readline().split()
-            if len(words) == 2:
-                snap.ylo,snap.yhi,snap.xz = float(words[0]),float(words[1]),0.0
-            else:
-                snap.ylo,snap.yhi,snap.xz = \
-                    float(words[0]),float(words[1]),float(words[2])
+        snap.aselect = np.zeros(snap.natoms)
 
-            words = f.readline().split()
-            if len(words) == 2:
-                snap.zlo,snap.zhi,snap.yz = float(words[0]),float(words[1]),0.0
-            else:
-                snap.zlo,snap.zhi,snap.yz = \
-                    float(words[0]),float(words[1]),float(words[2])
-
-            item = f.readline()
-            if len(self.names) == 0:
-                self.scale_original = -1
-                xflag = yflag = zflag = -1
-                words = item.split()[2:]
-                if len(words):
-                    for i in range(len(words)):
-                        if words[i] == "x" or words[i] == "xu":
-                            xflag = 0
-                            self.names["x"] = i
-                        elif words[i] == "xs" or words[i] == "xsu":
-                            xflag = 1
-                            self.names["x"] = i
-                        elif words[i] == "y" or words[i] == "yu":
-                            yflag = 0
-                            self.names["y"] = i
-                        elif words[i] == "ys" or words[i] == "ysu":
-                            yflag = 1
-                            self.names["y"] = i
-                        elif words[i] == "z" or words[i] == "zu":
-                            zflag = 0
-                            self.names["z"] = i
-                        elif words[i] == "zs" or words[i] == "zsu":
-                            zflag = 1
-                            self.names["z"] = i
-                        else: self.names[words[i]] = i
-                    if xflag == 0 and yflag == 0 and zflag == 0: self.scale_original = 0
-                    if xflag == 1 and yflag == 1 and zflag == 1: self.scale_original = 1
-
-            if snap.natoms:
-                words = f.readline().split()
-                ncol = len(words)
-                for i in range(1,snap.natoms):
-                    words += f.readline().split()
-                floats = list(map(float,words))
-                if oldnumeric: atoms = np.zeros((snap.natoms,ncol),np.Float)
-                else: atoms = np.zeros((snap.natoms,ncol),np.float)
-                start = 0
-                stop = ncol
-                for i in range(snap.natoms):
-                    atoms[i] = floats[start:stop]
-                    start = stop
-                    stop += ncol
-            else: atoms = None
-            snap.atoms = atoms
-            return snap
-        except:
-            return 0
+        item = dumpread.readline(f)
+        words = item.split("BOUNDS ")
+        if len(words) == 1: snap.boxstr = ""
+        else: snap.boxstr = words[1].strip()
+        if "xy" in snap.boxstr: snap.triclinic = 1
+        else: snap.triclinic = 0
+
+        words = dumpread.readline(f).split()
+        if len(words) == 2:
+            snap.xlo,snap.xhi,snap.xy = float(words[0]),float(words[1]),0.0
+        else:
+            snap.xlo,snap.xhi,snap.xy = \
+                float(words[0]),float(words[1]),float(words[2])
+
+        words = dumpread.readline(f).split()
+        if len(words) == 2:
+            snap.ylo,snap.yhi,snap.xz = float(words[0]),float(words[1]),0.0
+        else:
+            snap.ylo,snap.yhi,snap.xz = \
+                float(words[0]),float(words[1]),float(words[2])
+
+        words = dumpread.readline(f).split()
+        if len(words) == 2:
+            snap.zlo,snap.zhi,snap.yz = float(words[0]),float(words[1]),0.0
+        else:
+            snap.zlo,snap.zhi,snap.yz = \
+                float(words[0]),float(words[1]),float(words[2])
+
+        item = dumpread.readline(f)
+        if len(self.names) == 0:
+            self.scale_original = -1
+            xflag = yflag = zflag = -1
+            words = item.split()[2:]
+            if len(words):
+                for i in range(len(words)):
+                    if words[i] == "x" or words[i] == "xu":
+                        xflag = 0
+                        self.names["x"] = i
+                    elif words[i] == "xs" or words[i] == "xsu":
+                        xflag = 1
+                        self.names["x"] = i
+                    elif words[i] == "y" or words[i] == "yu":
+                        yflag = 0
+                        self.names["y"] = i
+                    elif words[i] == "ys" or words[i] == "ysu":
+                        yflag = 1
+                        self.names["y"] = i
+                    elif words[i] == "z" or words[i] == "zu":
+                        zflag = 0
+                        self.names["z"] = i
+                    elif words[i] == "zs" or words[i] == "zsu":
+                        zflag = 1
+                        self.names["z"] = i
+                    else: self.names[words[i]] = i
+                if xflag == 0 and yflag == 0 and zflag == 0: self.scale_original = 0
+                if xflag == 1 and yflag == 1 and zflag == 1: self.scale_original = 1
+
+        return "atoms",snap.natoms
 
     # --------------------------------------------------------------------
     # map atom column names
@@ -456,7 +430,8 @@ class dump:
             x = self.names["x"]
             y = self.names["y"]
             z = self.names["z"]
-            for snap in self.snaps: self.scale_one(snap,x,y,z)
+            for snap in self.snaps:
+                dumpread.apply(snap,"atoms",self.scale_one,x,y,z)
         else:
             i = self.findtime(list[0])
             x = self.names["x"]
@@ -472,7 +447,7 @@ class dump:
             yprdinv = 1.0 / (snap.yhi - snap.ylo)
             zprdinv = 1.0 / (snap.zhi - snap.zlo)
             atoms = snap.atoms
-            if atoms != None:
+            if atoms is not None:
                 atoms[:,x] = (atoms[:,x] - snap.xlo) * xprdinv
                 atoms[:,y] = (atoms[:,y] - snap.ylo) * yprdinv
                 atoms[:,z] = (atoms[:,z] - snap.zlo) * zprdinv
@@ -502,7 +477,7 @@ class dump:
             h4inv = (h3*h5 - h1*h4) / (h0*h1*h2)
             h5inv = xy / (h0*h1)
             atoms = snap.atoms
-            if atoms != None:
+            if atoms is not None:
                 atoms[:,x] = (atoms[:,x] - snap.xlo)*h0inv + \
                     (atoms[:,y] - snap.ylo)*h5inv + \
                     (atoms[:,z] - snap.zlo)*h4inv
@@ -520,7 +495,8 @@ class dump:
             x = self.names["x"]
             y = self.names["y"]
             z = self.names["z"]
-            for snap in self.snaps: self.unscale_one(snap,x,y,z)
+            for snap in self.snaps:
+                dumpread.apply(snap,"atoms",self.unscale_one,x,y,z)
         else:
             i = self.findtime(list[0])
             x = self.names["x"]
@@ -536,7 +512,7 @@ class dump:
             yprd = snap.yhi - snap.ylo
             zprd = snap.zhi - snap.zlo
             atoms = snap.atoms
-            if atoms != None:
+            if atoms is not None:
                 atoms[:,x] = snap.xlo + atoms[:,x]*xprd
                 atoms[:,y] = snap.ylo + atoms[:,y]*yprd
                 atoms[:,z] = snap.zlo + atoms[:,z]*zprd
@@ -560,7 +536,7 @@ class dump:
             h4 = xz
             h5 = xy
             atoms = snap.atoms
-            if atoms != None:
+            if atoms is not None:
                 atoms[:,x] = snap.xlo + atoms[:,x]*h0 + atoms[:,y]*h5 + atoms[:,z]*h4
                 atoms[:,y] = snap.ylo + atoms[:,y]*h1 + atoms[:,z]*h3
                 atoms[:,z] = snap.zlo + atoms[:,z]*h2
@@ -625,22 +601,23 @@ class dump:
         iz = self.names["iz"]
         iother = self.names[other]
 
+        # j = index of atom that each atom I is wrapped to, via ID lookup
+        # shift I by difference in image flags of I and J
+
         for snap in self.snaps:
-            xprd = snap.xhi - snap.xlo
-            yprd = snap.yhi - snap.ylo
-            zprd = snap.zhi - snap.zlo
+            if not snap.natoms: continue
+            prd = [snap.xhi-snap.xlo,snap.yhi-snap.ylo,snap.zhi-snap.zlo]
             atoms = snap.atoms
-            ids = {}
-            for i in range(snap.natoms):
-                ids[atoms[i][id]] = i
-            for i in range(snap.natoms):
-                j = ids[atoms[i][iother]]
-                atoms[i][x] += (atoms[i][ix]-atoms[j][ix])*xprd
-                atoms[i][y] += (atoms[i][iy]-atoms[j][iy])*yprd
-                atoms[i][z] += (atoms[i][iz]-atoms[j][iz])*zprd
+            ids = atoms[:,id]
+            j,found = vizarray.lookup(ids,atoms[:,iother])
+            if not found.all():
+                raise Exception("owrap() atom ID in %s column not found" % other)
+            image = atoms[:,[ix,iy,iz]]
+            atoms[:,[x,y,z]] += (image - image[j])*prd
             # should bonds also be owrapped ?
             if self.lineflag == 2 or self.triflag == 2:
-                self.objextra.owrap(snap.time,xprd,yprd,zprd,ids,atoms,iother,ix,iy,iz)
+                self.objextra.owrap(snap.time,prd[0],prd[1],prd[2],
+                                    ids,atoms,iother,ix,iy,iz)
 
     # --------------------------------------------------------------------
     # convert column names assignment to a string, in column order
@@ -957,28 +934,6 @@ class dump:
             newatoms[:,0:ncol] = snap.atoms
             snap.atoms = newatoms
 
-    # --------------------------------------------------------------------
-    # sort snapshots on time stamp
-
-    def compare_time(self,a,b):
-        if a.time < b.time:
-            return -1
-        elif a.time > b.time:
-            return 1
-        else:
-            return 0
-
-    # --------------------------------------------------------------------
-    # delete successive snapshots with duplicate time stamp
-
-    def cull(self):
-        i = 1
-        while i < len(self.snaps):
-            if self.snaps[i].time == self.snaps[i-1].time:
-                del self.snaps[i]
-            else:
-                i += 1
-
     # --------------------------------------------------------------------
     # iterate over selected snapshots
 
@@ -997,6 +952,15 @@ class dump:
     # augment with bonds, tris, lines if extra() was invoked
 
     def viz(self,index,flag=0):
+        time,box,atoms,bonds,tris,lines = self.viz_arrays(index,flag)
+        atoms,bonds,tris,lines = vizarray.lists(atoms,bonds,tris,lines)
+        return time,box,atoms,bonds,tris,lines
+
+    # --------------------------------------------------------------------
+    # return 2d arrays of atoms,bonds,tris,lines to viz for snapshot isnap
+    # same columns as viz() lists, one row per object
+
+    def viz_arrays(self,index,flag=0):
         if not flag: isnap = index
         else:
             times = self.time()
@@ -1017,66 +981,56 @@ class dump:
         y = self.names["y"]
         z = self.names["z"]
 
-        # create atom list needed by viz from id,type,x,y,z
-        # need Numeric/Numpy mode here
+        # create atom array needed by viz from id,type,x,y,z of selected atoms
 
-        atoms = []
-        for i in range(snap.natoms):
-            if not snap.aselect[i]: continue
-            atom = snap.atoms[i]
-            atoms.append([atom[id],atom[type],atom[x],atom[y],atom[z]])
-
-        # create list of bonds from static or dynamic bond list
-        # then generate bond coords from bondlist
-        # alist = dictionary of atom IDs for atoms list
-        # lookup bond atom IDs in alist and grab their coords
-        # try is used since some atoms may be unselected
-        #   any bond with unselected atom is not added to bonds
-        # need Numeric/Numpy mode here
-
-        bonds = []
+        if snap.natoms:
+            select = np.asarray(snap.aselect) != 0
+            atoms = snap.atoms[select][:,[id,type,x,y,z]]
+        else: atoms = np.zeros((0,vizarray.NATOM))
+
+        # create bonds from static or dynamic bond list
+        # lookup bond atom IDs in atom IDs and grab their coords
+        # any bond with unselected atom is not added to bonds
+
+        bonds = np.zeros((0,vizarray.NBOND))
         if self.bondflag:
             if self.bondflag == 1: bondlist = self.bondlist
             elif self.bondflag == 2:
-                tmp1,tmp2,tmp3,bondlist,tmp4,tmp5 = self.objextra.viz(time,1)
-            alist = {}
-            for i in range(len(atoms)): alist[int(atoms[i][0])] = i
-            for bond in bondlist:
-                try:
-                    i = alist[bond[2]]
-                    j = alist[bond[3]]
-                    atom1 = atoms[i]
-                    atom2 = atoms[j]
-                    bonds.append([bond[0],bond[1],atom1[2],atom1[3],atom1[4],
-                                  atom2[2],atom2[3],atom2[4],atom1[1],atom2[1]])
-                except: continue
-
-        # create list of tris from static or dynamic tri list
+                bondlist = vizarray.viz_arrays(self.objextra,time,1)[3]
+            if len(bondlist):
+                ids = atoms[:,0].astype(np.int64)
+                i,found1 = vizarray.lookup(ids,bondlist[:,2].astype(np.int64))
+                j,found2 = vizarray.lookup(ids,bondlist[:,3].astype(np.int64))
+                keep = found1 & found2
+                i = i[keep]
+                j = j[keep]
+                bonds = np.column_stack((bondlist[keep,0:2],atoms[i,2:5],
+                                         atoms[j,2:5],atoms[i,1],atoms[j,1]))
+
+        # create tris from static or dynamic tri list
         # if dynamic, could eliminate tris for unselected atoms
 
-        tris = []
+        tris = np.zeros((0,vizarray.NTRI))
         if self.triflag:
             if self.triflag == 1: tris = self.trilist
             elif self.triflag == 2:
-                tmp1,tmp2,tmp3,tmp4,tris,tmp5 = self.objextra.viz(time,1)
+                tris = vizarray.viz_arrays(self.objextra,time,1)[4]
 
-        # create list of lines from static or dynamic tri list
+        # create lines from static or dynamic tri list
         # if dynamic, could eliminate lines for unselected atoms
 
-        lines = []
+        lines = np.zeros((0,vizarray.NLINE))
         if self.lineflag:
             if self.lineflag == 1: lines = self.linelist
             elif self.lineflag == 2:
-                tmp1,tmp2,tmp3,tmp4,tmp5,lines = self.objextra.viz(time,1)
+                lines = vizarray.viz_arrays(self.objextra,time,1)[5]
 
         return time,box,atoms,bonds,tris,lines
 
     # --------------------------------------------------------------------
 
     def findtime(self,n):
-        for i in range(self.nsnaps):
-            if self.snaps[i].time == n: return i
-        raise Exception("no step %d exists" % n)
+        return dumpread.findtime(self,n)
 
     # --------------------------------------------------------------------
     # return maximum box size across all selected snapshots
@@ -1119,15 +1073,10 @@ class dump:
         if type(arg) is types.InstanceType and ".data" in str(arg.__class__):
             self.bondflag = 0
             try:
-                bondlist = []
-                bondlines = arg.sections["Bonds"]
-                for line in bondlines:
-                    words = line.split()
-                    bondlist.append([int(words[0]),int(words[1]),
-                                     int(words[2]),int(words[3])])
-                if bondlist:
+                bondlist = arg.section("Bonds")
+                if len(bondlist):
                     self.bondflag = 1
-                    self.bondlist = bondlist
+                    self.bondlist = bondlist[:,0:4].astype(int)
             except:
                 raise Exception("could not extract bonds from data object")
 
@@ -1136,11 +1085,11 @@ class dump:
         elif type(arg) is types.InstanceType and ".cdata" in str(arg.__class__):
             self.triflag = self.lineflag = 0
             try:
-                tmp,tmp,tmp,tmp,tris,lines = arg.viz(0)
-                if tris:
+                tmp,tmp,tmp,tmp,tris,lines = vizarray.viz_arrays(arg,0)
+                if len(tris):
                     self.triflag = 1
                     self.trilist = tris
-                if lines:
+                if len(lines):
                     self.lineflag = 1
                     self.linelist = lines
             except:
@@ -1187,7 +1136,8 @@ class dump:
 # one snapshot
 
 class Snap:
-    pass
+    def __getattr__(self,name):
+        return dumpread.load(self,name)
 
 # --------------------------------------------------------------------
 # time selection class
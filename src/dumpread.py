@@ -0,0 +1,193 @@
+# Pizza.py toolkit, www.cs.sandia.gov/~sjplimp/pizza.html
+# Steve Plimpton, sjplimp@sandia.gov, Sandia National Laboratories
+#
+# Copyright (2005) Sandia Corporation.  Under the terms of Contract
+# DE-AC04-94AL85000 with Sandia Corporation, the U.S. Government retains
+# certain rights in this software.  This software is distributed under
+# the GNU General Public License.
+
+# dumpread functions, not a top-level Pizza.py tool
+# snapshot reading shared by dump, bdump, ldump, tdump, mdump
+
+# History
+#   10/26: original version
+
+# ToDo list
+
+# Variables
+#   header(f,snap) = hook of each dump tool, called by read_snapshot()
+#     reads all lines of a snapshot after its timestep, through "ITEM:" line
+#     that precedes the data rows, sets header values in snap
+#     returns (name,n) = snap attribute that holds data rows, # of rows
+#   snap.pending = (file,offset,name,n,ops) for a snapshot not yet loaded
+#     ops = list of (func,args) to apply to snap after its rows are read
+#   LOCK = held while a pending snapshot is loaded or ops are queued on it
+#     so threads, e.g. vcr prefetch and main, can share a dump object
+#   obj.timeindex = (nindex,last,dict) for findtime()
+#     dict = time stamp -> index in obj.snaps, for 1st nindex snapshots
+#     last = snapshot nindex-1, to detect a changed list of snapshots
+
+# Imports and external programs
+
+import gzip, threading
+from itertools import islice
+import numpy as np
+
+LOCK = threading.RLock()    # serializes load() and apply() across threads
+
+# --------------------------------------------------------------------
+# open a dump file for reading as bytes
+# gzipped files are decompressed in-process
+
+def open_file(file):
+    if file[-3:] == ".gz": return gzip.open(file,'rb')
+    return open(file,'rb')
+
+# --------------------------------------------------------------------
+# yield each snapshot in file, snap = new object of snapclass
+# if lazy, data rows are only indexed, read on 1st use via load()
+# gzipped files are always read in full, seeking in them is slow
+
+def snapshots(file,snapclass,header,lazy=0):
+    if file[-3:] == ".gz": lazy = 0
+    f = open_file(file)
+    try:
+        while 1:
+            snap = read_snapshot(f,snapclass(),header,lazy and file)
+            if not snap: break
+            yield snap
+    finally: f.close()
+
+# --------------------------------------------------------------------
+# read one header line of a snapshot as a string
+
+def readline(f):
+    return f.readline().decode()
+
+# --------------------------------------------------------------------
+# read a single snapshot from file f into snap via header hook
+# if file is set, skip rows and store their offset in file for load()
+# return snap or 0 if failed (end of file or incomplete snapshot)
+
+def read_snapshot(f,snap,header,file=None):
+    try:
+        item = f.readline()
+        if not item: return 0
+        snap.time = int(f.readline().split()[0])    # just grab 1st field
+        name,n = header(f,snap)
+        if file and n:
+            offset = f.tell()
+            skip_rows(f,n)
+            snap.pending = (file,offset,name,n,[])
+        else: setattr(snap,name,read_rows(f,n))
+        return snap
+    except Exception:
+        return 0
+
+# --------------------------------------------------------------------
+# read n lines of whitespace-separated numbers as an n x ncol float array
+# return None if n = 0
+# raise exception if fewer than n lines, lines have differing # of values
+#   or a value is not a number
+
+def read_rows(f,n):
+    if n == 0: return None
+    first = f.readline()
+    ncol = len(first.split())
+    data = first + b"".join(islice(f,n-1))
+    try: values = np.fromstring(data,sep=" ")
+    except ValueError: values = None
+    if ncol == 0 or values is None or len(values) != n*ncol:
+        raise Exception("incomplete or ragged rows in dump snapshot")
+    return values.reshape(n,ncol)
+
+# --------------------------------------------------------------------
+# skip n lines w/out converting them to numbers
+# same checks as read_rows(), except only values of 1st line must be numbers
+# raise exception if fewer than n lines, lines have differing # of values
+#   or a value of 1st line is not a number
+
+def skip_rows(f,n):
+    first = f.readline()
+    words = first.split()
+    data = b"".join(islice(f,n-1))
+    nlines = data.count(b"\n") + (not data.endswith(b"\n") and len(data) > 0)
+    if not words or nlines < n-1 or \
+       len(words) + count_words(data) != n*len(words):
+        raise Exception("incomplete or ragged rows in dump snapshot")
+    try:
+        for word in words: float(word)
+    except ValueError:
+        raise Exception("incomplete or ragged rows in dump snapshot")
+
+# --------------------------------------------------------------------
+# return # of whitespace-separated words in bytes data
+# a word starts at each byte above space that follows a byte at or below it
+
+def count_words(data):
+    chars = np.frombuffer(data,dtype=np.uint8) > 32
+    if not len(chars): return 0
+    return int(chars[0]) + int(np.count_nonzero(chars[1:] > chars[:-1]))
+
+# --------------------------------------------------------------------
+# read rows of a pending snapshot, apply its queued ops
+# called by __getattr__() of a tool's Snap class for a missing attribute
+# rows may have been loaded by another thread while waiting for LOCK
+# values past 1st row are only checked here, error names file and time stamp
+
+def load(snap,name):
+    with LOCK:
+        if name in snap.__dict__: return snap.__dict__[name]
+        pending = snap.__dict__.get("pending")
+        if not pending or name != pending[2]: raise AttributeError(name)
+        file,offset,name,n,ops = pending
+        f = open_file(file)
+        try:
+            f.seek(offset)
+            rows = read_rows(f,n)
+        except Exception as error:
+            raise Exception("snapshot %d of %s: %s" % (snap.time,file,error))
+        finally: f.close()
+        del snap.pending
+        setattr(snap,name,rows)
+        for func,args in ops: func(snap,*args)
+        return rows
+
+# --------------------------------------------------------------------
+# apply func(snap,*args) to data rows name of snap
+# if those rows are not yet read, queue it to be applied when they are
+
+def apply(snap,name,func,*args):
+    with LOCK:
+        pending = snap.__dict__.get("pending")
+        if pending and pending[2] == name: pending[4].append((func,args))
+        else: func(snap,*args)
+
+# --------------------------------------------------------------------
+# sort snapshots by time stamp, delete all but 1st of duplicate time stamps
+# sort is stable, so 1st is from earliest file in the list
+
+def sort_cull(snaps):
+    snaps.sort(key = lambda s: s.time)
+    snaps[:] = [snap for i,snap in enumerate(snaps)
+                if i == 0 or snap.time != snaps[i-1].time]
+
+# --------------------------------------------------------------------
+# return index of snapshot in obj.snaps with time stamp n
+# dict of time stamps is extended when snapshots are appended
+#   and rebuilt when the list of snapshots has otherwise changed
+
+def findtime(obj,n):
+    snaps = obj.snaps
+    nindex,last,index = obj.__dict__.get("timeindex",(0,None,{}))
+    if len(snaps) < nindex or (nindex and snaps[nindex-1] is not last):
+        nindex,index = 0,{}
+    for i in range(nindex,len(snaps)): index.setdefault(snaps[i].time,i)
+    if snaps: obj.timeindex = (len(snaps),snaps[-1],index)
+
+    i = index.get(n)
+    if i is not None and snaps[i].time != n:
+        obj.timeindex = (0,None,{})
+        return findtime(obj,n)
+    if i is None: raise Exception("no step %d exists" % n)
+    return i
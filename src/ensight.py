@@ -53,6 +53,8 @@ e.single(N)          same args as one() prepended by N, but write a single snap
 # Imports and external programs
 
 import sys, types
+import numpy as np
+import vizarray
 
 # Class definition
 
@@ -115,7 +117,7 @@ class ensight:
 
             if self.which == 0:
                 print("BEGIN TIME STEP", file=f)
-                time,box,atoms,bonds,tris,lines = self.data.viz(which)
+                time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(self.data,which)
                 self.coord_file_atoms(f,box,atoms)
                 print("END TIME STEP", file=f)
             elif self.change == 0 and first:
@@ -189,7 +191,7 @@ class ensight:
 
             if self.which == 0:
                 print("BEGIN TIME STEP", file=f)
-                time,box,atoms,bonds,tris,lines = self.data.viz(0)
+                time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(self.data,0)
                 self.coord_file_atoms(f,box,atoms)
                 print("END TIME STEP", file=f)
             elif self.change == 0 and first:
@@ -285,7 +287,7 @@ class ensight:
 
             if self.which == 0:
                 f = open(file,"w")
-                time,box,atoms,bonds,tris,lines = self.data.viz(which)
+                time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(self.data,which)
                 self.coord_file_atoms(f,box,atoms)
                 f.close()
             elif self.change == 0 and first:
@@ -346,7 +348,7 @@ class ensight:
 
         f = open(root + ".xyz","w")
         if self.which == 0:
-            time,box,atoms,bonds,tris,lines = self.data.viz(which)
+            time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(self.data,which)
             self.coord_file_atoms(f,box,atoms)
         else:
             time,box,nodes,elements,nvalues,evalues = self.data.mviz(which)
@@ -431,20 +433,19 @@ class ensight:
         print("%12.5e%12.5e" % (box[1],box[4]), file=f)
         print("%12.5e%12.5e" % (box[2],box[5]), file=f)
 
+        itypes = atoms[:,1].astype(int)
         for type in range(1,self.maxtype+1):
             print("part", file=f)
             print("%10d" % type, file=f)
             print("type",type, file=f)
             print("coordinates", file=f)
-            group = [atom for atom in atoms if int(atom[1]) == type]
+            group = atoms[itypes == type]
             print("%10d" % len(group), file=f)
-            for atom in group: print("%10d" % int(atom[0]), file=f)
-            for atom in group: print("%12.5e" % atom[2], file=f)
-            for atom in group: print("%12.5e" % atom[3], file=f)
-            for atom in group: print("%12.5e" % atom[4], file=f)
+            np.savetxt(f,group[:,0].astype(int),fmt="%10d")
+            np.savetxt(f,group[:,2:5].T.reshape(-1),fmt="%12.5e")
             print("point", file=f)
             print("%10d" % len(group), file=f)
-            for i in range(1,len(group)+1): print("%10d" % i, file=f)
+            np.savetxt(f,np.arange(1,len(group)+1),fmt="%10d")
 
     # --------------------------------------------------------------------
     # write Ensight coordinates for elements
@@ -490,13 +491,14 @@ class ensight:
 
     def variable_file_atoms(self,f,name,atoms,values):
         print("Particle %s" % name, file=f)
+        itypes = atoms[:,1].astype(int)
+        values = np.asarray(values,dtype=np.float64)
         for type in range(1,self.maxtype+1):
             print("part", file=f)
             print("%10d" % type, file=f)
             print("coordinates", file=f)
-            group = [values[i] for i in range(len(atoms))
-                     if int(atoms[i][1]) == type]
-            for value in group: print("%12.5e" % value, file=f)
+            group = values[itypes == type]
+            np.savetxt(f,group,fmt="%12.5e")
 
     # --------------------------------------------------------------------
     # write Ensight variable values for elements
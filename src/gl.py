@@ -85,12 +85,17 @@ g.axis(0/1)                 turn xyz axes off/on
 g.ortho(0/1)                perspective (0) vs orthographic (1) view
 g.clip('xlo',0.25)          clip in xyz from lo/hi at box fraction (0-1)
 g.reload()                  force all data to be reloaded
+g.preload = 0/1             reload() stores all frames or only their times (def = 1)
 g.cache = 0/1               turn off/on GL cache lists (def = on)
+g.arrays = 0/1              turn off/on NumPy vertex-array drawing (def = on)
 theta,phi,x,y,scale,up = g.gview()   grab all current view parameters
 g.sview(theta,phi,x,y,scale,up)      set all view parameters
 
   data reload is necessary if dump selection is used to change the data
+  preload = 0 extracts each frame from data when vcr displays it
   cache lists usually improve graphics performance
+  vertex arrays draw all atoms/bonds/tris/lines of a frame in a few GL calls
+    arrays = 0 reverts to drawing each object via its own GL calls
   gview returns values to use in other commands:
     theta,phi are args to rotate()
     x,y are args to shift()
@@ -100,6 +105,7 @@ g.sview(theta,phi,x,y,scale,up)      set all view parameters
 
 # History
 #   9/05, Steve Plimpton (SNL): original version
+#   10/26: vertex-array drawing of atoms, bonds, tris, lines via NumPy
 
 # ToDo list
 #   when do aselect with select str while looping N times on same timestep
@@ -121,14 +127,21 @@ g.sview(theta,phi,x,y,scale,up)      set all view parameters
 #   view[3] = direction towards eye in simulation box (unit vector)
 #   up[3] = screen up direction in simulation box (unit vector)
 #   right[3] = screen right direction in simulation box (unit vector)
+#   preload = 0/1 if reload() stores only frame times or all frames
+#   arrays = 0/1 for drawing via per-object GL calls or NumPy vertex arrays
+#   sphere_verts,sphere_faces = unit sphere mesh replicated for each atom
+#   cylinder_verts,cylinder_faces = unit cylinder mesh replicated for each bond
+#   atomdraw,bonddraw,tridraw,linedraw = 2d arrays from viz_arrays() for frame
 
 # Imports and external programs
 
 from math import sin,cos,sqrt,pi,acos
+import numpy as np
 from OpenGL.Tk import *
 from OpenGL.GLUT import *
 import Image
 from vizinfo import vizinfo
+import vizarray
 
 # Class definition
 
@@ -179,6 +192,8 @@ class gl:
         self.calllist = [0]         # indexed by 1-Ntype, so start with 0 index
         self.cache = 1
         self.cachelist = 0
+        self.arrays = 1
+        self.preload = 1
 
         self.boxdraw = []
         self.atomdraw = []
@@ -512,6 +527,7 @@ class gl:
         data = self.data
 
         self.timeframes = []
+        self.whichframes = []
         self.boxframes = []
         self.atomframes = []
         self.bondframes = []
@@ -525,27 +541,46 @@ class gl:
         while 1:
             which,time,flag = data.iterator(flag)
             if flag == -1: break
-            time,boxone,atoms,bonds,tris,lines = data.viz(which)
-            if self.boxflag < 2: box = boxone
-            if bonds: self.bonds_augment(bonds)
-
             self.timeframes.append(time)
-            self.boxframes.append(box)
-            self.atomframes.append(atoms)
-            self.bondframes.append(bonds)
-            self.triframes.append(tris)
-            self.lineframes.append(lines)
+            self.whichframes.append(which)
+
+            if self.preload:
+                time,boxone,atoms,bonds,tris,lines = vizarray.viz_arrays(data,which)
+                if self.boxflag < 2: box = boxone
+                self.boxframes.append(box)
+                self.atomframes.append(atoms)
+                self.bondframes.append(bonds)
+                self.triframes.append(tris)
+                self.lineframes.append(lines)
 
             print(time, end=' ')
             sys.stdout.flush()
         print()
 
         self.nframes = len(self.timeframes)
-        self.distance = compute_distance(self.boxframes[0])
-        self.center = compute_center(self.boxframes[0])
+        if self.preload: box = self.boxframes[0]
+        else: box = self.fetch(0)[1]
+        self.distance = compute_distance(box)
+        self.center = compute_center(box)
         self.ready = 1
         self.setview()
 
+    # --------------------------------------------------------------------
+    # return time,box,atoms,bonds,tris,lines for frame index
+    # from frames stored by reload() or extracted from data on demand
+    # can be called from a non-GUI thread, e.g. by vcr prefetch
+
+    def fetch(self,index):
+        if self.preload:
+            return (self.timeframes[index],self.boxframes[index],
+                    self.atomframes[index],self.bondframes[index],
+                    self.triframes[index],self.lineframes[index])
+
+        data = self.data
+        time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(data,self.whichframes[index])
+        if self.boxflag == 2: box = data.maxbox()
+        return time,box,atoms,bonds,tris,lines
+
     # --------------------------------------------------------------------
 
     def nolabel(self):
@@ -559,13 +594,11 @@ class gl:
     def show(self,ntime):
         data = self.data
         which = data.findtime(ntime)
-        time,box,atoms,bonds,tris,lines = data.viz(which)
+        time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(data,which)
         if self.boxflag == 2: box = data.maxbox()
         self.distance = compute_distance(box)
         self.center = compute_center(box)
 
-        if bonds: self.bonds_augment(bonds)
-
         self.boxdraw = box
         self.atomdraw = atoms
         self.bonddraw = bonds
@@ -625,7 +658,7 @@ class gl:
                 if self.select != "":
                     newstr = self.select % fraction
                     data.aselect.test(newstr,time)
-                time,boxone,atoms,bonds,tris,lines = data.viz(which)
+                time,boxone,atoms,bonds,tris,lines = vizarray.viz_arrays(data,which)
 
                 if self.boxflag < 2: box = boxone
                 if n == nstart: self.distance = compute_distance(box)
@@ -646,8 +679,6 @@ class gl:
 
                 if n == nstart or self.panflag: self.center = compute_center(box)
 
-                if bonds: self.bonds_augment(bonds)
-
                 self.boxdraw = box
                 self.atomdraw = atoms
                 self.bonddraw = bonds
@@ -680,7 +711,7 @@ class gl:
                 if self.select != "":
                     newstr = self.select % fraction
                     data.aselect.test(newstr,ntime)
-                time,boxone,atoms,bonds,tris,lines = data.viz(which)
+                time,boxone,atoms,bonds,tris,lines = vizarray.viz_arrays(data,which)
 
                 if self.boxflag < 2: box = boxone
                 if n == nstart: self.distance = compute_distance(box)
@@ -701,8 +732,6 @@ class gl:
 
                 if n == nstart or self.panflag: self.center = compute_center(box)
 
-                if bonds: self.bonds_augment(bonds)
-
                 self.boxdraw = box
                 self.atomdraw = atoms
                 self.bonddraw = bonds
@@ -723,17 +752,21 @@ class gl:
 
     # --------------------------------------------------------------------
 
-    def display(self,index):
-        self.boxdraw = self.boxframes[index]
-        self.atomdraw = self.atomframes[index]
-        self.bonddraw = self.bondframes[index]
-        self.tridraw = self.triframes[index]
-        self.linedraw = self.lineframes[index]
+    # frame = already fetched frame for index, else fetch it now
+
+    def display(self,index,frame=None):
+        if not frame: frame = self.fetch(index)
+        time,box,atoms,bonds,tris,lines = frame
+        self.boxdraw = box
+        self.atomdraw = atoms
+        self.bonddraw = bonds
+        self.tridraw = tris
+        self.linedraw = lines
 
         self.ready = 1
         self.cachelist = -self.cachelist
         self.w.tkRedraw()
-        return (self.timeframes[index],len(self.atomdraw))
+        return (time,len(self.atomdraw))
 
     # --------------------------------------------------------------------
     # draw the GL scene
@@ -782,18 +815,20 @@ class gl:
                 if self.clipflag: self.draw_box(1)
             if self.axisflag: self.draw_axes()
 
-            ncolor = self.vizinfo.nlcolor
-            for line in self.linedraw:
-                itype = int(line[1])
-                if itype > ncolor: raise Exception("line type too big")
-                red,green,blue = self.vizinfo.lcolor[itype]
-                glColor3f(red,green,blue)
-                thick = self.vizinfo.lrad[itype]
-                glLineWidth(thick)
-                glBegin(GL_LINES)
-                glVertex3f(line[2],line[3],line[4])
-                glVertex3f(line[5],line[6],line[7])
-                glEnd()
+            if self.arrays: self.draw_lines_arrays()
+            else:
+                ncolor = self.vizinfo.nlcolor
+                for line in self.linedraw:
+                    itype = int(line[1])
+                    if itype > ncolor: raise Exception("line type too big")
+                    red,green,blue = self.vizinfo.lcolor[itype]
+                    glColor3f(red,green,blue)
+                    thick = self.vizinfo.lrad[itype]
+                    glLineWidth(thick)
+                    glBegin(GL_LINES)
+                    glVertex3f(line[2],line[3],line[4])
+                    glVertex3f(line[5],line[6],line[7])
+                    glEnd()
 
             glEnable(GL_LIGHTING)
 
@@ -809,6 +844,7 @@ class gl:
 # multiple timesteps via vcr::play() is still not fast
 #  caching makes it fast for single frame, but multiple frames is slow
 # need to enable clipping
+# vertex arrays (arrays = 1) address the vcr::play() speed issue
 
 #      if not self.clipflag:
 #        glDisable(GL_LIGHTING)
@@ -822,13 +858,17 @@ class gl:
 #        glEnd()
 #        glEnable(GL_LIGHTING)
 
-            if not self.clipflag:
+            if self.arrays: self.draw_arrays()
+
+            elif not self.clipflag:
                 for atom in self.atomdraw:
                     glTranslatef(atom[2],atom[3],atom[4]);
                     glCallList(self.calllist[int(atom[1])]);
                     glTranslatef(-atom[2],-atom[3],-atom[4]);
 
-                if self.bonddraw:
+                if len(self.bonddraw):
+                    if len(self.bonddraw[0]) == 10:
+                        self.bonddraw = bonds_augment(self.bonddraw)
                     bound = 0.25 * self.distance
                     ncolor = self.vizinfo.nbcolor
                     for bond in self.bonddraw:
@@ -846,7 +886,7 @@ class gl:
                         gluCylinder(obj,rad,rad,bond[10],self.nsides,self.nsides)
                         glPopMatrix()
 
-                if self.tridraw:
+                if len(self.tridraw):
                     fillflag = self.vizinfo.tfill[int(self.tridraw[0][1])]
 
                     if fillflag != 1:
@@ -901,7 +941,9 @@ class gl:
                         glCallList(self.calllist[int(atom[1])]);
                         glTranslatef(-x,-y,-z);
 
-                if self.bonddraw:
+                if len(self.bonddraw):
+                    if len(self.bonddraw[0]) == 10:
+                        self.bonddraw = bonds_augment(self.bonddraw)
                     bound = 0.25 * self.distance
                     ncolor = self.vizinfo.nbcolor
                     for bond in self.bonddraw:
@@ -927,7 +969,7 @@ class gl:
                             gluCylinder(obj,rad,rad,bond[10],self.nsides,self.nsides)
                             glPopMatrix()
 
-                if self.tridraw:
+                if len(self.tridraw):
                     fillflag = self.vizinfo.tfill[int(self.tridraw[0][1])]
 
                     if fillflag != 1:
@@ -1018,21 +1060,155 @@ class gl:
             glutSolidSphere(rad,self.nslices,self.nstacks)
             glEndList()
 
+        self.make_meshes()
+
     # --------------------------------------------------------------------
-    # augment bond info returned by viz() with info needed for GL draw
-    # info = length, theta, -dy, dx for bond orientation
-
-    def bonds_augment(self,bonds):
-        for bond in bonds:
-            dx = bond[5] - bond[2]
-            dy = bond[6] - bond[3]
-            dz = bond[7] - bond[4]
-            length = sqrt(dx*dx + dy*dy + dz*dz)
-            dx /= length
-            dy /= length
-            dz /= length
-            theta = acos(dz)*180.0/pi
-            bond += [length,theta,-dy,dx]
+    # make unit sphere and cylinder meshes used by vertex-array drawing
+    # sphere = nstacks x nslices quads from pole to pole, like glutSolidSphere
+    # cylinder = nsides quads around z axis, from z = 0 to z = 1
+
+    def make_meshes(self):
+        theta = np.linspace(0.0,pi,self.nstacks+1)
+        phi = np.linspace(0.0,2.0*pi,self.nslices+1)
+        t,p = np.meshgrid(theta,phi,indexing="ij")
+        self.sphere_verts = np.stack((np.sin(t)*np.cos(p),np.sin(t)*np.sin(p),
+                                      np.cos(t)),axis=-1).reshape(-1,3)
+        self.sphere_faces = quad_faces(self.nstacks,self.nslices)
+
+        phi = np.linspace(0.0,2.0*pi,self.nsides+1)
+        self.cylinder_verts = np.column_stack((np.cos(phi),np.sin(phi)))
+        self.cylinder_faces = quad_faces(1,self.nsides)
+
+    # --------------------------------------------------------------------
+    # draw atoms, bonds, triangles from NumPy vertex arrays
+    # each atom = copy of unit sphere mesh, scaled by radius, shifted to x,y,z
+    # each bond = copy of unit cylinder mesh, oriented along the bond
+    # color array drives emission material, as glMaterialfv does per object
+
+    def draw_arrays(self):
+        vizinfo = self.vizinfo
+        atoms = vizarray.array(self.atomdraw,vizarray.NATOM)
+        bonds = vizarray.array(self.bonddraw,vizarray.NBOND)
+        tris = vizarray.array(self.tridraw,vizarray.NTRI)
+
+        if self.clipflag:
+            lo,hi = self.clip_bounds()
+            atoms = atoms[inside_box(atoms[:,2:5],lo,hi)]
+            bonds = bonds[inside_box(bonds[:,2:5],lo,hi) &
+                          inside_box(bonds[:,5:8],lo,hi)]
+            tris = tris[inside_box(tris[:,2:5],lo,hi) &
+                        inside_box(tris[:,5:8],lo,hi) &
+                        inside_box(tris[:,8:11],lo,hi)]
+
+        glEnable(GL_COLOR_MATERIAL)
+        glColorMaterial(GL_FRONT_AND_BACK,GL_EMISSION)
+        glMaterialf(GL_FRONT_AND_BACK,GL_SHININESS,self.shiny)
+
+        if len(atoms):
+            itypes = atoms[:,1].astype(np.int32)
+            if itypes.max() > vizinfo.nacolor: raise Exception("atom type too big")
+            color = type_table(vizinfo.acolor,3)[itypes]
+            rad = type_table(vizinfo.arad,1)[itypes]
+            unit = self.sphere_verts
+            nvert = len(unit)
+            verts = atoms[:,None,2:5] + rad[:,None,:]*unit[None,:,:]
+            norms = np.broadcast_to(unit,verts.shape)
+            colors = np.repeat(color,nvert,axis=0)
+            draw_mesh(verts,norms,colors,replicate_faces(self.sphere_faces,
+                                                         len(atoms),nvert))
+
+        if len(bonds):
+            delta = bonds[:,5:8] - bonds[:,2:5]
+            length = np.sqrt((delta*delta).sum(axis=1))
+            keep = (length <= 0.25*self.distance) & (length > 0.0)
+            bonds,delta,length = bonds[keep],delta[keep],length[keep]
+
+        if len(bonds):
+            itypes = bonds[:,1].astype(np.int32)
+            if itypes.max() > vizinfo.nbcolor: raise Exception("bond type too big")
+            color = type_table(vizinfo.bcolor,3)[itypes]
+            rad = type_table(vizinfo.brad,1)[itypes]
+
+            # u,v = unit vectors perpendicular to bond direction w
+
+            w = delta / length[:,None]
+            ref = np.zeros(w.shape)
+            ref[:,0] = 1.0
+            ref[np.fabs(w[:,0]) > 0.9] = [0.0,1.0,0.0]
+            u = np.cross(w,ref)
+            u /= np.sqrt((u*u).sum(axis=1))[:,None]
+            v = np.cross(w,u)
+
+            circle = self.cylinder_verts
+            nvert = 2*len(circle)
+            radial = circle[None,:,0,None]*u[:,None,:] + \
+                circle[None,:,1,None]*v[:,None,:]
+            ends = np.array([0.0,1.0])
+            verts = bonds[:,None,None,2:5] + \
+                ends[None,:,None,None]*delta[:,None,None,:] + \
+                rad[:,None,None,:]*radial[:,None,:,:]
+            norms = np.broadcast_to(radial[:,None,:,:],verts.shape)
+            colors = np.repeat(color,nvert,axis=0)
+            draw_mesh(verts,norms,colors,replicate_faces(self.cylinder_faces,
+                                                         len(bonds),nvert))
+
+        if len(tris):
+            itypes = tris[:,1].astype(np.int32)
+            if itypes.max() > vizinfo.ntcolor: raise Exception("tri type too big")
+            fillflag = vizinfo.tfill[int(tris[0,1])]
+            verts = tris[:,2:11].reshape(-1,3)
+
+            if fillflag != 1:
+                if fillflag:
+                    glEnable(GL_POLYGON_OFFSET_FILL)
+                    glPolygonOffset(1.0,1.0)
+                norms = np.repeat(tris[:,11:14],3,axis=0)
+                colors = np.repeat(type_table(vizinfo.tcolor,3)[itypes],3,axis=0)
+                draw_mesh(verts,norms,colors,None)
+                if fillflag: glDisable(GL_POLYGON_OFFSET_FILL)
+
+            if fillflag:
+                glDisable(GL_COLOR_MATERIAL)
+                glDisable(GL_LIGHTING)
+                glPolygonMode(GL_FRONT_AND_BACK,GL_LINE)
+                glLineWidth(self.bxthick)
+                glColor3f(self.bxcol[0],self.bxcol[1],self.bxcol[2])
+                draw_mesh(verts,None,None,None)
+                glEnable(GL_LIGHTING)
+                glPolygonMode(GL_FRONT_AND_BACK,GL_FILL)
+
+        glDisable(GL_COLOR_MATERIAL)
+
+    # --------------------------------------------------------------------
+    # draw lines from NumPy vertex arrays, one draw per line type
+    # since line width cannot vary within a single draw
+
+    def draw_lines_arrays(self):
+        lines = vizarray.array(self.linedraw,vizarray.NLINE)
+        if not len(lines): return
+        itypes = lines[:,1].astype(np.int32)
+        if itypes.max() > self.vizinfo.nlcolor: raise Exception("line type too big")
+        color = type_table(self.vizinfo.lcolor,3)
+
+        for itype in np.unique(itypes):
+            sub = lines[itypes == itype]
+            glLineWidth(self.vizinfo.lrad[itype])
+            verts = sub[:,2:8].reshape(-1,3)
+            colors = np.repeat(color[itype:itype+1],len(verts),axis=0)
+            draw_mesh(verts,None,colors,None,GL_LINES)
+
+    # --------------------------------------------------------------------
+    # return lo,hi corners of clip box as 3-vectors
+
+    def clip_bounds(self):
+        box = self.boxdraw
+        lo = [box[0] + self.clipxlo*(box[3] - box[0]),
+              box[1] + self.clipylo*(box[4] - box[1]),
+              box[2] + self.clipzlo*(box[5] - box[2])]
+        hi = [box[0] + self.clipxhi*(box[3] - box[0]),
+              box[1] + self.clipyhi*(box[4] - box[1]),
+              box[2] + self.clipzhi*(box[5] - box[2])]
+        return np.array(lo),np.array(hi)
 
     # --------------------------------------------------------------------
 
@@ -1258,6 +1434,73 @@ class MyOpengl(Opengl):
         self.tkRedraw()
         self.tkRecordMouse(event)
 
+# --------------------------------------------------------------------
+# augment bond array from viz_arrays() with info needed for GL draw
+# info = length, theta, -dy, dx for bond orientation
+
+def bonds_augment(bonds):
+    delta = bonds[:,5:8] - bonds[:,2:5]
+    length = np.sqrt((delta*delta).sum(axis=1))
+    delta /= length[:,None]
+    theta = np.arccos(delta[:,2])*180.0/pi
+    return np.column_stack((bonds,length,theta,-delta[:,1],delta[:,0]))
+
+# --------------------------------------------------------------------
+# convert per-type vizinfo list (indexed 1-Ntype) to array of width columns
+# unset entries are 0 in vizinfo and stay 0 here
+
+def type_table(values,width):
+    table = np.zeros((len(values),width))
+    for i in range(1,len(values)):
+        if values[i]: table[i] = values[i]
+    return table
+
+# --------------------------------------------------------------------
+# return boolean mask of points (N,3) inside box with corners lo,hi
+
+def inside_box(xyz,lo,hi):
+    return np.all((xyz >= lo) & (xyz <= hi),axis=1)
+
+# --------------------------------------------------------------------
+# triangle indices for a grid of (nrow+1) x (ncol+1) vertices, 2 per quad
+
+def quad_faces(nrow,ncol):
+    i,j = np.meshgrid(np.arange(nrow),np.arange(ncol),indexing="ij")
+    a = (i*(ncol+1) + j).ravel()
+    b = a + ncol + 1
+    return np.column_stack((a,b,a+1,a+1,b,b+1)).ravel()
+
+# --------------------------------------------------------------------
+# replicate mesh triangle indices for n copies of a mesh with nvert vertices
+
+def replicate_faces(faces,n,nvert):
+    offset = np.arange(n,dtype=np.uint32)*np.uint32(nvert)
+    return (offset[:,None] + faces[None,:].astype(np.uint32)).ravel()
+
+# --------------------------------------------------------------------
+# draw vertices with optional normals, colors, triangle indices
+# if no indices, vertices are drawn in order
+
+def draw_mesh(verts,norms,colors,faces,mode=GL_TRIANGLES):
+    verts = np.ascontiguousarray(verts,dtype=np.float32).reshape(-1,3)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(3,GL_FLOAT,0,verts)
+    if norms is not None:
+        norms = np.ascontiguousarray(norms,dtype=np.float32).reshape(-1,3)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glNormalPointer(GL_FLOAT,0,norms)
+    if colors is not None:
+        colors = np.ascontiguousarray(colors,dtype=np.float32).reshape(-1,3)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glColorPointer(3,GL_FLOAT,0,colors)
+
+    if faces is None: glDrawArrays(mode,0,len(verts))
+    else: glDrawElements(mode,len(faces),GL_UNSIGNED_INT,faces)
+
+    glDisableClientState(GL_VERTEX_ARRAY)
+    if norms is not None: glDisableClientState(GL_NORMAL_ARRAY)
+    if colors is not None: glDisableClientState(GL_COLOR_ARRAY)
+
 # --------------------------------------------------------------------
 # draw a line segment
 
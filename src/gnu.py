@@ -26,6 +26,14 @@ g.mplot(M,N,S,"file",a,b,...)  multiple plots saved to file0000.eps, etc
       Ith plot is of b[0:i] vs a[0:i], etc
     series of plots saved as file0000.eps, file0001.eps, etc
     if use xrange(),yrange() then plot axes will be same for all plots
+  plot and mplot pass vectors to GnuPlot as binary files of doubles
+    mplot writes them once, each plot reads only the first I points
+
+g.decimate(N)                  plot only min/max points of N bins per curve
+g.decimate(0)                  plot all points (default)
+
+  bins are N equal runs of consecutive points, e.g. N = plot width in pixels
+  1st and last points and min and max Y of each bin are kept, in order
 
 g("plot 'file.dat' using 2:3 with lines")      execute string in GnuPlot
 
@@ -69,6 +77,7 @@ g.curve(N,'r')                 set color of curve N
 # History
 #   8/05, Matt Jones (BYU): original version
 #   9/05, Steve Plimpton: added mplot() method
+#   10/26: binary plot files, decimation, single export for mplot()
 
 # ToDo list
 #   allow choice of JPG or PNG or GIF when saving ?
@@ -79,12 +88,14 @@ g.curve(N,'r')                 set color of curve N
 
 # Variables
 #   current = index of current figure (1-N)
+#   nbins = # of bins to decimate each curve into, 0 = no decimation
 #   figures = list of figure objects with each plot's attributes
 #             so they aren't lost between replots
 
 # Imports and external programs
 
 import types, os
+import numpy as np
 
 try: from DEFAULTS import PIZZA_GNUPLOT
 except: PIZZA_GNUPLOT = "gnuplot"
@@ -100,6 +111,7 @@ class gnu:
     def __init__(self):
         self.GNUPLOT = os.popen(PIZZA_GNUPLOT,'w')
         self.file = "tmp.gnu"
+        self.nbins = 0
         self.figures = []
         self.select(1)
 
@@ -127,31 +139,21 @@ class gnu:
     # write plot vectors to files and plot them
 
     def plot(self,*vectors):
-        if len(vectors) == 1:
-            file = self.file + ".%d.1" % self.current
-            linear = list(range(len(vectors[0])))
-            self.export(file,linear,vectors[0])
-            self.figures[self.current-1].ncurves = 1
-        else:
-            if len(vectors) % 2: raise Exception("vectors must come in pairs")
-            for i in range(0,len(vectors),2):
-                file = self.file + ".%d.%d" % (self.current,i/2+1)
-                self.export(file,vectors[i],vectors[i+1])
-            self.figures[self.current-1].ncurves = len(vectors)/2
+        self.write(vectors)
         self.draw()
 
     # --------------------------------------------------------------------
     # create multiple plots from growing vectors, save to numbered files
-    # don't plot empty vector, create a [0] instead
+    # vectors are written once, Ith plot uses points before index I
+    # don't plot empty vector, plot 1st point instead
 
     def mplot(self,start,stop,skip,file,*vectors):
+        keeps = self.write(vectors)
+        fig = self.figures[self.current-1]
         n = 0
         for i in range(start,stop,skip):
-            partial_vecs = []
-            for vec in vectors:
-                if i: partial_vecs.append(vec[:i])
-                else: partial_vecs.append([0])
-            self.plot(*partial_vecs)
+            fig.records = [max(int(np.searchsorted(keep,i)),1) for keep in keeps]
+            self.draw()
 
             if n < 10:     newfile = file + "000" + str(n)
             elif n < 100:  newfile = file + "00" + str(n)
@@ -160,6 +162,42 @@ class gnu:
 
             self.save(newfile)
             n += 1
+        fig.records = []
+
+    # --------------------------------------------------------------------
+    # write plot vectors as binary x,y files for current figure
+    # return list of indices of points kept in each curve
+
+    def write(self,vectors):
+        if len(vectors) == 1:
+            y = np.asarray(vectors[0],dtype=np.float64)
+            curves = [(np.arange(len(y),dtype=np.float64),y)]
+        else:
+            if len(vectors) % 2: raise Exception("vectors must come in pairs")
+            curves = []
+            for i in range(0,len(vectors),2):
+                x = np.asarray(vectors[i],dtype=np.float64)
+                y = np.asarray(vectors[i+1],dtype=np.float64)
+                if len(x) != len(y): raise Exception("vectors must be same length")
+                curves.append((x,y))
+
+        keeps = []
+        for i,(x,y) in enumerate(curves):
+            keep = decimate(y,self.nbins)
+            file = self.file + ".%d.%d" % (self.current,i+1)
+            np.column_stack((x[keep],y[keep])).tofile(file)
+            keeps.append(keep)
+
+        fig = self.figures[self.current-1]
+        fig.ncurves = len(curves)
+        fig.records = []
+        return keeps
+
+    # --------------------------------------------------------------------
+    # set # of bins to decimate curves into, 0 = off
+
+    def decimate(self,n):
+        self.nbins = n
 
     # --------------------------------------------------------------------
     # write list of equal-length vectors to filename
@@ -168,13 +206,8 @@ class gnu:
         n = len(vectors[0])
         for vector in vectors:
             if len(vector) != n: raise Exception("vectors must be same length")
-        f = open(filename,'w')
-        nvec = len(vectors)
-        for i in range(n):
-            for j in range(nvec):
-                print(vectors[j][i], end=' ', file=f)
-            print(file=f)
-        f.close()
+        columns = [np.asarray(vector,dtype=np.float64) for vector in vectors]
+        np.savetxt(filename,np.column_stack(columns),fmt="%.16g")
 
     # --------------------------------------------------------------------
     # select plot N as current plot
@@ -352,10 +385,12 @@ class gnu:
         cmd = 'plot '
         for i in range(fig.ncurves):
             file = self.file + ".%d.%d" % (self.current,i+1)
+            cmd += "'" + file + "' binary format='%float64%float64'"
+            if len(fig.records) > i: cmd += " record=%d" % fig.records[i]
             if len(fig.colors) > i and fig.colors[i]:
-                cmd += "'" + file + "' using 1:2 with line %d, " % fig.colors[i]
+                cmd += " using 1:2 with line %d, " % fig.colors[i]
             else:
-                cmd += "'" + file + "' using 1:2 with lines, "
+                cmd += " using 1:2 with lines, "
         self.__call__(cmd[:-2])
 
 # --------------------------------------------------------------------
@@ -365,6 +400,7 @@ class figure:
 
     def __init__(self):
         self.ncurves = 0
+        self.records = []
         self.colors  = []
         self.title   = ""
         self.xtitle  = ""
@@ -377,6 +413,20 @@ class figure:
         self.nlabels = 0
         self.labels  = []
 
+# --------------------------------------------------------------------
+# return indices of points of y to plot when decimated into nbins bins
+# each bin is a run of consecutive points, keep its min and max y
+# also keep 1st and last point, return all points if too few to decimate
+
+def decimate(y,nbins):
+    n = len(y)
+    if not nbins or n <= 2*nbins + 2: return np.arange(n)
+    bins = np.arange(n) * nbins // n
+    order = np.lexsort((y,bins))
+    first = np.searchsorted(bins,np.arange(nbins))
+    last = np.append(first[1:],n) - 1
+    return np.unique(np.concatenate(([0,n-1],order[first],order[last])))
+
 # --------------------------------------------------------------------
 # line color settings
 
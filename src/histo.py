@@ -28,6 +28,9 @@ x,y = h.compute('x',N,lo,hi)        compute histogram in dim with N bins
 
 # Imports and external programs
 
+import numpy as np
+import vizarray
+
 # Class definition
 
 class histo:
@@ -45,14 +48,14 @@ class histo:
         elif dim == 'z': idim = 4
         else: raise Exception("illegal dim value")
 
-        y = nbins*[0]
+        y = np.zeros(nbins,dtype=int)
 
         count = 0
         n = flag = 0
         while 1:
             which,time,flag = self.data.iterator(flag)
             if flag == -1: break
-            time,box,atoms,bonds,tris,lines = self.data.viz(which)
+            time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(self.data,which)
 
             if not lo:
                 if dim == 'x':
@@ -68,12 +71,10 @@ class histo:
             delta = (hi-lo) / nbins;
             invdelta = 1.0/delta
 
-            for atom in atoms:
-                coord = atom[idim]
-                ibin = int((coord-lo) * invdelta)
-                if ibin < 0 or ibin >= nbins: continue
-                y[ibin] += 1
-                count += 1
+            ibin = np.trunc((atoms[:,idim]-lo) * invdelta).astype(int)
+            ibin = ibin[(ibin >= 0) & (ibin < nbins)]
+            y += np.bincount(ibin,minlength=nbins)
+            count += len(ibin)
 
             n += 1
 
@@ -83,4 +84,4 @@ class histo:
         print("histogram snapshots = ",n)
         print("histogram counts (per snap) = %d (%g)" % (count,float(count)/n))
         print("histogram bounds = ",lo,hi)
-        return x,y
+        return x,y.tolist()
@@ -20,6 +20,9 @@ i = image()                     no display window opened if no arg
   image suffixes for blank string = *.png, *.bmp, *.gif, *.tiff, *.tif
   click on a thumbnail to view it full-size
   click on thumbnail again to remove full-sized version
+  thumbnails are made in parallel and cached in PIZZA_THUMBCACHE dir
+    a cached thumbnail is reused until its image file changes
+  full-size image is read when its thumbnail is first clicked
 
 i.view("*.png *.gif")           display thumbnails of matching images
 
@@ -29,6 +32,7 @@ i.convert("image*.svg","new*.png")                      each SVG file to PNG
 i.convert("image*.svg","new*.jpg","-quality 50")        3rd arg is switch
 i.convert("image*.png","movie.mpg")                     all PNGs to MPG movie
 i.convert("image*.png","movie.mpg","-resize 128x128")   3rd arg is switch
+i.convert("image*.png","new*.jpg","",1)                 4th arg = 1 to use PIL
 i.montage("","image*.png","plot*.png","two*.png")       image + plot = two
 i.montage("-geometry 512x512","i*.png","new.png")       1st arg is switch
 
@@ -37,28 +41,44 @@ i.montage("-geometry 512x512","i*.png","new.png")       1st arg is switch
   montage with all wildcard args loops over 1st set of files,
     combines with one file from other sets, to make last set of files
   montage with not all wildcard args will issue single montage command
+  looped convert and montage commands run in parallel, output as they finish
+    failed files are listed with their error message at the end
+  convert with PIL reads and writes each file in-process, no command run
+    only changes file format, switch must be empty, requires 2 wildcard args
+
+i.nworkers = 4                  max # of parallel commands, def = # of CPUs
 """
 
 # History
 #   8/05, Matt Jones (BYU): original version
 #   9/05, Steve Plimpton: added convert() and montage() methods
+#   10/26: thumbnails made by worker threads and cached on disk
+#   10/26: parallel convert() and montage() loops, PIL convert option
 
 # ToDo list
 
 # Variables
+#   NTHUMB = size of square box thumbnails fit in
+#   nworkers = max # of convert or montage commands run at once
 
 # Imports and external programs
 
-import sys, os, subprocess, re, glob
+import sys, os, subprocess, re, glob, hashlib, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from math import *
 from tkinter import *
 import Pmw
-import Image,ImageTk
+try: from PIL import Image,ImageTk
+except ImportError: import Image,ImageTk
 
 try: from DEFAULTS import PIZZA_CONVERT
 except: PIZZA_CONVERT = "convert"
 try: from DEFAULTS import PIZZA_MONTAGE
 except: PIZZA_MONTAGE = "montage"
+try: from DEFAULTS import PIZZA_THUMBCACHE
+except: PIZZA_THUMBCACHE = "~/.pizza/thumbnails"
+
+NTHUMB = 60
 
 # Class definition
 
@@ -67,6 +87,7 @@ class image:
     # --------------------------------------------------------------------
 
     def __init__(self,filestr=None,sortflag=1):
+        self.nworkers = os.cpu_count()
         if filestr == None: return
         self.view(filestr,sortflag)
 
@@ -94,6 +115,11 @@ class image:
           Pmw.ScrolledFrame(gui,usehullsize=1,hull_width=420,hull_height=500)
         pane = scroll.interior()
 
+        # worker threads create or fetch thumbnails, returned in order of files
+
+        pool = ThreadPoolExecutor(os.cpu_count())
+        thumbs = pool.map(thumbnail,files)
+
         ncolumns = 4
         for i in range(len(files)):
 
@@ -102,24 +128,17 @@ class image:
             if i % ncolumns == 0: rowframe = Frame(pane)
             oneframe = Frame(rowframe)
 
-            # create a thumbnail of image
+            # convert thumbnail of image to Tk image
 
-            im = Image.open(files[i])
-            imt = im.copy()
-            imt.thumbnail((60,60),Image.ANTIALIAS)
+            thumb = ImageTk.PhotoImage(image=next(thumbs))
             basename = os.path.basename(files[i])
-            imt.save("tmp." + basename)
-            thumbnail = ImageTk.PhotoImage(file = "tmp." + basename)
-            os.remove("tmp." + basename)
 
-            # read in full size image
-            # create a thumbnail object that links to it
+            # create a thumbnail object that reads full size image when clicked
             # create button that calls the thumbnail, label with filename
             # buttton needs to store thumbnail else it is garbage collected
 
-            big = ImageTk.PhotoImage(file=files[i])
-            obj = thumbnails(gui,files[i],big,thumbnail)
-            Button(oneframe,image=thumbnail,command=obj.display).pack(side=TOP)
+            obj = thumbnails(gui,files[i],thumb)
+            Button(oneframe,image=thumb,command=obj.display).pack(side=TOP)
             Label(oneframe,text=basename).pack(side=BOTTOM)
 
             # pack into row frame
@@ -129,14 +148,19 @@ class image:
 
         if len(files) % ncolumns != 0: rowframe.pack(side=TOP)
         scroll.pack(side=LEFT)
+        pool.shutdown()
 
     # --------------------------------------------------------------------
     # wrapper on ImageMagick convert command
 
-    def convert(self,file1,file2,switch=""):
+    def convert(self,file1,file2,switch="",pilflag=0):
+        if pilflag and switch:
+            raise Exception("convert with PIL does not allow a switch")
         if file1.find('*') < 0 or file2.find('*') < 0:
+            if pilflag:
+                raise Exception("convert with PIL requires 2 wildcard args")
             cmd = "%s %s %s %s" % (PIZZA_CONVERT,switch,file1,file2)
-            subprocess.getoutput(cmd)
+            self.dispatch("convert",[(file2,run,(cmd,))])
             return
 
         index = file1.index('*')
@@ -147,15 +171,16 @@ class image:
         post2 = file2[index+1:]
         expr = "%s(.*)%s" % (pre1,post1)
 
+        jobs = []
         filelist = glob.glob(file1)
         for file1 in filelist:
             middle = re.search(expr,file1).group(1)
             file2 = "%s%s%s" % (pre2,middle,post2)
-            cmd = "%s %s %s %s" % (PIZZA_CONVERT,switch,file1,file2)
-            print(middle, end=' ')
-            sys.stdout.flush()
-            subprocess.getoutput(cmd)
-        print()
+            if pilflag: jobs.append((middle,pil_convert,(file1,file2)))
+            else:
+                cmd = "%s %s %s %s" % (PIZZA_CONVERT,switch,file1,file2)
+                jobs.append((middle,run,(cmd,)))
+        self.dispatch("convert",jobs)
 
     # --------------------------------------------------------------------
     # wrapper on ImageMagick montage command
@@ -168,7 +193,7 @@ class image:
             if fileargs[i].find('*') < 0:
                 cmd = "%s %s" % (PIZZA_MONTAGE,switch)
                 for j in range(nsets): cmd += " %s" % fileargs[j]
-                subprocess.getoutput(cmd)
+                self.dispatch("montage",[(fileargs[-1],run,(cmd,))])
                 return
 
         nfiles = len(glob.glob(fileargs[0]))
@@ -186,25 +211,46 @@ class image:
         postN = fileargs[-1][index+1:]
         expr = "%s(.*)%s" % (pre1,post1)
 
+        jobs = []
         for i in range(nfiles):
             cmd = "%s %s" % (PIZZA_MONTAGE,switch)
             for j in range(nsets-1): cmd += " %s" % filesets[j][i]
             middle = re.search(expr,filesets[0][i]).group(1)
             fileN = "%s%s%s" % (preN,middle,postN)
             cmd += " %s" % fileN
-            subprocess.getoutput(cmd)
-            print(middle, end=' ')
-            sys.stdout.flush()
+            jobs.append((middle,run,(cmd,)))
+        self.dispatch("montage",jobs)
+
+    # --------------------------------------------------------------------
+    # run jobs = list of (label,function,args) on up to nworkers threads
+    # print label of each job as it finishes
+    # then print label and error of each job whose function raised one
+
+    def dispatch(self,name,jobs):
+        failed = []
+        with ThreadPoolExecutor(max(1,self.nworkers or 1)) as pool:
+            futures = {}
+            for label,function,args in jobs:
+                futures[pool.submit(function,*args)] = label
+            for future in as_completed(futures):
+                label = futures[future]
+                try: future.result()
+                except Exception as error: failed.append((label,str(error)))
+                print(label, end=' ')
+                sys.stdout.flush()
         print()
 
+        for label,error in failed: print("%s failed for %s: %s" % (name,label,error))
+        if failed: print("%d of %d %s commands failed" % (len(failed),len(jobs),name))
+
 # --------------------------------------------------------------------
 # thumbnail class
 
 class thumbnails:
 
-    def __init__(self,root,name,bigimage,thumbimage):
+    def __init__(self,root,name,thumbimage):
         self.root = root
-        self.big = bigimage
+        self.big = None
         self.thumb = thumbimage
         self.name = name
         self.bigexist = 0
@@ -223,11 +269,62 @@ class thumbnails:
         # create a new window with the big image
 
         else:
+            if not self.big: self.big = ImageTk.PhotoImage(file=self.name)
             self.bigexist = 1
             self.window = Toplevel(self.root)
             Label(self.window,text=self.name).pack(side=TOP)
             Label(self.window,image=self.big).pack(side=BOTTOM)
 
+# --------------------------------------------------------------------
+# run shell command, raise its output as error if it fails
+
+def run(cmd):
+    result = subprocess.run(cmd,shell=True,stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT,universal_newlines=True)
+    if result.returncode:
+        output = result.stdout.strip()
+        if not output: output = "exit status %d" % result.returncode
+        raise Exception(output)
+
+# --------------------------------------------------------------------
+# convert image file1 to format of file2 suffix with PIL
+# JPEG cannot store alpha or palette images, so convert those to RGB
+
+def pil_convert(file1,file2):
+    im = Image.open(file1)
+    if os.path.splitext(file2)[1].lower() in (".jpg",".jpeg") and \
+           im.mode not in ("RGB","L","CMYK"):
+        im = im.convert("RGB")
+    im.save(file2)
+
+# --------------------------------------------------------------------
+# return PIL thumbnail of image file, called by worker threads
+# use cached copy if one exists for same path, mtime, size of file
+# else make it and try to cache it, a failed cache write is ignored
+
+def thumbnail(file):
+    stat = os.stat(file)
+    key = "%s %d %d" % (os.path.abspath(file),stat.st_mtime_ns,stat.st_size)
+    cachedir = os.path.expanduser(PIZZA_THUMBCACHE)
+    cachefile = os.path.join(cachedir,hashlib.sha1(key.encode()).hexdigest() + ".png")
+
+    if os.path.exists(cachefile):
+        try:
+            imt = Image.open(cachefile)
+            imt.load()
+            return imt
+        except Exception: pass
+
+    imt = Image.open(file)
+    imt.thumbnail((NTHUMB,NTHUMB),Image.LANCZOS)
+    try:
+        os.makedirs(cachedir,exist_ok=True)
+        tmpfile = "%s.%d.tmp" % (cachefile,threading.get_ident())
+        imt.save(tmpfile,"PNG")
+        os.replace(tmpfile,cachefile)
+    except Exception: pass
+    return imt
+
 # --------------------------------------------------------------------
 # list of file extensions to test for
 # could add any extensions that PIL recognizes
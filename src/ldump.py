@@ -17,6 +17,9 @@ l = ldump("dump.*")               wildcard expands to multiple files
 l = ldump("dump.*",0)             two args = store filenames, but don't read
 
   incomplete and duplicate snapshots are deleted
+  atoms of a snapshot are read from its file when first used,
+    so files should not be changed while l exists (except gzipped ones)
+    a non-number in a row after the 1st is only found then, error names snapshot
   no column name assignment is performed
 
 time = l.next()                   read next snapshot from dump files
@@ -32,6 +35,7 @@ l.map(1,"id",3,"x")               assign names to atom columns (1-N)
   must assign id,type,end1x,end1y,end2x,end2y
 
 time,box,atoms,bonds,tris,lines = l.viz(index)   return list of viz objects
+time,box,atoms,bonds,tris,lines = l.viz_arrays(index)   return 2d arrays
 
   viz() returns line info for specified timestep index
     can also call as viz(time,1) and will find index of preceding snapshot
@@ -42,6 +46,7 @@ time,box,atoms,bonds,tris,lines = l.viz(index)   return list of viz objects
     tris = NULL
     lines = id,type,x1,y1,z1,x2,y2,z2 for each line as 2d array
       id,type are from associated atom
+  viz_arrays() returns same info as 2d NumPy arrays, no rows for NULL
 
 l.owrap(...)                      wrap lines to same image as their atoms
 
@@ -51,6 +56,8 @@ l.owrap(...)                      wrap lines to same image as their atoms
 
 # History
 #   11/10, Steve Plimpton (SNL): original version
+#   10/26, snapshots read via dumpread, atoms parsed in bulk on 1st use
+#   10/26, viz() and owrap() done as column operations on atoms array
 
 # Variables
 #   flist = list of dump file names
@@ -70,7 +77,6 @@ l.owrap(...)                      wrap lines to same image as their atoms
 # Imports and external programs
 
 import sys, subprocess, re, glob, types
-from os import popen
 
 try:
     import numpy as np
@@ -79,8 +85,7 @@ except:
     import Numeric as np
     oldnumeric = True
 
-try: from DEFAULTS import PIZZA_GUNZIP
-except: PIZZA_GUNZIP = "gunzip"
+import vizarray, dumpread
 
 # Class definition
 
@@ -114,27 +119,18 @@ class ldump:
     def read_all(self):
 
         # read all snapshots from each file
-        # test for gzipped files
+        # atoms of each snapshot are read on 1st use
 
         for file in self.flist:
-            if file[-3:] == ".gz":
-                f = popen("%s -c %s" % (PIZZA_GUNZIP,file),'r')
-            else: f = open(file)
-
-            snap = self.read_snapshot(f)
-            while snap:
+            for snap in dumpread.snapshots(file,Snap,self.read_header,1):
                 self.snaps.append(snap)
                 print(snap.time, end=' ')
                 sys.stdout.flush()
-                snap = self.read_snapshot(f)
-
-            f.close()
         print()
 
         # sort entries by timestep, cull duplicates
 
-        self.snaps.sort(self.compare_time)
-        self.cull()
+        dumpread.sort_cull(self.snaps)
         self.nsnaps = len(self.snaps)
         print("read %d snapshots" % self.nsnaps)
 
@@ -150,9 +146,9 @@ class ldump:
         # if new snapshot time stamp already exists, read next snapshot
 
         while 1:
-            f = open(self.flist[self.nextfile],'rb')
+            f = dumpread.open_file(self.flist[self.nextfile])
             f.seek(self.eof)
-            snap = self.read_snapshot(f)
+            snap = dumpread.read_snapshot(f,Snap(),self.read_header)
             if not snap:
                 self.nextfile += 1
                 if self.nextfile == len(self.flist): return -1
@@ -173,46 +169,23 @@ class ldump:
         return snap.time
 
     # --------------------------------------------------------------------
-    # read a single snapshot from file f
-    # return snapshot or 0 if failed
-
-    def read_snapshot(self,f):
-        try:
-            snap = Snap()
-            item = f.readline()
-            snap.time = int(f.readline().split()[0])    # just grab 1st field
-            item = f.readline()
-            snap.natoms = int(f.readline())
-
-            item = f.readline()
-            words = f.readline().split()
-            snap.xlo,snap.xhi = float(words[0]),float(words[1])
-            words = f.readline().split()
-            snap.ylo,snap.yhi = float(words[0]),float(words[1])
-            words = f.readline().split()
-            snap.zlo,snap.zhi = float(words[0]),float(words[1])
-
-            item = f.readline()
-
-            if snap.natoms:
-                words = f.readline().split()
-                ncol = len(words)
-                for i in range(1,snap.natoms):
-                    words += f.readline().split()
-                floats = list(map(float,words))
-                if oldnumeric: atoms = np.zeros((snap.natoms,ncol),np.Float)
-                else: atoms = np.zeros((snap.natoms,ncol),np.float)
-                start = 0
-                stop = ncol
-                for i in range(snap.natoms):
-                    atoms[i] = floats[start:stop]
-                    start = stop
-                    stop += ncol
-            else: atoms = None
-            snap.atoms = atoms
-            return snap
-        except:
-            return 0
+    # read header of a snapshot from file f, after its timestep
+    # return name of snap attribute for the atoms and # of atoms
+
+    def read_header(self,f,snap):
+        item = dumpread.readline(f)
+        snap.natoms = int(dumpread.readline(f))
+
+        item = dumpread.readline(f)
+        words = dumpread.readline(f).split()
+        snap.xlo,snap.xhi = float(words[0]),float(words[1])
+        words = dumpread.readline(f).split()
+        snap.ylo,snap.yhi = float(words[0]),float(words[1])
+        words = dumpread.readline(f).split()
+        snap.zlo,snap.zhi = float(words[0]),float(words[1])
+
+        item = dumpread.readline(f)
+        return "atoms",snap.natoms
 
     # --------------------------------------------------------------------
     # map atom column names
@@ -235,40 +208,25 @@ class ldump:
             i += 1
         return vec
 
-    # --------------------------------------------------------------------
-    # sort snapshots on time stamp
-
-    def compare_time(self,a,b):
-        if a.time < b.time:
-            return -1
-        elif a.time > b.time:
-            return 1
-        else:
-            return 0
-
     # --------------------------------------------------------------------
 
     def findtime(self,n):
-        for i in range(self.nsnaps):
-            if self.snaps[i].time == n: return i
-        raise Exception("no step %d exists" % n)
-
-    # --------------------------------------------------------------------
-    # delete successive snapshots with duplicate time stamp
-
-    def cull(self):
-        i = 1
-        while i < len(self.snaps):
-            if self.snaps[i].time == self.snaps[i-1].time:
-                del self.snaps[i]
-            else:
-                i += 1
+        return dumpread.findtime(self,n)
 
     # --------------------------------------------------------------------
     # return list of lines to viz for snapshot isnap
     # if called with flag, then index is timestep, so convert to snapshot index
 
     def viz(self,index,flag=0):
+        time,box,atoms,bonds,tris,lines = self.viz_arrays(index,flag)
+        lines = lines.tolist()
+        return time,box,None,None,None,lines
+
+    # --------------------------------------------------------------------
+    # return 2d array of lines to viz for snapshot isnap
+    # if called with flag, then index is timestep, so convert to snapshot index
+
+    def viz_arrays(self,index,flag=0):
         if not flag: isnap = index
         else:
             times = self.time()
@@ -282,60 +240,50 @@ class ldump:
 
         time = snap.time
         box = [snap.xlo,snap.ylo,snap.zlo,snap.xhi,snap.yhi,snap.zhi]
-        id = self.names["id"]
-        type = self.names["type"]
-        end1x = self.names["end1x"]
-        end1y = self.names["end1y"]
-        end2x = self.names["end2x"]
-        end2y = self.names["end2y"]
-
-        # create line list from id,type,end1x,end1y,end2x,end2y
-        # don't add line if all 4 values are 0 since not a line
-
-        lines = []
-        for i in range(snap.natoms):
-            atom = snap.atoms[i]
-            e1x = atom[end1x]
-            e1y = atom[end1y]
-            e2x = atom[end2x]
-            e2y = atom[end2y]
-            if e1x == 0.0 and e1y == 0.0 and e2x == 0.0 and e2y == 0.0: continue
-            lines.append([atom[id],atom[type],e1x,e1y,0.0,e2x,e2y,0.0])
+        cols = [self.names["id"],self.names["type"],
+                self.names["end1x"],self.names["end1y"],
+                self.names["end2x"],self.names["end2y"]]
 
-        return time,box,None,None,None,lines
+        # gather id,type,end points for all rows at once, z = 0.0
+        # drop rows with all 4 end values = 0 since not a line
+
+        if snap.natoms: rows = snap.atoms[:,cols]
+        else: rows = np.zeros((0,len(cols)))
+        rows = rows[np.any(rows[:,2:6] != 0.0,axis=1)]
+        lines = np.zeros((len(rows),vizarray.NLINE))
+        lines[:,0:4] = rows[:,0:4]
+        lines[:,5:7] = rows[:,4:6]
+
+        return time,box,np.zeros((0,vizarray.NATOM)), \
+            np.zeros((0,vizarray.NBOND)),np.zeros((0,vizarray.NTRI)),lines
 
     # --------------------------------------------------------------------
     # wrap line end points associated with atoms thru periodic boundaries
     # invoked by dump() when it does an owrap() on its atoms
 
     def owrap(self,time,xprd,yprd,zprd,idsdump,atomsdump,iother,ix,iy,iz):
-        id = self.names["id"]
-        end1x = self.names["end1x"]
-        end1y = self.names["end1y"]
-        end2x = self.names["end2x"]
-        end2y = self.names["end2y"]
+        cols = [self.names["end1x"],self.names["end1y"],
+                self.names["end2x"],self.names["end2y"]]
 
         isnap = self.findtime(time)
         snap = self.snaps[isnap]
+        if not snap.natoms: return
         atoms = snap.atoms
 
-        # idump = index of my line I in dump's atoms
+        # idump = index of my line I in dump's atoms, via idsdump = dump's IDs
         # jdump = atom J in dump's atoms that atom I was owrapped on
-        # delx,dely = offset applied to atom I and thus to line I
-
-        for i in range(snap.natoms):
-            tag = atoms[i][id]
-            idump = idsdump[tag]
-            jdump = idsdump[atomsdump[idump][iother]]
-            delx = (atomsdump[idump][ix]-atomsdump[jdump][ix])*xprd
-            dely = (atomsdump[idump][iy]-atomsdump[jdump][iy])*yprd
-            atoms[i][end1x] += delx
-            atoms[i][end1y] += dely
-            atoms[i][end2x] += delx
-            atoms[i][end2y] += dely
+        # delta = x,y offset applied to atom I and thus to both ends of line I
+
+        idump,found = vizarray.lookup(idsdump,atoms[:,self.names["id"]])
+        if not found.all(): raise Exception("ldump owrap() line ID not in dump")
+        jdump = vizarray.lookup(idsdump,atomsdump[idump,iother])[0]
+        image = atomsdump[:,[ix,iy]]
+        delta = (image[idump] - image[jdump])*[xprd,yprd]
+        atoms[:,cols] += np.tile(delta,2)
 
 # --------------------------------------------------------------------
 # one snapshot
 
 class Snap:
-    pass
+    def __getattr__(self,name):
+        return dumpread.load(self,name)
@@ -64,7 +64,7 @@ class log:
 
     # --------------------------------------------------------------------
 
-    def __init__(self,*list):
+    def __init__(self,*args):
         self.nvec = 0
         self.names = []
         self.ptr = {}
@@ -72,13 +72,13 @@ class log:
 
         # flist = list of all log file names
 
-        words = list[0].split()
+        words = args[0].split()
         self.flist = []
         for word in words: self.flist += glob.glob(word)
-        if len(self.flist) == 0 and len(list) == 1:
+        if len(self.flist) == 0 and len(args) == 1:
             raise Exception("no log file specified")
 
-        if len(list) == 1:
+        if len(args) == 1:
             self.increment = 0
             self.read_all()
         else:
@@ -101,7 +101,7 @@ class log:
 
         # sort entries by timestep, cull duplicates
 
-        self.data.sort(self.compare)
+        self.data.sort(key = lambda entry: entry[0])
         self.cull()
         self.nlen = len(self.data)
         print("read %d log entries" % self.nlen)
@@ -180,16 +180,6 @@ class log:
 
     # --------------------------------------------------------------------
 
-    def compare(self,a,b):
-        if a[0] < b[0]:
-            return -1
-        elif a[0] > b[0]:
-            return 1
-        else:
-            return 0
-
-    # --------------------------------------------------------------------
-
     def cull(self):
         i = 1
         while i < len(self.data):
@@ -243,19 +233,19 @@ class log:
 
     # --------------------------------------------------------------------
 
-    def read_one(self,*list):
+    def read_one(self,*args):
 
         # if 2nd arg exists set file ptr to that value
         # read entire (rest of) file into txt
 
-        file = list[0]
+        file = args[0]
         if file[-3:] == ".gz":
             f = popen("%s -c %s" % (PIZZA_GUNZIP,file),'rb')
         else:
             f = open(file,'rb')
 
-        if len(list) == 2: f.seek(list[1])
-        txt = f.read()
+        if len(args) == 2: f.seek(args[1])
+        txt = f.read().decode("latin-1")
         if file[-3:] == ".gz": eof = 0
         else: eof = f.tell()
         f.close()
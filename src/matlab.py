@@ -26,6 +26,14 @@ m.mplot(M,N,S,"file",a,b,...)  multiple plots saved to file0000.eps, etc
       Ith plot is of b[0:i] vs a[0:i], etc
     series of plots saved as file0000.eps, file0001.eps, etc
     if use xrange(),yrange() then plot axes will be same for all plots
+  plot and mplot pass vectors to MatLab as binary MAT (level 4) files
+    mplot writes them once, each plot uses only the first I points
+
+m.decimate(N)                  plot only min/max points of N bins per curve
+m.decimate(0)                  plot all points (default)
+
+  bins are N equal runs of consecutive points, e.g. N = plot width in pixels
+  1st and last points and min and max Y of each bin are kept, in order
 
 m("c = a + b")                 execute string in MatLab
 
@@ -77,6 +85,7 @@ m.curve(N,'b','-','v')         set color, line style, symbol of curve N
 
 # History
 #   8/05, Matt Jones (BYU): original version
+#   10/26: binary plot files, decimation, single export for mplot()
 
 # ToDo list
 #   allow choice of JPG or PNG or GIF when saving via "saveas" command
@@ -85,6 +94,7 @@ m.curve(N,'b','-','v')         set color, line style, symbol of curve N
 
 # Variables
 #   current = index of current figure (1-N)
+#   nbins = # of bins to decimate each curve into, 0 = no decimation
 #   figures = list of figure objects with each plot's attributes
 #             so they aren't lost between replots
 #   import command to yank MatLab variables back to Python
@@ -94,6 +104,7 @@ m.curve(N,'b','-','v')         set color, line style, symbol of curve N
 # Imports and external programs
 
 import types, os
+import numpy as np
 
 try: from DEFAULTS import PIZZA_MATLAB
 except: PIZZA_MATLAB = "matlab -nosplash -nodesktop -nojvm"
@@ -107,6 +118,7 @@ class matlab:
     def __init__(self):
         self.MATLAB = os.popen(PIZZA_MATLAB,'w')
         self.file = "tmp.matlab"
+        self.nbins = 0
         self.figures = []
         self.select(1)
 
@@ -134,31 +146,21 @@ class matlab:
     # write plot vectors to files and plot them
 
     def plot(self,*vectors):
-        if len(vectors) == 1:
-            file = self.file + ".%d.1" % self.current
-            linear = list(range(len(vectors[0])))
-            self.export(file,linear,vectors[0])
-            self.figures[self.current-1].ncurves = 1
-        else:
-            if len(vectors) % 2: raise Exception("vectors must come in pairs")
-            for i in range(0,len(vectors),2):
-                file = self.file + ".%d.%d" % (self.current,i/2+1)
-                self.export(file,vectors[i],vectors[i+1])
-            self.figures[self.current-1].ncurves = len(vectors)/2
+        self.write(vectors)
         self.draw()
 
     # --------------------------------------------------------------------
     # create multiple plots from growing vectors, save to numbered files
-    # don't plot empty vector, create a [0] instead
+    # vectors are written once, Ith plot uses points before index I
+    # don't plot empty vector, plot 1st point instead
 
     def mplot(self,start,stop,skip,file,*vectors):
+        keeps = self.write(vectors)
+        fig = self.figures[self.current-1]
         n = 0
         for i in range(start,stop,skip):
-            partial_vecs = []
-            for vec in vectors:
-                if i: partial_vecs.append(vec[:i])
-                else: partial_vecs.append([0])
-            self.plot(*partial_vecs)
+            fig.records = [max(int(np.searchsorted(keep,i)),1) for keep in keeps]
+            self.draw()
 
             if n < 10:     newfile = file + "000" + str(n)
             elif n < 100:  newfile = file + "00" + str(n)
@@ -167,6 +169,43 @@ class matlab:
 
             self.save(newfile)
             n += 1
+        fig.records = []
+
+    # --------------------------------------------------------------------
+    # write plot vectors as MAT files of x,y columns for current figure
+    # curve I is stored as variable pizzaI
+    # return list of indices of points kept in each curve
+
+    def write(self,vectors):
+        if len(vectors) == 1:
+            y = np.asarray(vectors[0],dtype=np.float64)
+            curves = [(np.arange(len(y),dtype=np.float64),y)]
+        else:
+            if len(vectors) % 2: raise Exception("vectors must come in pairs")
+            curves = []
+            for i in range(0,len(vectors),2):
+                x = np.asarray(vectors[i],dtype=np.float64)
+                y = np.asarray(vectors[i+1],dtype=np.float64)
+                if len(x) != len(y): raise Exception("vectors must be same length")
+                curves.append((x,y))
+
+        keeps = []
+        for i,(x,y) in enumerate(curves):
+            keep = decimate(y,self.nbins)
+            file = self.file + ".%d.%d" % (self.current,i+1)
+            write_mat(file,"pizza%d" % (i+1),np.column_stack((x[keep],y[keep])))
+            keeps.append(keep)
+
+        fig = self.figures[self.current-1]
+        fig.ncurves = len(curves)
+        fig.records = []
+        return keeps
+
+    # --------------------------------------------------------------------
+    # set # of bins to decimate curves into, 0 = off
+
+    def decimate(self,n):
+        self.nbins = n
 
     # --------------------------------------------------------------------
     # write list of equal-length vectors to filename
@@ -175,13 +214,8 @@ class matlab:
         n = len(vectors[0])
         for vector in vectors:
             if len(vector) != n: raise Exception("vectors must be same length")
-        f = open(filename,'w')
-        nvec = len(vectors)
-        for i in range(n):
-            for j in range(nvec):
-                print(vectors[j][i], end=' ', file=f)
-            print(file=f)
-        f.close()
+        columns = [np.asarray(vector,dtype=np.float64) for vector in vectors]
+        np.savetxt(filename,np.column_stack(columns),fmt="%.16g")
 
     # --------------------------------------------------------------------
     # select plot N as current plot
@@ -329,12 +363,13 @@ class matlab:
         cmd += '('
         for i in range(fig.ncurves):
             file = self.file + ".%d.%d" % (self.current,i+1)
-            readcmd = "pizza%d = importdata('%s');" % (i+1,file)
+            readcmd = "load('%s','-mat');" % file
             self.__call__(readcmd)
-            if len(fig.curves) > i:
-                cmd += "pizza%d(:,1),pizza%d(:,2),'%s'," % (i+1,i+1,fig.curves[i])
-            else:
-                cmd += "pizza%d(:,1),pizza%d(:,2),''," % (i+1,i+1)
+            if len(fig.records) > i: rows = "1:%d" % fig.records[i]
+            else: rows = ":"
+            if len(fig.curves) > i: style = fig.curves[i]
+            else: style = ''
+            cmd += "pizza%d(%s,1),pizza%d(%s,2),'%s'," % (i+1,rows,i+1,rows,style)
         cmd = cmd[:-1] + ",'LineWidth',1.5)"  # kludge on line width for now
                                               # problem is it applies to all curves
         self.__call__(cmd)                    # should allow other attributes set
@@ -366,6 +401,7 @@ class figure:
 
     def __init__(self):
         self.ncurves = 0
+        self.records = []
         self.curves  = []
         self.title   = ""
         self.xtitle  = ""
@@ -377,3 +413,31 @@ class figure:
         self.ylog    = 0
         self.nlabels = 0
         self.labels  = []
+
+# --------------------------------------------------------------------
+# return indices of points of y to plot when decimated into nbins bins
+# each bin is a run of consecutive points, keep its min and max y
+# also keep 1st and last point, return all points if too few to decimate
+
+def decimate(y,nbins):
+    n = len(y)
+    if not nbins or n <= 2*nbins + 2: return np.arange(n)
+    bins = np.arange(n) * nbins // n
+    order = np.lexsort((y,bins))
+    first = np.searchsorted(bins,np.arange(nbins))
+    last = np.append(first[1:],n) - 1
+    return np.unique(np.concatenate(([0,n-1],order[first],order[last])))
+
+# --------------------------------------------------------------------
+# write 2d array as variable name to a level 4 MAT file that load() reads
+# header = type (0 = little-endian full double), rows, cols, imag flag,
+#   name length with null, then name and column-major values
+
+def write_mat(filename,name,array):
+    array = np.asarray(array,dtype="<f8")
+    rows,cols = array.shape
+    f = open(filename,'wb')
+    f.write(np.array([0,rows,cols,0,len(name)+1],dtype="<i4").tobytes())
+    f.write(name.encode() + b"\0")
+    f.write(array.tobytes(order='F'))
+    f.close()
@@ -17,6 +17,9 @@ m = mdump("mesh.*")               wildcard expands to multiple files
 m = mdump("mesh.*",0)             two args = store filenames, but don't read
 
   incomplete and duplicate snapshots are deleted
+  rows of a snapshot are read from its file when first used,
+    so files should not be changed while m exists (except gzipped ones)
+    a non-number in a row after the 1st is only found then, error names snapshot
 
 time = m.next()                   read next snapshot from dump files
 
@@ -59,6 +62,7 @@ fx,fy,... = m.vecs(1000,"fx","fy",...)  return vector(s) for timestep N
 
 index,time,flag = m.iterator(0/1)          loop over mesh dump snapshots
 time,box,atoms,bonds,tris,lines = m.viz(index)  return list of viz objects
+time,box,atoms,bonds,tris,lines = m.viz_arrays(index)  return 2d arrays
 nodes,elements,nvalues,evalues = m.mviz(index)  return list of mesh viz objects
 m.etype = "color"                          set column returned as "type" by viz
 
@@ -76,6 +80,7 @@ m.etype = "color"                          set column returned as "type" by viz
     tris = id,type,x1,y1,z1,x2,y2,z2,x3,y3,z3,nx,ny,nz for each tri as 2d array
       each element is decomposed into tris
     lines = NULL
+  viz_arrays() returns same info as 2d NumPy arrays, no rows for NULL
   mviz() returns info for all elements for specified timestep index
     can also call as mviz(time,1) and will find index of preceding snapshot
     time = timestep value
@@ -90,6 +95,8 @@ m.etype = "color"                          set column returned as "type" by viz
 # History
 #   11/06, Steve Plimpton (SNL): original version
 #   12/09, David Hart (SNL): allow use of NumPy or Numeric
+#   10/26, viz() tris built with per-element-type face tables on node arrays
+#   10/26, snapshots read via dumpread, rows parsed in bulk on 1st use
 
 # Variables
 #   flist = list of dump file names
@@ -127,7 +134,6 @@ m.etype = "color"                          set column returned as "type" by viz
 # Imports and external programs
 
 import sys, subprocess, re, glob, types
-from os import popen
 from math import *             # any function could be used by set()
 
 try:
@@ -137,8 +143,21 @@ except:
     import Numeric as np
     oldnumeric = True
 
-try: from DEFAULTS import PIZZA_GUNZIP
-except: PIZZA_GUNZIP = "gunzip"
+import vizarray, dumpread
+
+# tris each element type is decomposed into by viz()
+# key = eflag, value = corners of each tri as indices into element's nodes
+# normals from corner order point up (tri, square) or out (tet, cube)
+
+FACES = {1: [[0,1,2]],
+         2: [[0,1,3],[1,2,3],[0,3,2],[0,2,1]],
+         3: [[0,1,2],[0,2,3]],
+         4: [[0,2,1],[0,3,2],                # lower z face
+             [4,5,6],[4,6,7],                # upper z face
+             [0,1,5],[0,5,4],                # lower y face
+             [3,6,2],[3,7,6],                # upper y face
+             [0,7,3],[0,4,7],                # lower x face
+             [1,2,6],[1,6,5]]}               # upper x face
 
 # Class definition
 
@@ -175,55 +194,27 @@ class mdump:
     def read_all(self):
 
         # read all snapshots from each file
-        # test for gzipped files
+        # nodes, elements, values of each snapshot are read on 1st use
 
         for file in self.flist:
-            if file[-3:] == ".gz":
-                f = popen("%s -c %s" % (PIZZA_GUNZIP,file),'r')
-            else: f = open(file)
-
-            snap = self.read_snapshot(f)
-            while snap:
+            for snap in dumpread.snapshots(file,Snap,self.read_header,1):
                 self.snaps.append(snap)
                 print(snap.time, end=' ')
                 sys.stdout.flush()
-                snap = self.read_snapshot(f)
-
-            f.close()
         print()
 
         # sort entries by timestep, cull and combine duplicates
 
-        self.snaps.sort(self.compare_time)
+        self.snaps.sort(key = lambda s: s.time)
         self.cull()
 
         # sort all node, element, nvalue, evalue arrays by ID
 
         for snap in self.snaps:
-            if snap.nflag:
-                array = snap.nodes
-                ids = array[:,0]
-                ordering = np.argsort(ids)
-                for i in range(len(array[0])):
-                    array[:,i] = np.take(array[:,i],ordering)
-            if snap.eflag:
-                array = snap.elements
-                ids = array[:,0]
-                ordering = np.argsort(ids)
-                for i in range(len(array[0])):
-                    array[:,i] = np.take(array[:,i],ordering)
-            if snap.nvalueflag:
-                array = snap.nvalues
-                ids = array[:,0]
-                ordering = np.argsort(ids)
-                for i in range(len(array[0])):
-                    array[:,i] = np.take(array[:,i],ordering)
-            if snap.evalueflag:
-                array = snap.evalues
-                ids = array[:,0]
-                ordering = np.argsort(ids)
-                for i in range(len(array[0])):
-                    array[:,i] = np.take(array[:,i],ordering)
+            if snap.nflag: dumpread.apply(snap,"nodes",sort_ids,"nodes")
+            if snap.eflag: dumpread.apply(snap,"elements",sort_ids,"elements")
+            if snap.nvalueflag: dumpread.apply(snap,"nvalues",sort_ids,"nvalues")
+            if snap.evalueflag: dumpread.apply(snap,"evalues",sort_ids,"evalues")
 
         # reference definitions of nodes and elements in previous timesteps
 
@@ -248,9 +239,9 @@ class mdump:
         # if new snapshot time stamp already exists, read next snapshot
 
         while 1:
-            f = open(self.flist[self.nextfile],'rb')
+            f = dumpread.open_file(self.flist[self.nextfile])
             f.seek(self.eof)
-            snap = self.read_snapshot(f)
+            snap = dumpread.read_snapshot(f,Snap(),self.read_header)
             if not snap:
                 self.nextfile += 1
                 if self.nextfile == len(self.flist): return -1
@@ -278,65 +269,48 @@ class mdump:
         return snap.time
 
     # --------------------------------------------------------------------
-    # read a single snapshot from file f
-    # return snapshot or 0 if failed
-
-    def read_snapshot(self,f):
-        try:
-            snap = Snap()
-            item = f.readline()
-            snap.time = int(f.readline())
-            snap.nflag = snap.eflag = snap.nvalueflag = snap.evalueflag = 0
-            str = f.readline()
-            if "NUMBER OF NODES" in str: snap.nflag = 1
-            elif "NUMBER OF TRIANGLES" in str: snap.eflag = 1
-            elif "NUMBER OF TETS" in str: snap.eflag = 2
-            elif "NUMBER OF SQUARES" in str: snap.eflag = 3
-            elif "NUMBER OF CUBES" in str: snap.eflag = 4
-            elif "NUMBER OF NODE VALUES" in str: snap.nvalueflag = 1
-            elif "NUMBER OF ELEMENT VALUES" in str: snap.evalueflag = 1
-            else: raise Exception("unrecognized snapshot in dump file")
-            n = int(f.readline())
-
-            if snap.eflag: snap.eselect = np.zeros(n)
-
-            if snap.nflag:
-                item = f.readline()
-                words = f.readline().split()
-                snap.xlo,snap.xhi = float(words[0]),float(words[1])
-                words = f.readline().split()
-                snap.ylo,snap.yhi = float(words[0]),float(words[1])
-                words = f.readline().split()
-                snap.zlo,snap.zhi = float(words[0]),float(words[1])
-
-            item = f.readline()
-            if n:
-                words = f.readline().split()
-                ncol = len(words)
-                for i in range(1,n):
-                    words += f.readline().split()
-                floats = list(map(float,words))
-                if oldnumeric: values = np.zeros((n,ncol),np.Float)
-                else: values = np.zeros((n,ncol),np.float)
-                start = 0
-                stop = ncol
-                for i in range(n):
-                    values[i] = floats[start:stop]
-                    start = stop
-                    stop += ncol
-            else: values = None
-
-            if snap.nflag:
-                snap.nodes = values; snap.nnodes = n
-            elif snap.eflag:
-                snap.elements = values; snap.nelements = n
-            elif snap.nvalueflag:
-                snap.nvalues = values; snap.nnvalues = n
-            elif snap.evalueflag:
-                snap.evalues = values; snap.nevalues = n
-            return snap
-        except:
-            return 0
+    # read header of a snapshot from file f, after its timestep
+    # return name of snap attribute for the rows and # of rows
+
+    def read_header(self,f,snap):
+        snap.nflag = snap.eflag = snap.nvalueflag = snap.evalueflag = 0
+        snap.nnodes = snap.nelements = snap.nnvalues = snap.nevalues = 0
+        str = dumpread.readline(f)
+        if "NUMBER OF NODES" in str: snap.nflag = 1
+        elif "NUMBER OF TRIANGLES" in str: snap.eflag = 1
+        elif "NUMBER OF TETS" in str: snap.eflag = 2
+        elif "NUMBER OF SQUARES" in str: snap.eflag = 3
+        elif "NUMBER OF CUBES" in str: snap.eflag = 4
+        elif "NUMBER OF NODE VALUES" in str: snap.nvalueflag = 1
+        elif "NUMBER OF ELEMENT VALUES" in str: snap.evalueflag = 1
+        else: raise Exception("unrecognized snapshot in dump file")
+        n = int(dumpread.readline(f))
+
+        if snap.eflag: snap.eselect = np.zeros(n)
+
+        if snap.nflag:
+            item = dumpread.readline(f)
+            words = dumpread.readline(f).split()
+            snap.xlo,snap.xhi = float(words[0]),float(words[1])
+            words = dumpread.readline(f).split()
+            snap.ylo,snap.yhi = float(words[0]),float(words[1])
+            words = dumpread.readline(f).split()
+            snap.zlo,snap.zhi = float(words[0]),float(words[1])
+
+        item = dumpread.readline(f)
+
+        if snap.nflag:
+            snap.nnodes = n
+            return "nodes",n
+        elif snap.eflag:
+            snap.nelements = n
+            return "elements",n
+        elif snap.nvalueflag:
+            snap.nnvalues = n
+            return "nvalues",n
+        elif snap.evalueflag:
+            snap.nevalues = n
+            return "evalues",n
 
     # --------------------------------------------------------------------
     # map atom column names
@@ -427,17 +401,6 @@ class mdump:
         if len(list) == 1: return values[0]
         else: return values
 
-    # --------------------------------------------------------------------
-    # sort snapshots on time stamp
-
-    def compare_time(self,a,b):
-        if a.time < b.time:
-            return -1
-        elif a.time > b.time:
-            return 1
-        else:
-            return 0
-
     # --------------------------------------------------------------------
     # delete successive snapshots with duplicate time stamp
     # if have same timestamp, combine them if internal flags are different
@@ -526,6 +489,16 @@ class mdump:
     # if called with flag, then index is timestep, so convert to snapshot index
 
     def viz(self,index,flag=0):
+        time,box,atoms,bonds,tris,lines = self.viz_arrays(index,flag)
+        atoms,bonds,tris,lines = vizarray.lists(atoms,bonds,tris,lines)
+        return time,box,atoms,bonds,tris,lines
+
+    # --------------------------------------------------------------------
+    # return 2d array of triangles to viz for snapshot isnap
+    # same columns as viz() list, one row per triangle
+    # each selected element is decomposed into tris via its FACES table
+
+    def viz_arrays(self,index,flag=0):
         if not flag: isnap = index
         else:
             times = self.time()
@@ -539,136 +512,29 @@ class mdump:
 
         time = snap.time
         box = [snap.xlo,snap.ylo,snap.zlo,snap.xhi,snap.yhi,snap.zhi]
-        if self.etype == "": type = -1
-        else: type = self.names[self.etype]
 
-        atoms = []
-        bonds = []
+        # gather selected elements, their corner node coords for every face
+        # for type, either use element type or user-defined column in evalues
+        # node IDs are 1 to N, so node ID I is row I-1 of nodes
 
-        # create triangle list from all elements
-        # for type, either use element type (-1) or user-defined column in evalues
+        select = np.asarray(snap.eselect) != 0
+        elements = snap.elements[select]
+        if self.etype == "": etypes = elements[:,1]
+        else: etypes = snap.evalues[select][:,self.names[self.etype]]
 
-        tris = []
-        nodes = snap.nodes
-        for i in range(snap.nelements):
-            if not snap.eselect[i]: continue
-            element = snap.elements[i]
-            if snap.evalueflag: evalue = snap.evalues[i]
-            else: evalues = []
-
-            # single tri, normal = up
-
-            if snap.eflag == 1:
-                v1 = nodes[int(element[2])-1][2:5].tolist()
-                v2 = nodes[int(element[3])-1][2:5].tolist()
-                v3 = nodes[int(element[4])-1][2:5].tolist()
-                list = v1 + v2 + v3
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-
-            # single tet, convert to 4 tris, normals = out
-
-            elif snap.eflag == 2:
-                v1 = nodes[int(element[2])-1][2:5].tolist()
-                v2 = nodes[int(element[3])-1][2:5].tolist()
-                v3 = nodes[int(element[4])-1][2:5].tolist()
-                v4 = nodes[int(element[5])-1][2:5].tolist()
-                list = v1 + v2 + v4
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-                list = v2 + v3 + v4
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-                list = v1 + v4 + v3
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-                list = v1 + v3 + v2
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-
-            # single square, convert to 2 tris, normals = up
-
-            elif snap.eflag == 3:
-                v1 = nodes[int(element[2])-1][2:5].tolist()
-                v2 = nodes[int(element[3])-1][2:5].tolist()
-                v3 = nodes[int(element[4])-1][2:5].tolist()
-                v4 = nodes[int(element[5])-1][2:5].tolist()
-                list = v1 + v2 + v3
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-                list = v1 + v3 + v4
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-
-            # single cube, convert to 12 tris, normals = out
-
-            elif snap.eflag == 4:
-                v1 = nodes[int(element[2])-1][2:5].tolist()
-                v2 = nodes[int(element[3])-1][2:5].tolist()
-                v3 = nodes[int(element[4])-1][2:5].tolist()
-                v4 = nodes[int(element[5])-1][2:5].tolist()
-                v5 = nodes[int(element[6])-1][2:5].tolist()
-                v6 = nodes[int(element[7])-1][2:5].tolist()
-                v7 = nodes[int(element[8])-1][2:5].tolist()
-                v8 = nodes[int(element[9])-1][2:5].tolist()
-                list = v1 + v3 + v2   # lower z face
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-                list = v1 + v4 + v3
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-                list = v5 + v6 + v7   # upper z face
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-                list = v5 + v7 + v8
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-                list = v1 + v2 + v6  # lower y face
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-                list = v1 + v6 + v5
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-                list = v4 + v7 + v3  # upper y face
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-                list = v4 + v8 + v7
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-                list = v1 + v8 + v4  # lower x face
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-                list = v1 + v5 + v8
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-                list = v2 + v3 + v7  # upper x face
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-                list = v2 + v7 + v6
-                n = normal(list[0:3],list[3:6],list[6:9])
-                if type == -1: tris.append([element[0],element[1]] + list + n)
-                else: tris.append([element[0],evalue[type]] + list + n)
-
-        lines = []
+        faces = FACES[snap.eflag]
+        nface = len(faces)
+        corners = elements[:,2:][:,faces].astype(np.intp) - 1
+        corners = snap.nodes[:,2:5][corners].reshape(-1,3,3)
+        n = vizarray.normals(corners[:,0],corners[:,1],corners[:,2])
 
+        tris = np.column_stack((np.repeat(elements[:,0],nface),
+                                np.repeat(etypes,nface),
+                                corners.reshape(-1,9),n))
+
+        atoms = np.zeros((0,vizarray.NATOM))
+        bonds = np.zeros((0,vizarray.NBOND))
+        lines = np.zeros((0,vizarray.NLINE))
         return time,box,atoms,bonds,tris,lines
 
     # --------------------------------------------------------------------
@@ -692,16 +558,14 @@ class mdump:
         nvalues = []
         if snap.nvalueflag: nvalues = snap.nvalues
         evalues = []
-        if snap.nvalueflag: evalues = snap.evalues
+        if snap.evalueflag: evalues = snap.evalues
 
         return time,box,snap.nodes,snap.elements,nvalues,evalues
 
     # --------------------------------------------------------------------
 
     def findtime(self,n):
-        for i in range(self.nsnaps):
-            if self.snaps[i].time == n: return i
-        raise Exception("no step %d exists" % n)
+        return dumpread.findtime(self,n)
 
     # --------------------------------------------------------------------
     # return maximum box size across all selected snapshots
@@ -733,7 +597,8 @@ class mdump:
 # one snapshot
 
 class Snap:
-    pass
+    def __getattr__(self,name):
+        return dumpread.load(self,name)
 
 # --------------------------------------------------------------------
 # time selection class
@@ -877,27 +742,9 @@ class eselect:
                     snap.nselect -= 1
 
 # --------------------------------------------------------------------
-# compute normal for a triangle with 3 vertices
-
-def normal(x,y,z):
-    v1 = 3*[0]
-    v1[0] = y[0] - x[0]
-    v1[1] = y[1] - x[1]
-    v1[2] = y[2] - x[2]
-
-    v2 = 3*[0]
-    v2[0] = z[0] - y[0]
-    v2[1] = z[1] - y[1]
-    v2[2] = z[2] - y[2]
-
-    n = 3*[0]
-    n[0] = v1[1]*v2[2] - v1[2]*v2[1]
-    n[1] = v1[2]*v2[0] - v1[0]*v2[2]
-    n[2] = v1[0]*v2[1] - v1[1]*v2[0]
-
-    length = sqrt(n[0]*n[0] + n[1]*n[1] + n[2]*n[2])
-    n[0] /= length
-    n[1] /= length
-    n[2] /= length
-
-    return n
+# sort rows of snap's nodes, elements, nvalues or evalues array by ID
+# in place, since later snapshots may reference the same array
+
+def sort_ids(snap,name):
+    array = getattr(snap,name)
+    if array is not None: array[:] = array[np.argsort(array[:,0])]
@@ -21,6 +21,8 @@ o = olog("log.cell","",0)            3rd arg = average all runs
   if specify 2nd arg, it delimits a time section
   no 2nd arg or empty string, use default = "Step"
   if specify any 3rd arg, average all runs, assume all start at time 0
+    each run is added to running sums as it is read, one file at a time
+    entry i of the average is over all runs with more than i entries
 
 nvec = o.nvec                        # of vectors of thermo info
 nlen = o.nlen                        length of each vectors
@@ -30,11 +32,21 @@ o.write("file.txt")                  write all vectors to a file
 o.write("file.txt","A","B",...)      write listed vectors to a file
 
   get and write allow abbreviated (uniquely) vector names
+
+nruns = o.nruns                      # of runs averaged, 3rd arg only
+m,v,e = o.stats("A")                 mean, variance, std error of A over runs
+lo,hi = o.band("A")                  95% confidence band for mean of A
+lo,hi = o.band("A",0.99)             band for other confidence level
+
+  stats and band require the 3rd arg, they return one value per entry
+  entries with one run have variance and std error of nan
+  band is mean +/- z * std error, z from normal distribution
 """
 
 # History
 #   1/06, Steve Plimpton (SNL): original version
 #   2/09, modified to allow different firststr for different log files
+#   10/26, data stored as array, averages and statistics over runs
 
 # ToDo list
 
@@ -44,15 +56,17 @@ o.write("file.txt","A","B",...)      write listed vectors to a file
 #   names = list of vector names
 #   ptr = dictionary, key = name, value = index into data for which column
 #   data[i][j] = 2d array of floats, i = 0 to # of entries, j = 0 to nvecs-1
+#     mean over runs if averaging
 #   firststr = string that begins a time-series section in log file
+#   nruns = # of runs averaged
+#   count[i] = # of runs with an entry i
+#   m2[i][j] = sum of squared deviations from mean over runs, for variance
 
 # Imports and external programs
 
-import sys, re, glob
-from os import popen
-
-try: tmp = PIZZA_GUNZIP
-except: PIZZA_GUNZIP = "gunzip"
+import sys, re, glob, gzip
+from statistics import NormalDist
+import numpy as np
 
 # Class definition
 
@@ -60,7 +74,7 @@ class olog:
 
     # --------------------------------------------------------------------
 
-    def __init__(self,*list):
+    def __init__(self,*args):
         self.nvec = 0
         self.names = []
         self.ptr = {}
@@ -70,14 +84,14 @@ class olog:
 
         # flist = list of all log file names
 
-        words = list[0].split()
+        words = args[0].split()
         self.flist = []
         for word in words: self.flist += glob.glob(word)
-        if len(self.flist) == 0 and len(list) == 1:
+        if len(self.flist) == 0 and len(args) == 1:
             raise Exception("no log file specified")
 
-        if len(list) > 1 and len(list[1]): self.firststr = list[1]
-        if len(list) == 3: self.ave = 1
+        if len(args) > 1 and len(args[1]): self.firststr = args[1]
+        if len(args) == 3: self.ave = 1
 
         self.read_all()
 
@@ -88,18 +102,22 @@ class olog:
         self.read_header(self.flist[0])
         if self.nvec == 0: raise Exception("log file has no values")
 
-        # read all files
-
-        for file in self.flist: self.read_one(file)
-        print()
-
-        # if no average, sort entries by timestep, cull duplicates
-        # if average, call self.average()
+        # if no average, read all files, sort entries by timestep, cull duplicates
+        # if average, add runs in each file to running sums as it is read
 
         if self.ave == 0:
-            self.data.sort(self.compare)
-            self.cull()
-        else: self.average()
+            data = np.concatenate([self.read_one(file) for file in self.flist])
+            data = data[np.argsort(data[:,0],kind="stable")]
+            keep = np.ones(len(data),dtype=bool)
+            keep[1:] = data[1:,0] != data[:-1,0]
+            self.data = data[keep]
+        else:
+            self.nruns = 0
+            self.count = np.zeros(0,dtype=np.int64)
+            self.data = np.zeros((0,self.nvec))
+            self.m2 = np.zeros((0,self.nvec))
+            for file in self.flist: self.average(self.read_one(file))
+        print()
 
         self.nlen = len(self.data)
         print("read %d log entries" % self.nlen)
@@ -110,26 +128,8 @@ class olog:
         if len(keys) == 0:
             raise Exception("no log vectors specified")
 
-        map = []
-        for key in keys:
-            if key in self.ptr:
-                map.append(self.ptr[key])
-            else:
-                count = 0
-                for i in range(self.nvec):
-                    if self.names[i].find(key) == 0:
-                        count += 1
-                        index = i
-                if count == 1:
-                    map.append(index)
-                else:
-                    raise Exception("unique log vector %s not found" % key)
-
-        vecs = []
-        for i in range(len(keys)):
-            vecs.append(self.nlen * [0])
-            for j in range(self.nlen):
-                vecs[i][j] = self.data[j][map[i]]
+        map = self.indices(keys)
+        vecs = [self.data[:,i].tolist() for i in map]
 
         if len(keys) == 1: return vecs[0]
         else: return vecs
@@ -137,82 +137,107 @@ class olog:
     # --------------------------------------------------------------------
 
     def write(self,filename,*keys):
-        if len(keys):
-            map = []
-            for key in keys:
-                if key in self.ptr:
-                    map.append(self.ptr[key])
-                else:
-                    count = 0
-                    for i in range(self.nvec):
-                        if self.names[i].find(key) == 0:
-                            count += 1
-                            index = i
-                    if count == 1:
-                        map.append(index)
-                    else:
-                        raise Exception("unique log vector %s not found" % key)
-        else:
-            map = list(range(self.nvec))
+        if len(keys): map = self.indices(keys)
+        else: map = list(range(self.nvec))
 
         f = open(filename,"w")
-        for i in range(self.nlen):
-            for j in range(len(map)):
-                print(self.data[i][map[j]], end=' ', file=f)
+        for row in self.data[:,map].tolist():
+            for value in row: print(value, end=' ', file=f)
             print(file=f)
         f.close()
 
     # --------------------------------------------------------------------
+    # return mean, variance, std error of each key over averaged runs
+    # one list per key, all concatenated
 
-    def compare(self,a,b):
-        if a[0] < b[0]:
-            return -1
-        elif a[0] > b[0]:
-            return 1
-        else:
-            return 0
+    def stats(self,*keys):
+        if not self.ave: raise Exception("stats require averaged runs")
+        if len(keys) == 0:
+            raise Exception("no log vectors specified")
+
+        var,err = self.variance()
+        out = []
+        for i in self.indices(keys):
+            out += [self.data[:,i].tolist(),var[:,i].tolist(),err[:,i].tolist()]
+        return out
 
     # --------------------------------------------------------------------
+    # return lower, upper bound of confidence band for mean of each key
 
-    def cull(self):
-        i = 1
-        while i < len(self.data):
-            if self.data[i][0] == self.data[i-1][0]: del self.data[i]
-            else: i += 1
+    def band(self,key,level=0.95):
+        if not self.ave: raise Exception("band requires averaged runs")
+        if level <= 0.0 or level >= 1.0:
+            raise Exception("confidence level must be between 0 and 1")
+
+        z = NormalDist().inv_cdf(0.5 + 0.5*level)
+        i = self.indices([key])[0]
+        var,err = self.variance()
+        mean = self.data[:,i]
+        return (mean - z*err[:,i]).tolist(),(mean + z*err[:,i]).tolist()
 
     # --------------------------------------------------------------------
+    # convert keys to column indices, allow unique abbreviations
 
-    def average(self):
-        counts = []
-        data = []
-        nlen = 0
-
-        i = j = 0
-        while i < len(self.data):
-            if self.data[i][0] == 0: j = 0
-            if j >= nlen:
-                counts.append(0)
-                data.append(self.nvec*[0])
-                nlen += 1
-            counts[j] += 1
-            for m in range(self.nvec): data[j][m] += self.data[i][m]
-            j += 1
-            i += 1
-
-        for i in range(nlen):
-            for j in range(self.nvec):
-                data[i][j] /= counts[j]
-
-        self.nlen = nlen
-        self.data = data
+    def indices(self,keys):
+        map = []
+        for key in keys:
+            if key in self.ptr:
+                map.append(self.ptr[key])
+            else:
+                count = 0
+                for i in range(self.nvec):
+                    if self.names[i].find(key) == 0:
+                        count += 1
+                        index = i
+                if count == 1:
+                    map.append(index)
+                else:
+                    raise Exception("unique log vector %s not found" % key)
+        return map
+
+    # --------------------------------------------------------------------
+    # add runs in entries to running mean and squared deviations
+    # a new run starts at each entry with time 0
+    # each entry i is averaged over runs that have one, so runs can differ in length
+
+    def average(self,entries):
+        starts = np.nonzero(entries[:,0] == 0)[0].tolist()
+        if not starts or starts[0] != 0: starts.insert(0,0)
+        starts.append(len(entries))
+
+        for i in range(len(starts)-1):
+            run = entries[starts[i]:starts[i+1]]
+            n = len(run)
+            if n == 0: continue
+            if n > len(self.count):
+                extra = n - len(self.count)
+                self.count = np.concatenate((self.count,np.zeros(extra,dtype=np.int64)))
+                self.data = np.concatenate((self.data,np.zeros((extra,self.nvec))))
+                self.m2 = np.concatenate((self.m2,np.zeros((extra,self.nvec))))
+
+            # Welford update of first n entries
+
+            self.count[:n] += 1
+            delta = run - self.data[:n]
+            self.data[:n] += delta / self.count[:n,None]
+            self.m2[:n] += delta * (run - self.data[:n])
+            self.nruns += 1
+
+    # --------------------------------------------------------------------
+    # sample variance and std error of mean of each entry over runs
+    # nan where only one run contributed
+
+    def variance(self):
+        count = self.count[:,None]
+        var = np.full(self.m2.shape,np.nan)
+        np.divide(self.m2,count-1,out=var,where=count > 1)
+        return var,np.sqrt(var/count)
 
     # --------------------------------------------------------------------
 
     def read_header(self,file):
-        if file[-3:] == ".gz":
-            txt = popen("%s -c %s" % (PIZZA_GUNZIP,file),'r').read()
-        else:
-            txt = open(file).read()
+        if file[-3:] == ".gz": txt = gzip.open(file,'rt').read()
+        else: txt = open(file).read()
 
         s1 = txt.find(self.firststr)
         s2 = txt.find("\n",s1)
@@ -225,24 +250,13 @@ class olog:
         self.nvec = len(self.names)
 
     # --------------------------------------------------------------------
+    # read all entries of one file, return them as 2d array
 
-    def read_one(self,*list):
-
-        # if 2nd arg exists set file ptr to that value
-        # read entire (rest of) file into txt
-
-        file = list[0]
-        if file[-3:] == ".gz":
-            f = popen("%s -c %s" % (PIZZA_GUNZIP,file),'rb')
-        else:
-            f = open(file,'rb')
-
-        if len(list) == 2: f.seek(list[1])
-        txt = f.read()
-        if file[-3:] == ".gz": eof = 0
-        else: eof = f.tell()
-        f.close()
+    def read_one(self,file):
+        if file[-3:] == ".gz": txt = gzip.open(file,'rt').read()
+        else: txt = open(file).read()
 
+        rows = []
         start = last = 0
         while not last:
 
@@ -251,7 +265,7 @@ class olog:
             # s2 = 1st char on line after chunk
             # set last = 1 if this is last chunk in file, leave 0 otherwise
             # set start = position in file to start looking for next chunk
-            # rewind eof if final entry is incomplete
+            # drop final entry if incomplete
 
             s1 = txt.find(self.firststr,start)
             s2 = txt.find("Loop time of",start+1)
@@ -267,35 +281,49 @@ class olog:
                 last = 1
                 s1 = txt.find("\n",s1) + 1
                 s2 = txt.rfind("\n",s1) + 1
-                eof -= len(txt) - s2
             elif s1 == -1 and s2 == -1:            # found neither
                                                    # could be end-of-file section
                                                    # or entire read was one chunk
 
                 if txt.find("Loop time of",start) == start:   # end of file, so exit
-                    eof -= len(txt) - start                     # reset eof to "Loop"
                     break
 
                 last = 1                                      # entire read is a chunk
                 s1 = 0
                 s2 = txt.rfind("\n",s1) + 1
-                eof -= len(txt) - s2
                 if s1 == s2: break
 
             chunk = txt[s1:s2-1]
             start = s2
 
-            # split chunk into entries
-            # parse each entry for numeric fields, append to data
+            # parse chunk of entries as one array
+            # if it has other lines, keep only lines with nvec numbers
 
-            lines = chunk.split("\n")
-            for line in lines:
-                words = line.split()
-                self.data.append(list(map(float,words)))
+            try: values = np.fromstring(chunk,sep=" ")
+            except ValueError: values = None
+            if values is not None and len(values) % self.nvec == 0 and \
+               len(values) == self.nvec*(chunk.count("\n")+1):
+                block = values.reshape(-1,self.nvec)
+            else: block = parse_lines(chunk,self.nvec)
+            if len(block) == 0: continue
+            rows.append(block)
 
             # print last timestep of chunk
 
-            print(int(self.data[len(self.data)-1][0]), end=' ')
+            print(int(block[-1,0]), end=' ')
             sys.stdout.flush()
 
-        return eof
+        if not rows: return np.zeros((0,self.nvec))
+        return np.concatenate(rows)
+
+# --------------------------------------------------------------------
+# return 2d array of lines in txt that are nvec numbers, skip all others
+
+def parse_lines(txt,nvec):
+    rows = []
+    for line in txt.split("\n"):
+        words = line.split()
+        if len(words) != nvec: continue
+        try: rows.append([float(word) for word in words])
+        except ValueError: continue
+    return np.array(rows,dtype=np.float64).reshape(-1,nvec)
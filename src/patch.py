@@ -24,6 +24,8 @@ p.displace = [Dx,Dy,Dz]    displace particles randomly by +/- Dx,Dy,Dz
 p.style = "sphere"         atom-style of data file, molecular or sphere
 p.extra = "Molecules"      add extra Molecules section to data file
 p.extratype = 1            add extra atom types when write data file
+p.overlap = 1.0            min distance between sites of different molecules
+p.ntry = 1000              max placements tried per molecule (def = 100)
 
   randomized means choose molecules in random order when creating output
   if lattice is set, Nx*Ny*Nz must equal N for build (Nz = 1 for 2d)
@@ -33,6 +35,12 @@ p.extratype = 1            add extra atom types when write data file
   style = molecular by default
   style is auto-set to line,tri,box by corresponding keywords
   extratype = 0 by default
+  overlap = 0.0 = no check for overlaps = default
+  if overlap is set, a molecule with a site closer than overlap
+    to a site of an already placed molecule is placed again
+    with new random orientation and origin (only orientation on lattice)
+  error if a molecule cannot be placed in ntry tries
+  placed sites are binned in cells at least overlap wide, periodic in box
 
 p.build(100,"hex2",1,2,3)  create 100 "hex2" particles with params 1,2,3
 
@@ -70,6 +78,8 @@ p.write("data.patch")      write out system to LAMMPS data file
 
 # History
 #   8/05, Steve Plimpton (SNL): original version
+#   10/26, atoms/bonds streamed to data file in blocks by write()
+#   10/26, overlap-free placement of molecules via cell list
 
 # ToDo list
 
@@ -79,25 +89,30 @@ p.write("data.patch")      write out system to LAMMPS data file
 #   x,y,z = aspect ratio of box (def = 1,1,1)
 #   seed = random seed
 #   molecules = list of atoms, grouped by molecule
+#   overlap = min distance between sites of different molecules, 0 = any
+#   ntry = max # of placements tried per molecule when overlap is set
 
 # Imports and external programs
 
 from math import pi,sqrt,cos,sin
+import numpy as np
 from data import data
 
+MAXCELL = 1 << 23         # max # of cells, bounds cell index range
+
 # Class definition
 
 class patch:
 
     # --------------------------------------------------------------------
 
-    def __init__(self,vfrac,*list):
+    def __init__(self,vfrac,*args):
         self.vfrac = vfrac
         self.xaspect = self.yaspect = self.zaspect = 1.0
-        if len(list):
-            self.xaspect = list[0]
-            self.yaspect = list[1]
-            self.zaspect = list[2]
+        if len(args):
+            self.xaspect = args[0]
+            self.yaspect = args[1]
+            self.zaspect = args[2]
         self.seed = 12345
         self.randomized = 1
         self.dim = 3
@@ -110,6 +125,8 @@ class patch:
         self.style = "molecular"
         self.extra = ""
         self.extratype = 0
+        self.overlap = 0.0
+        self.ntry = 100
 
     # --------------------------------------------------------------------
     # call style method with extra args
@@ -117,9 +134,9 @@ class patch:
     # reset self.style for lines and triangles
 
     def build(self,n,style,*types):
-        cmd = "atoms,bonds,tris,segments,bodies,volume = self.%s(*types)" % style
+        method = getattr(self,style)
         for i in range(n):
-            exec(cmd)
+            atoms,bonds,tris,segments,bodies,volume = method(*types)
             self.molecules.append([atoms,bonds,tris,segments,bodies])
             self.volume += volume
 
@@ -154,15 +171,21 @@ class patch:
                 raise Exception("lattice inconsistent with # of molecules")
         else: latflag = 0
 
+        # stream atoms, bonds, tris, mols to data file as they are created
+
+        d = self.header()
+        w = d.stream(file,"Atoms","Bonds","Triangles","Molecules")
+        atoms = w.section("Atoms",ATOM_FORMATS[self.style])
+        bonds = w.section("Bonds","%d %d %d %d")
+        tris = w.section("Triangles","%d %g %g %g %g %g %g %g %g %g")
+        mols = w.section("Molecules","%d %d")
+
         idatom = idbond = idtri = idmol = 0
-        atoms = []
-        bonds = []
-        tris = []
-        mols = []
         xp = 3*[0]
         yp = 3*[0]
         zp = 3*[0]
         maxtypes = 0
+        grid = self.grid()
 
         while self.molecules:
             if self.randomized: i = int(self.random()*len(self.molecules))
@@ -172,51 +195,67 @@ class patch:
             idmol += 1
             triples = []
 
-            # xp[3],yp[3],zp[3] = randomly oriented, normalized basis vectors
-            # xp is in random direction
-            # yp is random dir crossed into xp
-            # zp is xp crossed into yp
-
-            xp[0] = self.random() - 0.5
-            xp[1] = self.random() - 0.5
-            xp[2] = self.random() - 0.5
-            r = sqrt(xp[0]*xp[0] + xp[1]*xp[1] + xp[2]*xp[2])
-            xp[0],xp[1],xp[2] = xp[0]/r,xp[1]/r,xp[2]/r
-
-            r0 = self.random() - 0.5
-            r1 = self.random() - 0.5
-            r2 = self.random() - 0.5
-            yp[0] = r1*xp[2] - r2*xp[1]
-            yp[1] = r2*xp[0] - r0*xp[2]
-            yp[2] = r0*xp[1] - r1*xp[0]
-            r = sqrt(yp[0]*yp[0] + yp[1]*yp[1] + yp[2]*yp[2])
-            yp[0],yp[1],yp[2] = yp[0]/r,yp[1]/r,yp[2]/r
-
-            zp[0] = xp[1]*yp[2] - xp[2]*yp[1]
-            zp[1] = xp[2]*yp[0] - xp[0]*yp[2]
-            zp[2] = xp[0]*yp[1] - xp[1]*yp[0]
-            r = sqrt(zp[0]*zp[0] + zp[1]*zp[1] + zp[2]*zp[2])
-            zp[0],zp[1],zp[2] = zp[0]/r,zp[1]/r,zp[2]/r
-
-            #xp[0] = 1; xp[1] = 0; xp[2] = 0
-            #yp[0] = 0; yp[1] = 1; yp[2] = 0
-            #zp[0] = 0; zp[1] = 0; zp[2] = 1
-
-            # random origin or lattice site for new particle
-
-            if latflag == 0:
-                xorig = self.xlo + self.random()*self.xprd
-                yorig = self.ylo + self.random()*self.yprd
-                zorig = self.zlo + self.random()*self.zprd
+            # place molecule, again if it overlaps molecules placed before
+
+            for itry in range(self.ntry):
+
+                # xp[3],yp[3],zp[3] = randomly oriented, normalized basis vectors
+                # xp is in random direction
+                # yp is random dir crossed into xp
+                # zp is xp crossed into yp
+
+                xp[0] = self.random() - 0.5
+                xp[1] = self.random() - 0.5
+                xp[2] = self.random() - 0.5
+                r = sqrt(xp[0]*xp[0] + xp[1]*xp[1] + xp[2]*xp[2])
+                xp[0],xp[1],xp[2] = xp[0]/r,xp[1]/r,xp[2]/r
+
+                r0 = self.random() - 0.5
+                r1 = self.random() - 0.5
+                r2 = self.random() - 0.5
+                yp[0] = r1*xp[2] - r2*xp[1]
+                yp[1] = r2*xp[0] - r0*xp[2]
+                yp[2] = r0*xp[1] - r1*xp[0]
+                r = sqrt(yp[0]*yp[0] + yp[1]*yp[1] + yp[2]*yp[2])
+                yp[0],yp[1],yp[2] = yp[0]/r,yp[1]/r,yp[2]/r
+
+                zp[0] = xp[1]*yp[2] - xp[2]*yp[1]
+                zp[1] = xp[2]*yp[0] - xp[0]*yp[2]
+                zp[2] = xp[0]*yp[1] - xp[1]*yp[0]
+                r = sqrt(zp[0]*zp[0] + zp[1]*zp[1] + zp[2]*zp[2])
+                zp[0],zp[1],zp[2] = zp[0]/r,zp[1]/r,zp[2]/r
+
+                #xp[0] = 1; xp[1] = 0; xp[2] = 0
+                #yp[0] = 0; yp[1] = 1; yp[2] = 0
+                #zp[0] = 0; zp[1] = 0; zp[2] = 1
+
+                # random origin or lattice site for new particle
+
+                if latflag == 0:
+                    xorig = self.xlo + self.random()*self.xprd
+                    yorig = self.ylo + self.random()*self.yprd
+                    zorig = self.zlo + self.random()*self.zprd
+                else:
+                    ix = (idmol-1) % self.lattice[0]
+                    iy = (idmol-1)//self.lattice[0] % self.lattice[1]
+                    iz = (idmol-1) // (self.lattice[0]*self.lattice[1])
+                    xorig = self.xlo + ix*self.xprd/self.lattice[0]
+                    yorig = self.ylo + iy*self.yprd/self.lattice[1]
+                    zorig = self.zlo + iz*self.zprd/self.lattice[2]
+
+                #xorig = 0; yorig = 0; zorig = 0
+
+                # x,y,z,ix,iy,iz of each site, with random displacement
+                # for molecular and sphere style
+
+                orig = (xorig,yorig,zorig)
+                pos,image = self.place(molecule[0],orig,(xp,yp,zp),
+                                       self.style in ("molecular","sphere"))
+                if not grid or not grid.overlaps(pos): break
             else:
-                ix = (idmol-1) % self.lattice[0]
-                iy = (idmol-1)/self.lattice[0] % self.lattice[1]
-                iz = (idmol-1) / (self.lattice[0]*self.lattice[1])
-                xorig = self.xlo + ix*self.xprd/self.lattice[0]
-                yorig = self.ylo + iy*self.yprd/self.lattice[1]
-                zorig = self.zlo + iz*self.zprd/self.lattice[2]
-
-            #xorig = 0; yorig = 0; zorig = 0
+                raise Exception("could not place molecule %d in %d tries" % \
+                                (idmol,self.ntry))
+            if grid: grid.add(pos)
 
             # unpack bonds in molecule before atoms so idatom = all previous atoms
 
@@ -228,64 +267,37 @@ class patch:
 
             for triple in molecule[2]: triples.append(triple)
 
-            # unpack atoms in molecule
-            # xnew,ynew,xnew = coeffs in new rotated basis vectors
-            # x,y,z = coeffs in original xyz axes
-            # apply random displace to final x,y,z for molecular style
+            # unpack atoms in molecule at their placed x,y,z
             # format data file for moleular or tri atom style
 
             if self.style == "molecular":
-                for atom in molecule[0]:
+                for i,atom in enumerate(molecule[0]):
                     idatom += 1
-                    xnew = atom[1]
-                    ynew = atom[2]
-                    znew = atom[3]
-                    x = xorig + xnew*xp[0] + ynew*yp[0] + znew*zp[0]
-                    y = yorig + xnew*xp[1] + ynew*yp[1] + znew*zp[1]
-                    z = zorig + xnew*xp[2] + ynew*yp[2] + znew*zp[2]
-                    x += (self.random()-0.5)*2*self.displace[0]
-                    y += (self.random()-0.5)*2*self.displace[1]
-                    z += (self.random()-0.5)*2*self.displace[2]
-                    ix = iy = iz = 0
-                    x,y,z,ix,iy,iz = self.pbc(x,y,z,ix,iy,iz)
+                    x,y,z = pos[i]
+                    ix,iy,iz = image[i]
                     atoms.append([idatom,idmol,atom[0],x,y,z,ix,iy,iz])
-                    mols.append((idatom,idmol))
+                    if self.extra == "Molecules": mols.append((idatom,idmol))
                     maxtypes = max(maxtypes,atom[0])
 
             elif self.style == "sphere":
-                for atom in molecule[0]:
+                for i,atom in enumerate(molecule[0]):
                     idatom += 1
-                    xnew = atom[1]
-                    ynew = atom[2]
-                    znew = atom[3]
-                    x = xorig + xnew*xp[0] + ynew*yp[0] + znew*zp[0]
-                    y = yorig + xnew*xp[1] + ynew*yp[1] + znew*zp[1]
-                    z = zorig + xnew*xp[2] + ynew*yp[2] + znew*zp[2]
-                    x += (self.random()-0.5)*2*self.displace[0]
-                    y += (self.random()-0.5)*2*self.displace[1]
-                    z += (self.random()-0.5)*2*self.displace[2]
-                    ix = iy = iz = 0
-                    x,y,z,ix,iy,iz = self.pbc(x,y,z,ix,iy,iz)
+                    x,y,z = pos[i]
+                    ix,iy,iz = image[i]
                     atoms.append([idatom,atom[0],1.0,1.0,x,y,z,ix,iy,iz])
-                    mols.append((idatom,idmol))
+                    if self.extra == "Molecules": mols.append((idatom,idmol))
                     maxtypes = max(maxtypes,atom[0])
 
             elif self.style == "tri":
                 for i,atom in enumerate(molecule[0]):
                     idatom += 1
-                    xnew = atom[1]
-                    ynew = atom[2]
-                    znew = atom[3]
-                    x = xorig + xnew*xp[0] + ynew*yp[0] + znew*zp[0]
-                    y = yorig + xnew*xp[1] + ynew*yp[1] + znew*zp[1]
-                    z = zorig + xnew*xp[2] + ynew*yp[2] + znew*zp[2]
+                    x,y,z = pos[i]
+                    ix,iy,iz = image[i]
                     mass = 1.0
-                    ix = iy = iz = 0
-                    x,y,z,ix,iy,iz = self.pbc(x,y,z,ix,iy,iz)
                     if not triples: triflag = 0
                     else: triflag = 1
                     atoms.append([idatom,idmol,atom[0],triflag,mass,x,y,z,ix,iy,iz])
-                    mols.append((idatom,idmol))
+                    if self.extra == "Molecules": mols.append((idatom,idmol))
                     maxtypes = max(maxtypes,atom[0])
 
                     if triflag:
@@ -316,75 +328,11 @@ class patch:
                             self.pbc_near(triple[6],triple[7],triple[8],x,y,z)
                         tris.append([idatom] + triple)
 
-        # create the data file
+        # finish the data file, close() sets counts of atoms, bonds, tris
 
-        d = data()
-        d.title = "LAMMPS data file for Nanoparticles"
-        d.headers["atoms"] = len(atoms)
         d.headers["atom types"] = maxtypes + self.extratype
-        if bonds:
-            d.headers["bonds"] = len(bonds)
-            d.headers["bond types"] = 1
-        if tris: d.headers["triangles"] = len(tris)
-
-        if tris: print("TRIS",len(tris),d.headers["triangles"])
-        d.headers["xlo xhi"] = (self.xlo,self.xhi)
-        d.headers["ylo yhi"] = (self.ylo,self.yhi)
-        d.headers["zlo zhi"] = (self.zlo,self.zhi)
-
-        # atoms section of data file
-
-        records = []
-        if self.style == "molecular":
-            for atom in atoms:
-                one = "%d %d %d %g %g %g %d %d %d\n" % \
-                    (atom[0], atom[1], atom[2], atom[3], atom[4], atom[5],
-                     atom[6], atom[7], atom[8])
-                records.append(one)
-        elif self.style == "sphere":
-            for atom in atoms:
-                one = "%d %d %g %g %g %g %g %d %d %d\n" % \
-                    (atom[0], atom[1], atom[2], atom[3], atom[4], atom[5],
-                     atom[6], atom[7], atom[8], atom[9])
-                records.append(one)
-        elif self.style == "tri":
-            for atom in atoms:
-                one = "%d %d %d %d %g %g %g %g %d %d %d\n" % \
-                    (atom[0], atom[1], atom[2], atom[3], atom[4], atom[5],
-                     atom[6], atom[7], atom[8], atom[9], atom[10])
-                records.append(one)
-        d.sections["Atoms"] = records
-
-        # bonds section of data file
-
-        if bonds:
-            lines = []
-            for bond in bonds:
-                line = "%d %d %d %d\n" % (bond[0], bond[1], bond[2], bond[3])
-                lines.append(line)
-            d.sections["Bonds"] = lines
-
-           # triangles section of data file
-
-        if tris:
-            records = []
-            for tri in tris:
-                one = "%d %g %g %g %g %g %g %g %g %g\n" % \
-                    (tri[0],tri[1],tri[2],tri[3],tri[4],tri[5],
-                     tri[6],tri[7],tri[8],tri[9])
-                records.append(one)
-            d.sections["Triangles"] = records
-
-        # extra Molecules section if requested
-
-        if self.extra == "Molecules":
-            records = []
-            for mol in mols:
-                one = "%d %d\n" % (mol[0],mol[1])
-                records.append(one)
-            d.sections["Molecules"] = records
-
-        d.write(file)
+        if len(bonds): d.headers["bond types"] = 1
+        w.close()
 
     # --------------------------------------------------------------------
     # write a 2d simulation to data file
@@ -408,15 +356,22 @@ class patch:
                 raise Exception("lattice inconsistent with # of molecules")
         else: latflag = 0
 
+        # stream atoms, bonds, lines, mols to data file as they are created
+        # bodies have variable-length records, so are written by close()
+
+        d = self.header()
+        w = d.stream(file,"Atoms","Bonds","Lines","Molecules")
+        atoms = w.section("Atoms",ATOM_FORMATS[self.style])
+        bonds = w.section("Bonds","%d %d %d %d")
+        lines = w.section("Lines","%d %g %g %g %g")
+        mols = w.section("Molecules","%d %d")
+
         idatom = idbond = idmol = 0
-        atoms = []
-        bonds = []
-        lines = []
         bodies = []
-        mols = []
         xp = 3*[0]
         yp = 3*[0]
         maxtypes = 0
+        grid = self.grid()
 
         while self.molecules:
             if self.randomized: i = int(self.random()*len(self.molecules))
@@ -427,32 +382,52 @@ class patch:
             segments = []
             subs = []
 
-            # xp[2],yp[2] = randomly oriented, normalized basis vectors
-            # xp is in random direction
-            # yp is (0,0,1) crossed into xp
+            # place molecule, again if it overlaps molecules placed before
+            # body style has only its 1st atom in data file
+
+            sites = molecule[0]
+            if self.style == "body": sites = sites[:1]
+
+            for itry in range(self.ntry):
+
+                # xp[2],yp[2] = randomly oriented, normalized basis vectors
+                # xp is in random direction
+                # yp is (0,0,1) crossed into xp
 
-            xp[0] = self.random() - 0.5
-            xp[1] = self.random() - 0.5
-            r = sqrt(xp[0]*xp[0] + xp[1]*xp[1])
-            xp[0],xp[1] = xp[0]/r,xp[1]/r
+                xp[0] = self.random() - 0.5
+                xp[1] = self.random() - 0.5
+                r = sqrt(xp[0]*xp[0] + xp[1]*xp[1])
+                xp[0],xp[1] = xp[0]/r,xp[1]/r
 
-            yp[0] = -xp[1]
-            yp[1] = xp[0]
-            r = sqrt(yp[0]*yp[0] + yp[1]*yp[1])
-            yp[0],yp[1] = yp[0]/r,yp[1]/r
+                yp[0] = -xp[1]
+                yp[1] = xp[0]
+                r = sqrt(yp[0]*yp[0] + yp[1]*yp[1])
+                yp[0],yp[1] = yp[0]/r,yp[1]/r
 
-            # random origin or lattice site for new particle
+                # random origin or lattice site for new particle
 
-            if latflag == 0:
-                xorig = self.xlo + self.random()*self.xprd
-                yorig = self.ylo + self.random()*self.yprd
-                zorig = 0.0
+                if latflag == 0:
+                    xorig = self.xlo + self.random()*self.xprd
+                    yorig = self.ylo + self.random()*self.yprd
+                    zorig = 0.0
+                else:
+                    ix = (idmol-1) % self.lattice[0]
+                    iy = (idmol-1) // self.lattice[0]
+                    xorig = self.xlo + ix*self.xprd/self.lattice[0]
+                    yorig = self.ylo + iy*self.yprd/self.lattice[1]
+                    zorig = 0.0
+
+                # x,y,z,ix,iy,iz of each site, z is as in molecule
+                # random displacement for molecular and sphere style
+
+                orig = (xorig,yorig,zorig)
+                pos,image = self.place(sites,orig,(xp,yp),
+                                       self.style in ("molecular","sphere"))
+                if not grid or not grid.overlaps(pos): break
             else:
-                ix = (idmol-1) % self.lattice[0]
-                iy = (idmol-1) / self.lattice[0]
-                xorig = self.xlo + ix*self.xprd/self.lattice[0]
-                yorig = self.ylo + iy*self.yprd/self.lattice[1]
-                zorig = 0.0
+                raise Exception("could not place molecule %d in %d tries" % \
+                                (idmol,self.ntry))
+            if grid: grid.add(pos)
 
             # unpack bonds in molecule before atoms so idatom = all previous atoms
             # segments = molecule[3] field = displacement from associated atom
@@ -464,42 +439,26 @@ class patch:
             segments = molecule[3]
             subs = molecule[4]
 
-            # unpack atoms in molecule
-            # xnew,ynew,xnew = coeffs in new rotated basis vectors
-            # x,y,z = coeffs in original xyz axes
-            # apply random displace to final x,y for molecular style
+            # unpack atoms in molecule at their placed x,y,z
+            # xnew,ynew = coeffs in new rotated basis vectors, for line segments
             # format data file for moleular or line atom style
 
             if self.style == "molecular":
                 for i,atom in enumerate(molecule[0]):
                     idatom += 1
-                    xnew = atom[1]
-                    ynew = atom[2]
-                    x = xorig + xnew*xp[0] + ynew*yp[0]
-                    y = yorig + xnew*xp[1] + ynew*yp[1]
-                    z = atom[3]
-                    x += (self.random()-0.5)*2*self.displace[0]
-                    y += (self.random()-0.5)*2*self.displace[1]
-                    ix = iy = iz = 0
-                    x,y,z,ix,iy,iz = self.pbc(x,y,z,ix,iy,iz)
+                    x,y,z = pos[i]
+                    ix,iy,iz = image[i]
                     atoms.append([idatom,idmol,atom[0],x,y,z,ix,iy,iz])
-                    mols.append((idatom,idmol))
+                    if self.extra == "Molecules": mols.append((idatom,idmol))
                     maxtypes = max(maxtypes,atom[0])
 
             elif self.style == "sphere":
                 for i,atom in enumerate(molecule[0]):
                     idatom += 1
-                    xnew = atom[1]
-                    ynew = atom[2]
-                    x = xorig + xnew*xp[0] + ynew*yp[0]
-                    y = yorig + xnew*xp[1] + ynew*yp[1]
-                    z = atom[3]
-                    x += (self.random()-0.5)*2*self.displace[0]
-                    y += (self.random()-0.5)*2*self.displace[1]
-                    ix = iy = iz = 0
-                    x,y,z,ix,iy,iz = self.pbc(x,y,z,ix,iy,iz)
+                    x,y,z = pos[i]
+                    ix,iy,iz = image[i]
                     atoms.append([idatom,atom[0],1.0,1.0,x,y,z,ix,iy,iz])
-                    mols.append((idatom,idmol))
+                    if self.extra == "Molecules": mols.append((idatom,idmol))
                     maxtypes = max(maxtypes,atom[0])
 
             elif self.style == "line":
@@ -507,16 +466,13 @@ class patch:
                     idatom += 1
                     xnew = atom[1]
                     ynew = atom[2]
-                    x = xorig + xnew*xp[0] + ynew*yp[0]
-                    y = yorig + xnew*xp[1] + ynew*yp[1]
-                    z = atom[3]
+                    x,y,z = pos[i]
+                    ix,iy,iz = image[i]
                     mass = 1.0
-                    ix = iy = iz = 0
-                    x,y,z,ix,iy,iz = self.pbc(x,y,z,ix,iy,iz)
                     if not segments: lineflag = 0
                     else: lineflag = 1
                     atoms.append([idatom,idmol,atom[0],lineflag,mass,x,y,z,ix,iy,iz])
-                    mols.append((idatom,idmol))
+                    if self.extra == "Molecules": mols.append((idatom,idmol))
                     maxtypes = max(maxtypes,atom[0])
 
                     if lineflag:
@@ -538,18 +494,13 @@ class patch:
             elif self.style == "body":
                 atom = molecule[0][0]
                 idatom += 1
-                xnew = atom[1]
-                ynew = atom[2]
-                x = xorig + xnew*xp[0] + ynew*yp[0]
-                y = yorig + xnew*xp[1] + ynew*yp[1]
-                z = atom[3]
+                x,y,z = pos[0]
+                ix,iy,iz = image[0]
                 mass = atom[4]
-                ix = iy = iz = 0
-                x,y,z,ix,iy,iz = self.pbc(x,y,z,ix,iy,iz)
                 if not subs: bodyflag = 0
                 else: bodyflag = 1
                 atoms.append([idatom,atom[0],bodyflag,mass,x,y,z,ix,iy,iz])
-                mols.append((idatom,idmol))
+                if self.extra == "Molecules": mols.append((idatom,idmol))
                 maxtypes = max(maxtypes,atom[0])
 
                 if bodyflag:
@@ -572,67 +523,11 @@ class patch:
                         dvalues += one
                     bodies.append([idatom,ivalues,dvalues])
 
-        # create the data file
+        # finish the data file, close() sets counts of atoms, bonds, lines
 
-        d = data()
-        d.title = "LAMMPS data file for Nanoparticles"
-        d.headers["atoms"] = len(atoms)
         d.headers["atom types"] = maxtypes + self.extratype
-        if bonds:
-            d.headers["bonds"] = len(bonds)
-            d.headers["bond types"] = 1
-        if lines: d.headers["lines"] = len(lines)
+        if len(bonds): d.headers["bond types"] = 1
         if bodies: d.headers["bodies"] = len(bodies)
-        d.headers["xlo xhi"] = (self.xlo,self.xhi)
-        d.headers["ylo yhi"] = (self.ylo,self.yhi)
-        d.headers["zlo zhi"] = (self.zlo,self.zhi)
-
-        # atoms section of data file
-
-        records = []
-        if self.style == "molecular":
-            for atom in atoms:
-                one = "%d %d %d %g %g %g %d %d %d\n" % \
-                    (atom[0], atom[1], atom[2], atom[3], atom[4], atom[5],
-                     atom[6], atom[7], atom[8])
-                records.append(one)
-        elif self.style == "sphere":
-            for atom in atoms:
-                one = "%d %d %g %g %g %g %g %d %d %d\n" % \
-                    (atom[0], atom[1], atom[2], atom[3], atom[4], atom[5],
-                     atom[6], atom[7], atom[8], atom[9])
-                records.append(one)
-        elif self.style == "line":
-            for atom in atoms:
-                one = "%d %d %d %d %g %g %g %g %d %d %d\n" % \
-                    (atom[0], atom[1], atom[2], atom[3], atom[4], atom[5],
-                     atom[6], atom[7], atom[8], atom[9], atom[10])
-                records.append(one)
-        elif self.style == "body":
-            for atom in atoms:
-                one = "%d %d %d %d %g %g %g %g %d %d\n" % \
-                    (atom[0], atom[1], atom[2], atom[3], atom[4], atom[5],
-                     atom[6], atom[7], atom[8], atom[9])
-                records.append(one)
-        d.sections["Atoms"] = records
-
-        # bonds section of data file
-
-        if bonds:
-            records = []
-            for bond in bonds:
-                one = "%d %d %d %d\n" % (bond[0], bond[1], bond[2], bond[3])
-                records.append(one)
-            d.sections["Bonds"] = records
-
-        # lines section of data file
-
-        if lines:
-            records = []
-            for line in lines:
-                one = "%d %g %g %g %g\n" % (line[0],line[1],line[2],line[3],line[4])
-                records.append(one)
-            d.sections["Lines"] = records
 
         # bodies section of data file
         # print ivalues and dvalues in sets of 10 per line
@@ -662,16 +557,18 @@ class patch:
                     i += len(list)
             d.sections["Bodies"] = records
 
-        # extra Molecules section if requested
+        w.close()
 
-        if self.extra == "Molecules":
-            records = []
-            for mol in mols:
-                one = "%d %d\n" % (mol[0],mol[1])
-                records.append(one)
-            d.sections["Molecules"] = records
+    # --------------------------------------------------------------------
+    # data object with title and box of data file
 
-        d.write(file)
+    def header(self):
+        d = data()
+        d.title = "LAMMPS data file for Nanoparticles"
+        d.headers["xlo xhi"] = (self.xlo,self.xhi)
+        d.headers["ylo yhi"] = (self.ylo,self.yhi)
+        d.headers["zlo zhi"] = (self.zlo,self.zhi)
+        return d
 
     # --------------------------------------------------------------------
     # adjust x,y,z to be inside periodic box
@@ -709,6 +606,51 @@ class patch:
         elif znew-z > 0.5*self.zprd: znew -= self.zprd
         return xnew,ynew,znew
 
+    # --------------------------------------------------------------------
+    # x,y,z of atoms in molecule placed at orig with basis vectors xp,yp(,zp)
+    # 2d basis has only xp,yp and z of each atom is unchanged
+    # if displace, add random displacement of +/- displace to each atom
+    # return x,y,z and ix,iy,iz of each atom as arrays, after pbc()
+
+    def place(self,atoms,orig,basis,displace):
+        coeffs = np.array([atom[1:4] for atom in atoms],dtype=np.float64)
+        pos = np.empty((len(atoms),3))
+        if len(basis) == 3:
+            xp,yp,zp = basis
+            for i in range(3):
+                pos[:,i] = orig[i] + coeffs[:,0]*xp[i] + coeffs[:,1]*yp[i] + \
+                    coeffs[:,2]*zp[i]
+        else:
+            xp,yp = basis
+            for i in range(2):
+                pos[:,i] = orig[i] + coeffs[:,0]*xp[i] + coeffs[:,1]*yp[i]
+            pos[:,2] = coeffs[:,2]
+
+        if displace:
+            ndim = len(basis)
+            for pos1 in pos:
+                for i in range(ndim):
+                    pos1[i] += (self.random()-0.5)*2*self.displace[i]
+
+        lo = np.array([self.xlo,self.ylo,self.zlo])
+        hi = np.array([self.xhi,self.yhi,self.zhi])
+        prd = hi - lo
+        image = np.zeros(pos.shape,dtype=int)
+        below = pos < lo
+        above = ~below & (pos >= hi)
+        pos += (below*1.0 - above*1.0)*prd
+        image += above.astype(int) - below.astype(int)
+        return pos,image
+
+    # --------------------------------------------------------------------
+    # cell list for overlap checks, None if overlap is not set
+
+    def grid(self):
+        if self.overlap <= 0.0: return None
+        lo = [self.xlo,self.ylo,self.zlo]
+        prd = [self.xprd,self.yprd,self.zprd]
+        return cellgrid(lo[:self.dim],prd[:self.dim],self.overlap)
+
     # --------------------------------------------------------------------
     # params = diam,type1,type2,type3
     # type1 = type of non-patch atoms, type2 = type of patch atoms
@@ -1460,7 +1402,7 @@ class patch:
     # --------------------------------------------------------------------
 
     def random(self):
-        k = self.seed/IQ
+        k = self.seed//IQ
         self.seed = IA*(self.seed-k*IQ) - IR*k
         if self.seed < 0:
             self.seed += IM
@@ -1475,6 +1417,69 @@ IA = 16807
 IQ = 127773
 IR = 2836
 
+# --------------------------------------------------------------------
+# cell list of sites of placed molecules, periodic in each dimension
+# cells are at least cutoff wide, so a site's neighbors within cutoff
+#   are in its own or adjacent cells
+# bins = dictionary of cell index -> list of indices in x of sites in cell
+#   only cells with sites have an entry, so memory follows # of sites
+
+class cellgrid:
+
+    def __init__(self,lo,prd,cutoff):
+        self.dim = len(lo)
+        self.lo = np.array(lo,dtype=np.float64)
+        self.prd = np.array(prd,dtype=np.float64)
+        self.cutsq = cutoff*cutoff
+
+        # cells per dimension, fewer if more than MAXCELL in all
+
+        size = max(cutoff,(np.prod(self.prd)/MAXCELL)**(1.0/self.dim))
+        self.n = np.maximum(1,(self.prd/size).astype(int))
+        self.size = self.prd / self.n
+        self.stride = np.cumprod(np.concatenate(([1],self.n[:-1])))
+        shape = (3,)*self.dim
+        self.offsets = np.indices(shape).reshape(self.dim,-1).T - 1
+
+        self.bins = {}
+        self.x = np.zeros((1024,self.dim))
+        self.nsite = 0
+
+    # return index of cell of each site, x = N x 3 array of sites
+
+    def cells(self,x,offsets=None):
+        c = np.floor((x[:,:self.dim] - self.lo)/self.size).astype(np.int64)
+        c = np.minimum(np.maximum(c,0),self.n-1)
+        if offsets is not None: c = (c[:,None,:] + offsets) % self.n
+        return (c*self.stride).sum(axis=-1)
+
+    # return 1 if any site in x is within cutoff of a site in the grid
+    # all sites in x are checked against all sites in cells next to any of them
+
+    def overlaps(self,x):
+        ids = []
+        for cell in np.unique(self.cells(x,self.offsets)).tolist():
+            sites = self.bins.get(cell)
+            if sites: ids += sites
+        if not ids: return 0
+        delta = self.x[ids] - x[:,None,:self.dim]
+        delta -= self.prd*np.round(delta/self.prd)
+        rsq = (delta*delta).sum(axis=-1)
+        return int((rsq < self.cutsq).any())
+
+    # add sites in x to the grid
+
+    def add(self,x):
+        n = len(x)
+        if self.nsite + n > len(self.x):
+            grow = np.zeros((max(2*len(self.x),self.nsite+n),self.dim))
+            grow[:self.nsite] = self.x[:self.nsite]
+            self.x = grow
+        self.x[self.nsite:self.nsite+n] = x[:,:self.dim]
+        for i,cell in enumerate(self.cells(x).tolist()):
+            self.bins.setdefault(cell,[]).append(self.nsite+i)
+        self.nsite += n
+
 # --------------------------------------------------------------------
 # push atom onto sphere surface of diam and return [type,x,y,z]
 
@@ -1529,6 +1534,15 @@ def tether(m,mtype,blen,dmin,atom0,atom1,random):
             if not restriction: atoms.append([mtype,x,y,z])
     return atoms[2:]
 
+# --------------------------------------------------------------------
+# format of an Atoms section line for each atom style
+
+ATOM_FORMATS = {"molecular": "%d %d %d %g %g %g %d %d %d",
+                "sphere": "%d %d %g %g %g %g %g %d %d %d",
+                "tri": "%d %d %d %d %g %g %g %g %d %d %d",
+                "line": "%d %d %d %d %g %g %g %g %d %d %d",
+                "body": "%d %d %d %g %g %g %g %d %d %d"}
+
 # --------------------------------------------------------------------
 # templates
 
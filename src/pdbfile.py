@@ -47,10 +47,14 @@ index,time,flag = p.iterator(1)
     time = timestep value (time stamp for snapshot, index for multiple PDB)
     flag = -1 when iteration is done, 1 otherwise
   typically call p.single(time) in iterated loop to write out one PDB file
+
+p.nworkers = 4              max # of snapshots many() converts at once
+                              def = # of CPUs
 """
 
 # History
 #   8/05, Steve Plimpton (SNL): original version
+#   10/26, snapshots formatted as arrays, many() converts them in parallel
 
 # ToDo list
 #   for generic PDB file (no template) from a LJ unit system,
@@ -59,12 +63,21 @@ index,time,flag = p.iterator(1)
 # Variables
 #   files = list of input PDB files
 #   data = data object (ccell,data,dump) to read snapshots from
-#   atomlines = dict of ATOM lines in original PDB file
-#     key = atom id, value = tuple of (beginning,end) of line
+#   nworkers = max # of snapshots converted at once by many()
+#   template = 2d byte array of ATOM lines in original PDB file, 1 per row
+#     each is beginning (30 chars) + 24 blanks for x,y,z + end of line
+#     rows are padded with blanks to the longest line
+#   tsize = length of each line in template
+#   trow = index array, trow[id] = row of atom id in template, -1 if none
 
 # Imports and external programs
 
-import sys, types, glob, urllib.request, urllib.parse, urllib.error
+import sys, os, types, glob, urllib.request, urllib.parse, urllib.error
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import vizarray
+
+GENERIC = b"ATOM %6d %2d   R00     1    %8.3f%8.3f%8.3f  1.00  0.00    NONE\n"
 
 # Class definition
 
@@ -73,8 +86,9 @@ class pdbfile:
     # --------------------------------------------------------------------
 
     def __init__(self,*args):
+        self.nworkers = os.cpu_count()
         if len(args) == 1:
-            if type(args[0]) is bytes:
+            if type(args[0]) is str:
                 filestr = args[0]
                 self.data = None
             else:
@@ -170,42 +184,28 @@ class pdbfile:
         if len(args) == 0: root = "tmp"
         else: root = args[0]
 
+        # snapshots are converted on up to nworkers threads
+        # each writes its own file, times are printed in snapshot order
+
         if self.data:
-            n = flag = 0
+            jobs = []
+            flag = 0
             while 1:
                 which,time,flag = self.data.iterator(flag)
                 if flag == -1: break
+                file = numbered(root,len(jobs)) + ".pdb"
+                jobs.append((which,time,file))
 
-                if n < 10:
-                    file = root + "000" + str(n)
-                elif n < 100:
-                    file = root + "00" + str(n)
-                elif n < 1000:
-                    file = root + "0" + str(n)
-                else:
-                    file = root + str(n)
-                file += ".pdb"
-
-                f = open(file,'w')
-                self.convert(f,which)
-                f.close()
-
-                print(time, end=' ')
-                sys.stdout.flush()
-                n += 1
+            n = len(jobs)
+            with ThreadPoolExecutor(max(1,self.nworkers or 1)) as pool:
+                for time in pool.map(lambda job: self.write(*job),jobs):
+                    print(time, end=' ')
+                    sys.stdout.flush()
 
         else:
             n = 0
             for infile in self.files:
-                if n < 10:
-                    file = root + "000" + str(n)
-                elif n < 100:
-                    file = root + "00" + str(n)
-                elif n < 1000:
-                    file = root + "0" + str(n)
-                else:
-                    file = root + str(n)
-                file += ".pdb"
+                file = numbered(root,n) + ".pdb"
 
                 f = open(file,'w')
                 f.write(open(infile,'r').read())
@@ -217,6 +217,15 @@ class pdbfile:
 
         print("\nwrote %d datasets to %s*.pdb in PDB format" % (n,root))
 
+    # --------------------------------------------------------------------
+    # write snapshot which as PDB file, return its time stamp
+
+    def write(self,which,time,file):
+        f = open(file,'w')
+        self.convert(f,which)
+        f.close()
+        return time
+
     # --------------------------------------------------------------------
     # write a single PDB file
     # if data exists:
@@ -257,33 +266,115 @@ class pdbfile:
         return self.data.iterator(flag)
 
     # --------------------------------------------------------------------
-    # read a PDB file and store ATOM lines
+    # read a PDB file and store ATOM lines with a blank x,y,z field
+    # build index from atom id to row of its line
 
     def read_template(self,file):
-        lines = open(file,'r').readlines()
-        self.atomlines = {}
+        lines = open(file,'rb').read().splitlines()
+        ids = []
+        rows = []
         for line in lines:
-            if line.find("ATOM") == 0:
-                tag = int(line[4:11])
-                begin = line[:30]
-                end = line[54:]
-                self.atomlines[tag] = (begin,end)
+            if line.find(b"ATOM") == 0:
+                ids.append(int(line[4:11]))
+                rows.append(line[:30].ljust(30) + 24*b" " + line[54:] + b"\n")
+
+        self.tsize = np.array([len(row) for row in rows],dtype=np.intp)
+        width = self.tsize.max() if rows else 0
+        self.template = np.frombuffer(b"".join(row.ljust(width) for row in rows),
+                                      dtype=np.uint8).reshape(len(rows),width)
+        ids = np.array(ids,dtype=np.intp)
+        if len(ids) and ids.min() < 0: raise Exception("negative atom ID in PDB file")
+        self.trow = np.full(ids.max()+1 if len(ids) else 0,-1,dtype=np.intp)
+        self.trow[ids] = np.arange(len(ids))
 
     # --------------------------------------------------------------------
     # convert one set of atoms to PDB format and write to f
+    # with template, atom only written if its id is in template
 
     def convert(self,f,which):
-        time,box,atoms,bonds,tris,lines = self.data.viz(which)
+        time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(self.data,which)
         if len(self.files):
-            for atom in atoms:
-                id = atom[0]
-                if id in self.atomlines:
-                    (begin,end) = self.atomlines[id]
-                    line = "%s%8.3f%8.3f%8.3f%s" % (begin,atom[2],atom[3],atom[4],end)
-                    print(line, end=' ', file=f)
+            id = atoms[:,0].astype(np.intp)
+            row = np.full(len(id),-1,dtype=np.intp)
+            valid = (id >= 0) & (id < len(self.trow))
+            row[valid] = self.trow[id[valid]]
+            keep = row >= 0
+            row = row[keep]
+            xyz = atoms[keep,2:5]
+            buf = self.template[row]
+            size = self.tsize[row]
+        else:
+            xyz = atoms[:,2:5]
+            buf = np.tile(np.frombuffer(GENERIC % (0,0,0,0,0),dtype=np.uint8),
+                          (len(atoms),1))
+            size = None
+
+        fits = fixed(buf,30,xyz[:,0],8,3)
+        fits &= fixed(buf,38,xyz[:,1],8,3)
+        fits &= fixed(buf,46,xyz[:,2],8,3)
+        if size is None:
+            fits &= fixed(buf,5,np.trunc(atoms[:,0]),6,0)
+            fits &= fixed(buf,12,np.trunc(atoms[:,1]),2,0)
+
+        # rare rows with a field too wide for its column are formatted as text
+
+        if fits.all():
+            if size is None: text = buf.tobytes()
+            else: text = buf[np.arange(buf.shape[1]) < size[:,None]].tobytes()
+        elif size is None:
+            text = b"".join(GENERIC % tuple(atom) for atom in atoms.tolist())
         else:
-            for atom in atoms:
-                begin = "ATOM %6d %2d   R00     1    " % (atom[0],atom[1])
-                middle = "%8.3f%8.3f%8.3f" %  (atom[2],atom[3],atom[4])
-                end = "  1.00  0.00    NONE"
-                print(begin+middle+end, file=f)
+            text = b"".join(buf[i,:30].tobytes() + b"%8.3f%8.3f%8.3f" % tuple(xyz[i]) +
+                            buf[i,54:size[i]].tobytes() for i in range(len(buf)))
+        f.write(text.decode())
+
+# --------------------------------------------------------------------
+# return root with n appended as at least 4 digits
+
+def numbered(root,n):
+    return "%s%04d" % (root,n)
+
+# --------------------------------------------------------------------
+# write values as text into columns col to col+width of byte array buf
+#   same as "%width.precf" or "%widthd" if prec = 0, one value per row
+# return mask of rows whose value fit in width, other rows are left garbled
+
+def fixed(buf,col,values,width,prec):
+    values = np.asarray(values,dtype=np.float64)
+    mag = np.abs(values)
+    finite = np.isfinite(values)
+    mag[~finite] = 0.0
+    neg = np.signbit(values) if prec else values < 0
+
+    # round to prec digits, values within rounding error of a tie
+    #   are rounded by Python formatting, which uses their exact binary value
+
+    scale = 10**prec
+    scaled = mag*scale
+    r = np.rint(scaled)
+    tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1.0e-6
+    for i in np.nonzero(tie & (scaled < 2**52))[0]:
+        r[i] = int(("%.*f" % (prec,mag[i])).replace(".",""))
+    r = np.minimum(r,2**62).astype(np.int64)
+
+    ip = r // scale
+    fp = r % scale
+    iw = width - prec - 1 if prec else width
+
+    field = buf[:,col:col+width]
+    field[:] = ord(" ")
+    for k in range(prec):
+        field[:,width-1-k] = ord("0") + fp // 10**k % 10
+    if prec: field[:,iw] = ord(".")
+
+    ndigit = np.ones(len(ip),dtype=np.intp)
+    field[:,iw-1] = ord("0") + ip % 10
+    for k in range(1,iw):
+        more = ip >= 10**k
+        ndigit += more
+        field[more,iw-1-k] = ord("0") + ip[more] // 10**k % 10
+
+    fits = finite & (ip < 10**(iw-neg))
+    sign = np.nonzero(neg & fits)[0]
+    field[sign,iw-1-ndigit[sign]] = ord("-")
+    return fits
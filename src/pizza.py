@@ -12,6 +12,8 @@
 #   8/05, Steve Plimpton (SNL): original version
 #  12/09, David Hart (SNL): except hook for Tkinter no-display error
 #   5/11, David Hart (SNL): began list of excludes for no-display machines
+#  10/26: import tools lazily on first use, help strings from a cache file,
+#         create Tk root only when a GUI tool first needs it
 
 # ToDo list:
 
@@ -52,8 +54,8 @@ Tools:
 # -------------------------------------------------------------------------
 # modules needed by pizza.py
 
-import sys, subprocess, os, string, exceptions, glob, re
-from time import clock
+import sys, subprocess, os, glob, re, ast, json, importlib
+from time import process_time as clock
 
 # readline not available in all Pythons
 
@@ -64,20 +66,124 @@ except ImportError as exception:
     print("readline option not available")
     readline_flag = 0
 
-# create global Tk root if Tkinter is loaded
-# used by all tools that do GUIs via Tkinter
+# global Tk root used by all tools that do GUIs via Tkinter
+# created the 1st time a tool does "from __main__ import tkroot"
+#   so batch runs never load Tkinter or connect to a display
+# nodisplay = None until creation is attempted
 
-nodisplay = False
-try:
-    import tkinter
-    tkroot = tkinter.Tk()
-    tkroot.withdraw()
-except ImportError as exception:
-    nodisplay = True
-    pass
-except Exception as exception:
-    nodisplay = True
-    pass
+nodisplay = None
+
+def display():
+    global tkroot,nodisplay
+    if nodisplay is None:
+        try:
+            import tkinter
+            tkroot = tkinter.Tk()
+            tkroot.withdraw()
+            nodisplay = False
+        except Exception as exception:
+            nodisplay = True
+            print("Display not available ... no GUIs")
+    return not nodisplay
+
+def __getattr__(name):
+    if name == "tkroot" and display(): return tkroot
+    raise AttributeError(name)
+
+# -------------------------------------------------------------------------
+# stand-in for a tool class, registered under the tool's name
+# 1st call or attribute access imports the tool module
+#   and rebinds the name in the Pizza.py namespace to the real class
+
+class lazytool:
+    def __init__(self,name):
+        self.name = name
+        self.cls = None
+
+    def load(self):
+        if self.cls is None:
+            if self.name in ['gl'] and not display():
+                raise Exception("%s tool requires a display" % self.name)
+            module = importtool(self.name)
+            self.cls = getattr(module,self.name)
+            globals()[self.name] = self.cls
+        return self.cls
+
+    def __call__(self,*args,**kwargs):
+        return self.load()(*args,**kwargs)
+
+    def __getattr__(self,attr):
+        if attr.startswith("__"): raise AttributeError(attr)
+        return getattr(self.load(),attr)
+
+    def __repr__(self):
+        if self.cls: return repr(self.cls)
+        return "<%s tool, not yet loaded>" % self.name
+
+# import a tool module with PIZZA_TOOLS dirs at front of sys.path
+
+def importtool(name):
+    sys.path[0:0] = PIZZA_TOOLS
+    try: return importlib.import_module(name)
+    finally: del sys.path[0:len(PIZZA_TOOLS)]
+
+# -------------------------------------------------------------------------
+# help strings (oneline, docstr) of each tool, kept in a cache file
+# an entry is regenerated when its tool file's mtime or size changes
+# strings are read from the tool's source w/out importing it,
+#   falling back to an import if they are not plain string literals
+# a tool file that does not define a class of its own name is not a tool
+
+try: from DEFAULTS import PIZZA_HELPCACHE
+except: PIZZA_HELPCACHE = "~/.pizza/tools.json"
+PIZZA_HELPCACHE = os.path.expanduser(PIZZA_HELPCACHE)
+
+def toolinfo(name,file):
+    stat = os.stat(file)
+    key = os.path.abspath(file)
+    entry = helpcache.get(key)
+    if entry and entry["mtime"] == stat.st_mtime_ns and \
+            entry["size"] == stat.st_size:
+        return entry
+
+    entry = {"mtime": stat.st_mtime_ns, "size": stat.st_size,
+             "oneline": None, "docstr": None}
+    tree = ast.parse(open(file,'rb').read(),file)
+    tool = 0
+    for node in tree.body:
+        if isinstance(node,ast.ClassDef) and node.name == name: tool = 1
+        elif isinstance(node,ast.Assign) and len(node.targets) == 1 and \
+                isinstance(node.targets[0],ast.Name) and \
+                node.targets[0].id in ("oneline","docstr") and \
+                isinstance(node.value,ast.Constant) and \
+                isinstance(node.value.value,str):
+            entry[node.targets[0].id] = node.value.value
+    if not tool or entry["oneline"] is None or entry["docstr"] is None:
+        module = importtool(name)
+        getattr(module,name)
+        entry["oneline"] = module.oneline
+        entry["docstr"] = module.docstr
+
+    helpcache[key] = entry
+    helpcache_modified.append(key)
+    return entry
+
+def readcache():
+    try: return json.load(open(PIZZA_HELPCACHE,'r'))
+    except Exception: return {}
+
+# write via a tmp file so simultaneous Pizza.py runs never see a partial file
+# a cache that cannot be written is not an error
+
+def writecache():
+    if not helpcache_modified: return
+    tmp = "%s.%d" % (PIZZA_HELPCACHE,os.getpid())
+    try:
+        os.makedirs(os.path.dirname(PIZZA_HELPCACHE),exist_ok=True)
+        json.dump(helpcache,open(tmp,'w'))
+        os.replace(tmp,PIZZA_HELPCACHE)
+    except OSError:
+        if os.path.exists(tmp): os.remove(tmp)
 
 # -------------------------------------------------------------------------
 # error trap that enables special commands at interactive prompt
@@ -87,7 +193,7 @@ def trap(type,value,tback):
 
     # only check SyntaxErrors
 
-    if not isinstance(value,exceptions.SyntaxError):
+    if not isinstance(value,SyntaxError):
         sys.__excepthook__(type,value,tback)
         return
 
@@ -114,8 +220,7 @@ def trap(type,value,tback):
 
         elif len(words) == 1 and words[0] == "??":
             for tool in tools:
-                exec("oneline = oneline_%s" % tool)
-                print("%-11s%s" % (tool,oneline))
+                print("%-11s%s" % (tool,helpstr[tool][0]))
             print()
 
             scripts = []
@@ -157,10 +262,10 @@ def trap(type,value,tback):
 
             else:
                 if words[1] in tools:
-                    exec("txt = docstr_%s" % words[1])
+                    txt = helpstr[words[1]][1]
                     txt = re.sub("\n\s*\n","\n",txt)
                     txt = re.sub("\n .*","",txt)
-                    exec("print oneline_%s" % words[1])
+                    print(helpstr[words[1]][0])
                     print(txt)
                 else:
                     print("%s is not a recognized tool" % words[1])
@@ -183,8 +288,8 @@ def trap(type,value,tback):
 
             else:
                 if words[1] in tools:
-                    exec("print oneline_%s" % words[1])
-                    exec("print docstr_%s" % words[1])
+                    print(helpstr[words[1]][0])
+                    print(helpstr[words[1]][1])
                 else:
                     print("%s is not a recognized class" % words[1])
 
@@ -231,7 +336,7 @@ def trap(type,value,tback):
             if not flag: print("Could not find file",file)
             return
         elif words[0][1:] == "time":
-            cmd = string.join(words[1:])
+            cmd = " ".join(words[1:])
             t1 = clock()
             exec(cmd, namespace)
             t2 = clock()
@@ -277,23 +382,23 @@ while (iarg < len(sys.argv)):
 
     elif (sys.argv[iarg] == "-f"):
         jarg = iarg + 1
-        list = []
+        args = []
         while (jarg < len(sys.argv) and
                (sys.argv[jarg][0] != '-' or
                 (len(sys.argv[jarg]) >= 3 and sys.argv[jarg][0:2] == "--"))):
-            list.append(sys.argv[jarg])
+            args.append(sys.argv[jarg])
             jarg += 1
-        task = ("script",list)
+        task = ("script",args)
         tasks.append(task)
         iarg = jarg
 
     elif (sys.argv[iarg] == "-c"):
         jarg = iarg + 1
-        list = []
+        args = []
         while (jarg < len(sys.argv) and sys.argv[jarg][0] != '-'):
-            list.append(sys.argv[jarg])
+            args.append(sys.argv[jarg])
             jarg += 1
-        task = ("command",list)
+        task = ("command",args)
         tasks.append(task)
         iarg = jarg
     elif (sys.argv[iarg] == "-q"):
@@ -320,7 +425,6 @@ if len(yes_tools) > 0 and len(no_tools) > 0:
 #   and then Pizza.py src dir (sys.path[0])
 
 if not silent: print("Loading tools ...")
-if not silent and nodisplay: print("Display not available ... no GUIs")
 
 try: from DEFAULTS import PIZZA_TOOLS
 except: PIZZA_TOOLS = []
@@ -352,28 +456,33 @@ for tool in PIZZA_EXCLUDE:
 for tool in no_tools:
     if tool in tools: tools.remove(tool)
 
-# add PIZZA_TOOLS dirs to front of module search path (sys.path)
-# import each tool as a Python module and its documentation strings
-# restore sys.path
+# register each tool under its name as a lazytool, imported on 1st use
+# get its documentation strings from the help cache
+# a tool not found as a file in PIZZA_TOOLS dirs is imported right away
 
-sys.path = PIZZA_TOOLS + sys.path
+helpcache = readcache()
+helpcache_modified = []
+helpstr = {}
 
 failed = []
 for tool in tools:
-    #print "loading tool '%s'"%tool
-    if nodisplay and tool in ['gl']:
-        failed.append(tool)
-        continue
     try:
-        exec("from %s import %s" % (tool,tool))
-        exec("from %s import oneline as oneline_%s" % (tool,tool))
-        exec("from %s import docstr as docstr_%s" % (tool,tool))
+        files = [dir + '/' + tool + ".py" for dir in PIZZA_TOOLS]
+        files = [file for file in files if os.path.isfile(file)]
+        if files:
+            entry = toolinfo(tool,files[0])
+            helpstr[tool] = (entry["oneline"],entry["docstr"])
+        else:
+            module = importtool(tool)
+            getattr(module,tool)
+            helpstr[tool] = (module.oneline,module.docstr)
+        globals()[tool] = lazytool(tool)
     except Exception as exception:
         print("%s tool did not load:" % tool)
         print(" ",exception)
         failed.append(tool)
 
-for dir in PIZZA_TOOLS: sys.path = sys.path[1:]
+writecache()
 
 # final list of tools: remove tools where import failed, sort them
 
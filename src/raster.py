@@ -111,8 +111,10 @@ colors["nickname"] = [R,G,B]       set new RGB values from 0 to 255
 # Imports and external programs
 
 import sys, os, subprocess, re
+import numpy as np
+import vizarray
 from vizinfo import vizinfo
-from math import fabs,atan,cos,sin
+from math import atan,cos,sin
 
 try: from DEFAULTS import PIZZA_RENDER
 except: PIZZA_RENDER = "render"
@@ -216,7 +218,7 @@ class raster:
     def show(self,ntime):
         data = self.data
         which = data.findtime(ntime)
-        time,box,atoms,bonds,tris,lines = data.viz(which)
+        time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(data,which)
         if self.boxflag == 2: box = data.maxbox()
         self.distance = compute_distance(box)
 
@@ -279,7 +281,7 @@ class raster:
                 if self.select != "":
                     newstr = self.select % fraction
                     data.aselect.test(newstr,time)
-                time,boxone,atoms,bonds,tris,lines = data.viz(which)
+                time,boxone,atoms,bonds,tris,lines = vizarray.viz_arrays(data,which)
 
                 if self.boxflag < 2: box = boxone
                 if n == nstart: self.distance = compute_distance(box)
@@ -326,7 +328,7 @@ class raster:
                 if self.select != "":
                     newstr = self.select % fraction
                     data.aselect.test(newstr,ntime)
-                time,boxone,atoms,bonds,tris,lines = data.viz(which)
+                time,boxone,atoms,bonds,tris,lines = vizarray.viz_arrays(data,which)
 
                 if self.boxflag < 2: box = boxone
                 if n == nstart: self.distance = compute_distance(box)
@@ -382,10 +384,10 @@ class raster:
 
         if self.boxflag or flag: box_write(f,box,self.bxcol,self.bxthick)
 
-        ncolor = self.vizinfo.nacolor
-        for atom in atoms:
+        if check_types(atoms,self.vizinfo.nacolor):
+            raise Exception("atom type too big")
+        for atom in atoms.tolist():
             itype = int(atom[1])
-            if itype > ncolor: raise Exception("atom type too big")
             color = self.vizinfo.acolor[itype]
             rad = self.vizinfo.arad[itype]
             print(2, file=f)
@@ -393,32 +395,32 @@ class raster:
 
         # need to include vizinfo.tfill options
 
-        ncolor = self.vizinfo.ntcolor
-        for tri in tris:
+        if check_types(tris,self.vizinfo.ntcolor):
+            raise Exception("tri type too big")
+        for tri in tris.tolist():
             itype = int(tri[1])
-            if itype > ncolor: raise Exception("tri type too big")
             color = self.vizinfo.tcolor[itype]
             print(1, file=f)
             print(tri[2],tri[3],tri[4],tri[5],tri[6],tri[7], \
                   tri[8],tri[9],tri[10],color[0],color[1],color[2], file=f)
 
         bound = 0.25 * self.distance
-        ncolor = self.vizinfo.nbcolor
-        for bond in bonds:
+        if check_types(bonds,self.vizinfo.nbcolor):
+            raise Exception("bond type too big")
+        keep = (np.fabs(bonds[:,2]-bonds[:,5]) <= bound) & \
+            (np.fabs(bonds[:,3]-bonds[:,6]) <= bound)
+        for bond in bonds[keep].tolist():
             itype = int(bond[1])
-            if itype > ncolor: raise Exception("bond type too big")
             color = self.vizinfo.bcolor[itype]
             rad = self.vizinfo.brad[itype]
-            if fabs(bond[2]-bond[5]) > bound or fabs(bond[3]-bond[6]) > bound:
-                continue
             print(5, file=f)
             print(bond[2],bond[3],bond[4],rad, \
                   bond[5],bond[6],bond[7],0.0,color[0],color[1],color[2], file=f)
 
-        ncolor = self.vizinfo.nlcolor
-        for line in lines:
+        if check_types(lines,self.vizinfo.nlcolor):
+            raise Exception("line type too big")
+        for line in lines.tolist():
             itype = int(line[1])
-            if itype > ncolor: raise Exception("line type too big")
             color = self.vizinfo.lcolor[itype]
             thick = self.vizinfo.lrad[itype]
             print(3, file=f)
@@ -516,6 +518,13 @@ def compute_distance(box):
     if box[5]-box[2] > distance: distance = box[5]-box[2]
     return distance
 
+# --------------------------------------------------------------------
+# return 1 if any object in viz array has a type > ncolor
+
+def check_types(objs,ncolor):
+    if not len(objs): return 0
+    return int(objs[:,1].max()) > ncolor
+
 # --------------------------------------------------------------------
 # draw a 12-edge box around simulation domain
 
@@ -81,6 +81,7 @@ s.gridfile(xlo,xhi,ylo,yhi,zlo,zhi,file)   ditto for 3d
 
 index,time,flag = s.iterator(0/1)          loop over single snapshot
 time,box,atoms,bonds,tris,lines = s.viz(index)   return list of viz objects
+time,box,atoms,bonds,tris,lines = s.viz_arrays(index)   return 2d arrays
 
   iterator() and viz() are compatible with equivalent dump calls
   iterator() called with arg = 0 first time, with arg = 1 on subsequent calls
@@ -97,10 +98,14 @@ time,box,atoms,bonds,tris,lines = s.viz(index)   return list of viz objects
     lines = id,type,x1,y1,z1,x2,y2,z2 for each line as 2d array
       NULL if lines do not exist
     types are assigned to each surf in ascending order
+  viz_arrays() returns same info as 2d NumPy arrays, no rows for NULL
+    arrays are reused until surfs or grid change, do not modify them
 """
 
 # History
 #   10/12, Steve Plimpton (SNL): original version
+#   10/26, surf points, lines, triangles stored as NumPy arrays
+#   10/26, viz arrays cached, grid overlay built from per-parent templates
 
 # ToDo list
 
@@ -108,6 +113,10 @@ time,box,atoms,bonds,tris,lines = s.viz(index)   return list of viz objects
 #   dim = 2 or 3, all surfs must be the same
 #   ids = dictionary of IDs that points to surfs index
 #   surfs = list of surfs
+#   gridflag = 1 if grid is overlayed
+#   idparents = list of parent cell IDs, parents before their children
+#   parents = dictionary of parent ID -> [box,(Nx,Ny,Nz)]
+#   surfcache,gridcache,vizcache = arrays for viz_arrays() and their keys
 
 # Imports and external programs
 
@@ -115,6 +124,8 @@ import sys,glob
 from os import popen
 from math import pi,cos,sin,sqrt
 from copy import deepcopy
+import numpy as np
+import vizarray
 
 try: from DEFAULTS import PIZZA_GUNZIP
 except: PIZZA_GUNZIP = "gunzip"
@@ -132,6 +143,9 @@ class sdata:
         self.nselect = 1
         self.seed = 12345
         self.gridflag = 0
+        self.idparents = []
+        self.parents = {}
+        self.surfcache = self.gridcache = self.vizcache = None
         self.ids = {}
         self.surfs = []
         self.plist = []
@@ -158,9 +172,9 @@ class sdata:
         points = []
         lines = []
         triangles = []
+        npoints_prev = 0
 
         for file in flist:
-            npoints_prev = len(points)
 
             # test for gzipped file
 
@@ -202,31 +216,28 @@ class sdata:
                         self.dim = 3
 
                     line = f.readline()
-                    for i in range(npoints):
-                        list = f.readline().split()
-                        pt = [float(value) for value in list[1:]]
-                        if self.dim == 2: pt.append(0.0)
-                        points.append(pt)
+                    pts = read_rows(f,npoints,self.dim,np.float64)
+                    if self.dim == 2:
+                        pts = np.column_stack((pts,np.zeros(npoints)))
+                    points.append(pts)
 
                 elif "Lines" in line:
                     if npoints == 0 or nlines == 0:
                         raise Exception("invalid SPARTA surf file")
 
                     line = f.readline()
-                    for i in range(nlines):
-                        list = f.readline().split()
-                        lines.append([int(value)-npoints_prev-1 for value in list[1:]])
+                    lines.append(read_rows(f,nlines,2,np.int64) + npoints_prev-1)
 
                 elif "Triangles" in line:
                     if npoints == 0 or ntriangles == 0:
                         raise Exception("invalid SPARTA surf file")
 
                     line = f.readline()
-                    for i in range(ntriangles):
-                        list = f.readline().split()
-                        triangles.append([int(value)-npoints_prev-1 for value in list[1:]])
+                    triangles.append(read_rows(f,ntriangles,3,np.int64) +
+                                     npoints_prev-1)
 
             f.close()
+            npoints_prev += npoints
 
         if self.dim == 2: print("surf %s with %d points, %d lines" % \
             (id,npoints,nlines))
@@ -237,10 +248,10 @@ class sdata:
 
         surf = Surface()
         surf.select = 1
-        surf.points = points
-        surf.lines = lines
-        surf.triangles = triangles
-        box = bbox(points)
+        if points: surf.points = np.concatenate(points)
+        if lines: surf.lines = np.concatenate(lines)
+        if triangles: surf.triangles = np.concatenate(triangles)
+        box = bbox(surf.points)
         surf.center = [0.5*(box[0]+box[3]),0.5*(box[1]+box[4]),0.5*(box[2]+box[5])]
         self.ids[id] = len(self.surfs)
         self.surfs.append(surf)
@@ -265,8 +276,8 @@ class sdata:
 
         surf = Surface()
         surf.select = 1
-        surf.points = points
-        surf.lines = lines
+        surf.points = np.array(points,dtype=np.float64)
+        surf.lines = np.array(lines,dtype=np.int64)
         surf.center = [x,y,0.0]
         self.ids[id] = len(self.surfs)
         self.surfs.append(surf)
@@ -299,8 +310,8 @@ class sdata:
 
         surf = Surface()
         surf.select = 1
-        surf.points = points
-        surf.lines = lines
+        surf.points = np.array(points,dtype=np.float64)
+        surf.lines = np.array(lines,dtype=np.int64)
         surf.center = [0.5*(x0+x1),0.5*(y0+y1),0.0]
         self.ids[id] = len(self.surfs)
         self.surfs.append(surf)
@@ -328,8 +339,8 @@ class sdata:
 
         surf = Surface()
         surf.select = 1
-        surf.points = points
-        surf.lines = lines
+        surf.points = np.array(points,dtype=np.float64)
+        surf.lines = np.array(lines,dtype=np.int64)
         surf.center = [(x0+x1+x2)/3.0,(y0+y1+y2)/3.0,0.0]
         self.ids[id] = len(self.surfs)
         self.surfs.append(surf)
@@ -344,19 +355,13 @@ class sdata:
         self.dim = 3
 
         pts,triangles = box_triangulate(n,n,n)
-        points = []
-        for pt in pts:
-            ptnew = [pt[0]-0.5,pt[1]-0.5,pt[2]-0.5]
-            normalize(ptnew)
-            ptnew[0] = x + r*ptnew[0]
-            ptnew[1] = y + r*ptnew[1]
-            ptnew[2] = z + r*ptnew[2]
-            points.append(ptnew)
+        pts = np.array(pts,dtype=np.float64) - 0.5
+        pts /= np.sqrt((pts*pts).sum(axis=1))[:,None]
 
         surf = Surface()
         surf.select = 1
-        surf.points = points
-        surf.triangles = triangles
+        surf.points = (x,y,z) + r*pts
+        surf.triangles = np.array(triangles,dtype=np.int64)
         surf.center = [x,y,z]
         self.ids[id] = len(self.surfs)
         self.surfs.append(surf)
@@ -372,17 +377,12 @@ class sdata:
         self.dim = 3
 
         pts,triangles = box_triangulate(nx,ny,nz)
-        points = []
-        for pt in pts:
-            xnew = x0 + pt[0]*(x1-x0)
-            ynew = y0 + pt[1]*(y1-y0)
-            znew = z0 + pt[2]*(z1-z0)
-            points.append([xnew,ynew,znew])
+        pts = np.array(pts,dtype=np.float64)
 
         surf = Surface()
         surf.select = 1
-        surf.points = points
-        surf.triangles = triangles
+        surf.points = (x0,y0,z0) + pts*(x1-x0,y1-y0,z1-z0)
+        surf.triangles = np.array(triangles,dtype=np.int64)
         surf.center = [0.5*(x0+x1),0.5*(y0+y1),0.5*(z0+z1)]
         self.ids[id] = len(self.surfs)
         self.surfs.append(surf)
@@ -408,8 +408,8 @@ class sdata:
 
         surf = Surface()
         surf.select = 1
-        surf.points = points
-        surf.lines = lines
+        surf.points = np.array(points,dtype=np.float64)
+        surf.lines = np.array(lines,dtype=np.int64)
         surf.center = [x,y,0.0]
         self.ids[id] = len(self.surfs)
         self.surfs.append(surf)
@@ -436,8 +436,8 @@ class sdata:
 
         surf = Surface()
         surf.select = 1
-        surf.points = points
-        surf.triangles = triangles
+        surf.points = np.array(points,dtype=np.float64)
+        surf.triangles = np.array(triangles,dtype=np.int64)
         surf.center = [x,y,z]
         self.ids[id] = len(self.surfs)
         self.surfs.append(surf)
@@ -452,8 +452,8 @@ class sdata:
 
         surf = Surface()
         surf.select = 1
-        surf.points = plist
-        surf.lines = llist
+        surf.points = np.array(plist,dtype=np.float64).reshape(-1,3)
+        surf.lines = np.array(llist,dtype=np.int64).reshape(-1,2)
         surf.center = [0.0,0.0,0.0]
         self.ids[id] = len(self.surfs)
         self.surfs.append(surf)
@@ -468,8 +468,8 @@ class sdata:
 
         surf = Surface()
         surf.select = 1
-        surf.points = plist
-        surf.triangles = tlist
+        surf.points = np.array(plist,dtype=np.float64).reshape(-1,3)
+        surf.triangles = np.array(tlist,dtype=np.int64).reshape(-1,3)
         surf.center = [0.0,0.0,0.0]
         self.ids[id] = len(self.surfs)
         self.surfs.append(surf)
@@ -496,14 +496,8 @@ class sdata:
             raise Exception("dz translation of 2d surf must be 0.0")
 
         surf = self.surfs[self.ids[id]]
-        surf.xc += dx
-        surf.yc += dy
-        surf.zc += dz
-
-        for i,pt in enumerate(surf.points):
-            pt[0] += dx
-            pt[1] += dy
-            pt[2] += dz
+        surf.center = [surf.center[0]+dx,surf.center[1]+dy,surf.center[2]+dz]
+        surf.points = surf.points + (dx,dy,dz)
 
     # --------------------------------------------------------------------
     # rotate a surf by theta around (Rx,Ry,Rz) and center pt
@@ -524,7 +518,7 @@ class sdata:
         r = [rx,ry,rz]
         normalize(r)
         angle = pi * theta/2/180.0
-        q = (cos(angle),rx*sin(angle),ry*sin(angle),rz*sin(angle))
+        q = (cos(angle),r[0]*sin(angle),r[1]*sin(angle),r[2]*sin(angle))
         p00 = q[0]*q[0] + q[1]*q[1] - q[2]*q[2] - q[3]*q[3]
         p01 = 2 * (q[1]*q[2] - q[0]*q[3])
         p02 = 2 * (q[1]*q[3] + q[0]*q[2])
@@ -535,16 +529,11 @@ class sdata:
         p21 = 2 * (q[2]*q[3] + q[0]*q[1])
         p22 = q[0]*q[0] - q[1]*q[1] - q[2]*q[2] + q[3]*q[3]
 
-        surf = self.surfs[self.ids[id]]
-        center = surf.center
+        P = np.array([[p00,p01,p02],[p10,p11,p12],[p20,p21,p22]])
 
-        for i,pt in enumerate(surf.points):
-            ptnew = 3*[0]
-            xc = [pt[0]-center[0],pt[1]-center[1],pt[2]-center[2]]
-            ptnew[0] = p00*xc[0] + p01*xc[1] + p02*xc[2] + center[0]
-            ptnew[1] = p10*xc[0] + p11*xc[1] + p12*xc[2] + center[1]
-            ptnew[2] = p20*xc[0] + p21*xc[1] + p22*xc[2] + center[2]
-            surf.points[i] = ptnew
+        surf = self.surfs[self.ids[id]]
+        center = np.array(surf.center,dtype=np.float64)
+        surf.points = (surf.points - center) @ P.T + center
 
     # --------------------------------------------------------------------
     # scale an object by sx,sy,sz factors
@@ -557,11 +546,8 @@ class sdata:
             raise Exception("sz scale of 2d surf must be 1.0")
 
         surf = self.surfs[self.ids[id]]
-        center = surf.center
-        for pt in surf.points:
-            pt[0] = center[0] + sx*(pt[0]-center[0])
-            pt[1] = center[1] + sy*(pt[1]-center[1])
-            pt[2] = center[2] + sz*(pt[2]-center[2])
+        center = np.array(surf.center,dtype=np.float64)
+        surf.points = center + (sx,sy,sz)*(surf.points - center)
 
     # --------------------------------------------------------------------
     # invert direction of surf normals by swapping line or triangle indices
@@ -571,14 +557,8 @@ class sdata:
             raise Exception("ID %s is not defined" % id)
 
         surf = self.surfs[self.ids[id]]
-        if self.dim == 2:
-            for i,line in enumerate(surf.lines):
-                line = [line[1],line[0]]
-                surf.lines[i] = line
-        if self.dim == 3:
-            for i,tri in enumerate(surf.triangles):
-                tri = [tri[0],tri[2],tri[1]]
-                surf.triangles[i] = tri
+        if self.dim == 2: surf.lines = surf.lines[:,[1,0]]
+        if self.dim == 3: surf.triangles = surf.triangles[:,[0,2,1]]
 
     # --------------------------------------------------------------------
     # join surfs in list to form a new surf
@@ -589,32 +569,12 @@ class sdata:
         if len(list) == 0:
             raise Exception("list of surfs to join is empty")
 
-        points = []
-        lines = []
-        triangles = []
-
-        for id in list:
-            surf = self.surfs[self.ids[id]]
-            npoints_prev = len(points)
-            points += surf.points
-            if self.dim == 2:
-                for line in self.lines:
-                    line[0] += npoints_prev
-                    line[1] += npoints_prev
-                    lines.append(line)
-            if self.dim == 3:
-                for tri in self.triangles:
-                    tri[0] += npoints_prev
-                    tri[1] += npoints_prev
-                    tri[2] += npoints_prev
-                    triangles.append(tri)
+        surfs = [self.surfs[self.ids[idjoin]] for idjoin in list]
 
         surf = Surface()
         surf.select = 1
-        surf.points = points
-        surf.lines = lines
-        surf.triangles = triangles
-        box = bbox(points)
+        surf.points,surf.lines,surf.triangles = concatenate(surfs)
+        box = bbox(surf.points)
         surf.center = [0.5*(box[0]+box[3]),0.5*(box[1]+box[4]),0.5*(box[2]+box[5])]
         self.ids[id] = len(self.surfs)
         self.surfs.append(surf)
@@ -680,31 +640,13 @@ class sdata:
     # if list is empty, write all surfs
 
     def write(self,file,*list):
-        if not len(list): vlist = list(range(len(self.surfs)))
+        if not len(list): vlist = range(len(self.surfs))
         else:
             vlist = []
             for id in list: vlist.append(self.ids[id])
 
-        points = []
-        lines = []
-        triangles = []
-
-        for index in vlist:
-            obj = self.surfs[index]
-            if not obj.select: continue
-            npoints_prev = len(points)
-            points += obj.points
-            if self.dim == 2:
-                for line in obj.lines:
-                    line[0] += npoints_prev
-                    line[1] += npoints_prev
-                    lines.append(line)
-            if self.dim == 3:
-                for tri in obj.triangles:
-                    tri[0] += npoints_prev
-                    tri[1] += npoints_prev
-                    tri[2] += npoints_prev
-                    triangles.append(tri)
+        surfs = [self.surfs[index] for index in vlist]
+        points,lines,triangles = concatenate([s for s in surfs if s.select])
 
         fp = open(file,'w')
         print("surf file from Pizza.py", file=fp)
@@ -714,21 +656,14 @@ class sdata:
         if self.dim == 3: print(len(triangles),"triangles", file=fp)
         print(file=fp)
         print("Points\n", file=fp)
-        if self.dim == 2:
-            for i,point in enumerate(points):
-                print(i+1,point[0],point[1], file=fp)
-        if self.dim == 3:
-            for i,point in enumerate(points):
-                print(i+1,point[0],point[1],point[2], file=fp)
+        write_rows(fp,points[:,:self.dim],"%r")
         print(file=fp)
         if self.dim == 2:
             print("Lines\n", file=fp)
-            for i,line in enumerate(lines):
-                print(i+1,line[0]+1,line[1]+1, file=fp)
+            write_rows(fp,lines+1,"%d")
         if self.dim == 3:
             print("Triangles\n", file=fp)
-            for i,tri in enumerate(triangles):
-                print(i+1,tri[0]+1,tri[1]+1,tri[2]+1, file=fp)
+            write_rows(fp,triangles+1,"%d")
 
         fp.close()
 
@@ -765,7 +700,7 @@ class sdata:
 
         # read parent file, parent entries should start on line 7
 
-        lines = open(args[4],"r").readlines()
+        lines = open(args[-1],"r").readlines()
         lines = lines[6:]
 
         self.gridflag = 1
@@ -789,9 +724,8 @@ class sdata:
                                                args[4],args[5]),
                                               (int(words[2]),int(words[3]),int(words[4]))]
                 else:
-                    self.parents[words[1]] = [(args[0],args[1],args[2],args[3],
-                                               args[4],args[5]),
-                                              (int(words[2]),int(words[3]),int(words[4]))]
+                    self.parents[words[1]] = [(),(int(words[2]),int(words[3]),
+                                                  int(words[4]))]
 
     # --------------------------------------------------------------------
     # iterator called from other tools
@@ -801,148 +735,160 @@ class sdata:
         return 0,0,-1
 
     # --------------------------------------------------------------------
-    # return list of atoms and triangles to viz for cdata object
+    # return list of atoms and triangles to viz for sdata object
+    # lists are converted from the arrays of viz_arrays()
 
     def viz(self,isnap):
+        time,box,atoms,bonds,tris,lines = self.viz_arrays(isnap)
+        return [time,box] + vizarray.lists(atoms,bonds,tris,lines)
+
+    # --------------------------------------------------------------------
+    # return 2d arrays of atoms and triangles to viz for sdata object
+    # same ids and types as viz()
+    # arrays are shared between calls, callers must not modify them
+
+    def viz_arrays(self,isnap):
         if isnap:
-            raise Exception("cannot call cdata.viz() with isnap != 0")
+            raise Exception("cannot call sdata.viz() with isnap != 0")
+
+        # surf and grid arrays are each cached until their inputs change
+        # ids of grid lines continue the running count of surf lines
+
+        surfs = self.surf_arrays()
+        grid = self.grid_lines()
+        cache = self.vizcache
+        if cache is None or cache[0] is not surfs or cache[1] is not grid:
+            lines = np.concatenate((surfs[2],grid[1]))
+            lines[:,0] = np.arange(1,len(lines)+1)
+            self.vizcache = (surfs,grid,self.bbox(),lines)
+        surfs,grid,box,lines = self.vizcache
 
         # no atoms or bonds
 
-        atoms = []
-        bonds = []
+        atoms = np.zeros((0,vizarray.NATOM))
+        bonds = np.zeros((0,vizarray.NBOND))
+        return 0,box,atoms,bonds,surfs[1],lines
+
+    # --------------------------------------------------------------------
+    # return (key,tris,lines) for selected surfs, rebuilt when key changes
+    # key = dim and select flag,surf,points,lines,triangles of each surf
+    # surf arrays are replaced, not modified, by all operations on a surf
+
+    def surf_arrays(self):
+        key = [self.dim] + [(surf.select,surf,surf.points,surf.lines,surf.triangles)
+                            for surf in self.surfs]
+        if self.surfcache is not None and same(self.surfcache[0],key):
+            return self.surfcache
 
-        # create triangle list from sum of all surfaces and regions
+        # create triangle array from sum of all surfaces
         # id = running count
         # type = type of set of tris
 
-        id = itype = 0
-        tris = []
+        surfs = [surf for surf in self.surfs if surf.select]
+
+        tris = np.zeros((0,vizarray.NTRI))
         if self.dim == 3:
-            for surf in self.surfs:
-                if not surf.select: continue
-                itype += 1
-                points = surf.points
-                triangles = surf.triangles
-                for tri in triangles:
-                    id += 1
-                    pt1 = points[tri[0]]
-                    pt2 = points[tri[1]]
-                    pt3 = points[tri[2]]
-                    n = normal(pt1,pt2,pt3)
-                    tris.append([id,itype] + pt1 + pt2 + pt3 + n)
-
-        # create line list from sum of all line objects
-
-        id = itype = 0
-        lines = []
+            corners = [surf.points[surf.triangles].reshape(-1,9) for surf in surfs]
+            ntris = [len(c) for c in corners]
+            tris = np.zeros((sum(ntris),vizarray.NTRI))
+            tris[:,0] = np.arange(1,len(tris)+1)
+            tris[:,1] = np.repeat(np.arange(1,len(surfs)+1),ntris)
+            if corners: tris[:,2:11] = np.concatenate(corners)
+            tris[:,11:14] = vizarray.normals(tris[:,2:5],tris[:,5:8],tris[:,8:11])
+
+        # create line array from sum of all surfaces, all of type 1
+
+        lines = np.zeros((0,vizarray.NLINE))
         if self.dim == 2:
+            ends = [surf.points[surf.lines].reshape(-1,6) for surf in surfs]
+            if ends: ends = np.concatenate(ends)
+            else: ends = np.zeros((0,6))
+            n = len(ends)
+            lines = np.column_stack((np.arange(1,n+1),np.ones(n),ends))
+
+        self.surfcache = (key,tris,lines)
+        return self.surfcache
+
+    # --------------------------------------------------------------------
+    # return (key,lines) for overlayed grid, rebuilt when key changes
+    # key = gridflag,dim,parents,idparents, grid() and gridfile() replace them
+    # for each parent, its Nx by Ny by Nz sub-lines in 2d or 3d
+    # parents with the same Nx,Ny,Nz are done together from one template
+    # type = 1 + level of parent, after surf line type 1 in 2d
+
+    def grid_lines(self):
+        key = (self.gridflag,self.dim,self.parents,self.idparents)
+        cache = self.gridcache
+        if cache is not None and cache[0][:2] == key[:2] and \
+               cache[0][2] is key[2] and cache[0][3] is key[3]:
+            return cache
+
+        lines = np.zeros((0,vizarray.NLINE))
+        if self.gridflag:
+            boxes,subgrids,nlevels = self.parent_boxes()
+            groups,inverse = np.unique(subgrids,axis=0,return_inverse=True)
+            inverse = inverse.reshape(-1)
+            templates = [sublines(n,self.dim) for n in groups]
+            counts = np.array([len(k) for k,top in templates])[inverse]
+            start = np.cumsum(counts) - counts
+
             itype = 1
-            for surf in self.surfs:
-                if not surf.select: continue
-                points = surf.points
-                segments = surf.lines
-                for segment in segments:
-                    id += 1
-                    lines.append([id,itype] + points[segment[0]] + points[segment[1]])
-
-        # add overlayed grid with new type
-        # for each parent, draw its Nx by Ny by Nz sub-lines in 2d or 3d
-        # use box stored with parents or compute box from ID
-        # grandparent box will always exist due to loop over idparents
-        #   which requires a parent cell's grandparent to be earlier in list
-
-        if self.gridflag and self.dim == 2:
-            for idparent in self.idparents:
-                box,subgrid = self.parents[idparent]
-                levels = idparent.split('-')
-                nlevel = len(levels)
-                if idparent == "0": nlevel = 0
-
-                if not box:
-                    if nlevel <= 1:
-                        idchild = int(idparent)
-                        idgrandparent = "0"
-                    else:
-                        idchild = int(levels[-1])
-                        idgrandparent = "-".join(levels[:-1])
-                    gbox,gsubgrid = self.parents[idgrandparent]
-                    # compute parent box from grandparent box and store in parents hash
-                    xlo = gbox[0]; xhi = gbox[1];
-                    ylo = gbox[2]; yhi = gbox[3];
-                    nx = gsubgrid[0]; ny = gsubgrid[1]
-                    ix = (idchild-1) % nx
-                    iy = (idchild-1) / nx
-                    box = (xlo + float(ix)*(xhi-xlo)/nx, xlo + float(ix+1)*(xhi-xlo)/nx,
-                           ylo + float(iy)*(yhi-ylo)/ny, ylo + float(iy+1)*(yhi-ylo)/ny)
-                    self.parents[idparent] = [box,subgrid]
-
-                xlo = box[0]; xhi = box[1];
-                ylo = box[2]; yhi = box[3];
-                nx = subgrid[0]; ny = subgrid[1]
-
-                for i in range(nx+1):
-                    x = xlo + float(i)*(xhi-xlo)/nx
-                    lines.append([id+i,itype+nlevel+1] + [x,ylo,0.0,x,yhi,0.0])
-                id += nx+1
-                for i in range(ny+1):
-                    y = ylo + float(i)*(yhi-ylo)/ny
-                    lines.append([id+i,itype+nlevel+1] + [xlo,y,0.0,xhi,y,0.0])
-                id += ny+1
-
-        if self.gridflag and self.dim == 3:
-            for idparent in self.idparents:
-                box,subgrid = self.parents[idparent]
-                levels = idparent.split('-')
-                nlevel = len(levels)
-                if idparent == "0": nlevel = 0
-
-                if not box:
-                    if nlevel <= 1:
-                        idchild = int(idparent)
-                        idgrandparent = "0"
-                    else:
-                        idchild = int(levels[-1])
-                        idgrandparent = "-".join(levels[:-1])
-                    gbox,gsubgrid = self.parents[idgrandparent]
-                    # compute parent box from grandparent box and store in parents hash
-                    xlo = gbox[0]; xhi = gbox[1];
-                    ylo = gbox[2]; yhi = gbox[3];
-                    zlo = gbox[4]; zhi = gbox[5];
-                    nx = gsubgrid[0]; ny = gsubgrid[1]; nz = gsubgrid[2]
-                    ix = (idchild-1) % nx
-                    iy = ((idchild-1)/nx) % ny
-                    iz = (idchild-1) / (nx*ny)
-                    box = (xlo + float(ix)*(xhi-xlo)/nx, xlo + float(ix+1)*(xhi-xlo)/nx,
-                           ylo + float(iy)*(yhi-ylo)/ny, ylo + float(iy+1)*(yhi-ylo)/ny,
-                           zlo + float(iz)*(zhi-zlo)/nz, zlo + float(iz+1)*(zhi-zlo)/nz)
-                    self.parents[idparent] = [box,subgrid]
-
-                xlo = box[0]; xhi = box[1];
-                ylo = box[2]; yhi = box[3];
-                zlo = box[4]; zhi = box[5];
-                nx = subgrid[0]; ny = subgrid[1]; nz = subgrid[2]
-
-                for i in range(ny+1):
-                    y = ylo + float(i)*(yhi-ylo)/ny
-                    for j in range(nz+1):
-                        z = zlo + float(j)*(zhi-zlo)/nz
-                        lines.append([id+i,itype+nlevel+1] + [xlo,y,z,xhi,y,z])
-                id += (ny+1)*(nz+1)
-                for i in range(nx+1):
-                    x = xlo + float(i)*(xhi-xlo)/nx
-                    for j in range(nz+1):
-                        z = zlo + float(j)*(zhi-zlo)/nz
-                        lines.append([id+i,itype+nlevel+1] + [x,ylo,z,x,yhi,z])
-                id += (nx+1)*(nz+1)
-                for i in range(nx+1):
-                    x = xlo + float(i)*(xhi-xlo)/nx
-                    for j in range(ny+1):
-                        y = ylo + float(j)*(yhi-ylo)/ny
-                        lines.append([id+i,itype+nlevel+1] + [x,y,zlo,x,y,zhi])
-                id += (nx+1)*(ny+1)
-
-        return 0,self.bbox(),atoms,bonds,tris,lines
+            if self.dim == 2: itype = 2
+            lines = np.zeros((counts.sum(),vizarray.NLINE))
+            lines[:,1] = np.repeat(nlevels + itype,counts)
+            for igroup,(k,top) in enumerate(templates):
+                members = np.flatnonzero(inverse == igroup)
+                lo = boxes[members,0::2][:,None,None,:]
+                hi = boxes[members,1::2][:,None,None,:]
+                ends = np.where(top,hi,lo + k*(hi-lo)/groups[igroup])
+                rows = start[members][:,None] + np.arange(len(k))
+                lines[rows.ravel(),2:] = ends.reshape(-1,6)
+
+        self.gridcache = (key,lines)
+        return self.gridcache
+
+    # --------------------------------------------------------------------
+    # return boxes,subgrids,levels of all parents as arrays, in idparents order
+    # boxes = xlo,xhi,ylo,yhi,zlo,zhi, z = 0.0 in 2d
+    # use box stored with parents or compute box from ID
+    # grandparent box will always exist due to loop over idparents
+    #   which requires a parent cell's grandparent to be earlier in list
+
+    def parent_boxes(self):
+        n = len(self.idparents)
+        boxes = np.zeros((n,6))
+        subgrids = np.zeros((n,3),dtype=np.int64)
+        nlevels = np.zeros(n,dtype=np.int64)
+
+        for i,idparent in enumerate(self.idparents):
+            box,subgrid = self.parents[idparent]
+            levels = idparent.split('-')
+            nlevel = len(levels)
+            if idparent == "0": nlevel = 0
+
+            if not box:
+                if nlevel <= 1:
+                    idchild = int(idparent)
+                    idgrandparent = "0"
+                else:
+                    idchild = int(levels[-1])
+                    idgrandparent = "-".join(levels[:-1])
+                gbox,gsubgrid = self.parents[idgrandparent]
+                # compute parent box from grandparent box and store in parents hash
+                nx = gsubgrid[0]; ny = gsubgrid[1]
+                index = ((idchild-1) % nx,((idchild-1)//nx) % ny,
+                         (idchild-1) // (nx*ny))
+                box = []
+                for lo,hi,m,j in zip(gbox[0::2],gbox[1::2],gsubgrid,index):
+                    box += [lo + float(j)*(hi-lo)/m,lo + float(j+1)*(hi-lo)/m]
+                box = tuple(box)
+                self.parents[idparent] = [box,subgrid]
+
+            boxes[i,:len(box)] = box
+            subgrids[i] = subgrid
+            nlevels[i] = nlevel
+
+        return boxes,subgrids,nlevels
 
     # --------------------------------------------------------------------
     # time query from other tools
@@ -969,7 +915,7 @@ class sdata:
             box = bbox(surf.points)
             xlo = min(xlo,box[0])
             ylo = min(ylo,box[1])
-            zlo = min(ylo,box[2])
+            zlo = min(zlo,box[2])
             xhi = max(xhi,box[3])
             yhi = max(yhi,box[4])
             zhi = max(zhi,box[5])
@@ -1026,55 +972,89 @@ def normalize(a):
     a[2] /= length
 
 # --------------------------------------------------------------------
-# return bounding box of points
+# return bounding box of N x 3 array of points
 
 def bbox(points):
-    xlo = ylo = zlo = BIG
-    xhi = yhi = zhi = -BIG
-    for pt in points:
-        xlo = min(xlo,pt[0])
-        ylo = min(ylo,pt[1])
-        zlo = min(zlo,pt[2])
-        xhi = max(xhi,pt[0])
-        yhi = max(yhi,pt[1])
-        zhi = max(zhi,pt[2])
-    return (xlo,ylo,zlo,xhi,yhi,zhi)
+    if not len(points): return (BIG,BIG,BIG,-BIG,-BIG,-BIG)
+    lo = points.min(axis=0)
+    hi = points.max(axis=0)
+    return (float(lo[0]),float(lo[1]),float(lo[2]),
+            float(hi[0]),float(hi[1]),float(hi[2]))
 
 # --------------------------------------------------------------------
-# add a vertex v to vertices list unless already exists in vdict dictionary
-# return index of where v is in vertices list
+# concatenate points,lines,triangles of list of surfs into 3 arrays
+# line and triangle indices are offset by # of points in previous surfs
+
+def concatenate(surfs):
+    offsets = np.cumsum([0] + [len(surf.points) for surf in surfs[:-1]])
+    points = np.concatenate([np.zeros((0,3))] + [surf.points for surf in surfs])
+    lines = np.concatenate([np.zeros((0,2),dtype=np.int64)] +
+                           [surf.lines + offsets[i] for i,surf in enumerate(surfs)])
+    triangles = np.concatenate([np.zeros((0,3),dtype=np.int64)] +
+                               [surf.triangles + offsets[i]
+                                for i,surf in enumerate(surfs)])
+    return points,lines,triangles
 
-def vertex(v,vertices,vdict):
-    if v in vdict: return vdict[v]
-    n = len(vertices)
-    vertices.append(v)
-    vdict[v] = n
-    return n
+# --------------------------------------------------------------------
+# return 1 if surf_arrays() cache key old matches new key
+# surfs and their arrays must be the same objects, select flags equal
+
+def same(old,new):
+    if len(old) != len(new) or old[0] != new[0]: return 0
+    for a,b in zip(old[1:],new[1:]):
+        if a[0] != b[0]: return 0
+        for x,y in zip(a[1:],b[1:]):
+            if x is not y: return 0
+    return 1
 
 # --------------------------------------------------------------------
-# compute normal for a triangle with 3 vertices
+# template of sub-lines of a parent cell with Nx,Ny,Nz = n, in order drawn
+# return k,top = nline x 2 x 3 arrays, for 2 end points of each line
+#   coord of end point = lo + k*(hi-lo)/n, or hi where top is set
+# 2d: lines of constant x, then constant y
+# 3d: lines along x, y, z, each looping over other 2 dims, outer one 1st
+
+def sublines(n,dim):
+    if dim == 2: families = [(1,(0,)),(0,(1,))]
+    else: families = [(0,(1,2)),(1,(0,2)),(2,(0,1))]
+    ks = []
+    tops = []
+    for span,others in families:
+        grids = np.meshgrid(*[np.arange(n[i]+1) for i in others],indexing="ij")
+        k = np.zeros((grids[0].size,2,3),dtype=np.int64)
+        for i,grid in zip(others,grids): k[:,:,i] = grid.reshape(-1,1)
+        top = np.zeros(k.shape,dtype=bool)
+        top[:,1,span] = True
+        ks.append(k)
+        tops.append(top)
+    return np.concatenate(ks),np.concatenate(tops)
 
-def normal(x,y,z):
-    v1 = 3*[0]
-    v1[0] = y[0] - x[0]
-    v1[1] = y[1] - x[1]
-    v1[2] = y[2] - x[2]
+# --------------------------------------------------------------------
+# read n lines of "index values ..." from open file
+# return n x ncol array of values, index is dropped
 
-    v2 = 3*[0]
-    v2[0] = z[0] - y[0]
-    v2[1] = z[1] - y[1]
-    v2[2] = z[2] - y[2]
+def read_rows(f,n,ncol,dtype):
+    rows = [f.readline().split()[1:] for i in range(n)]
+    return np.array(rows,dtype=dtype).reshape(n,ncol)
 
-    n = 3*[0]
-    n[0] = v1[1]*v2[2] - v1[2]*v2[1]
-    n[1] = v1[2]*v2[0] - v1[0]*v2[2]
-    n[2] = v1[0]*v2[1] - v1[1]*v2[0]
+# --------------------------------------------------------------------
+# write rows of 2d array to open file, prepended by index (1-N)
+# fmt is applied to each value of a row, %r gives same text as print()
 
-    length = sqrt(n[0]*n[0] + n[1]*n[1] + n[2]*n[2])
-    n[0] /= length
-    n[1] /= length
-    n[2] /= length
+def write_rows(f,array,fmt):
+    line = "%d" + array.shape[1]*(" " + fmt) + "\n"
+    f.writelines([line % ((i+1,) + tuple(row))
+                  for i,row in enumerate(array.tolist())])
 
+# --------------------------------------------------------------------
+# add a vertex v to vertices list unless already exists in vdict dictionary
+# return index of where v is in vertices list
+
+def vertex(v,vertices,vdict):
+    if v in vdict: return vdict[v]
+    n = len(vertices)
+    vertices.append(v)
+    vdict[v] = n
     return n
 
 # --------------------------------------------------------------------
@@ -1159,6 +1139,12 @@ def box_triangulate(q1,q2,q3):
 
 # Surface class
 
+# points = N x 3 array of coords, z = 0.0 for 2d
+# lines = Nline x 2 array of point indices (0-N)
+# triangles = Ntri x 3 array of point indices (0-N)
+
 class Surface:
     def __init__(self):
-        pass
+        self.points = np.zeros((0,3))
+        self.lines = np.zeros((0,2),dtype=np.int64)
+        self.triangles = np.zeros((0,3),dtype=np.int64)
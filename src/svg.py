@@ -113,8 +113,10 @@ s.thick = 2.0               pixel thickness of black atom border
 # Imports and external programs
 
 import sys, os, subprocess, re
+import numpy as np
+import vizarray
 from vizinfo import vizinfo
-from math import sqrt,atan,cos,sin,fabs
+from math import atan,cos,sin
 
 try: from DEFAULTS import PIZZA_DISPLAY
 except: PIZZA_DISPLAY = "display"
@@ -196,7 +198,7 @@ class svg:
     def show(self,ntime):
         data = self.data
         which = data.findtime(ntime)
-        time,box,atoms,bonds,tris,lines = data.viz(which)
+        time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(data,which)
         if self.boxflag == 2: box = data.maxbox()
         self.distance = compute_distance(box)
 
@@ -251,7 +253,7 @@ class svg:
                 if self.select != "":
                     newstr = self.select % fraction
                     data.aselect.test(newstr,time)
-                time,boxone,atoms,bonds,tris,lines = data.viz(which)
+                time,boxone,atoms,bonds,tris,lines = vizarray.viz_arrays(data,which)
 
                 if self.boxflag < 2: box = boxone
                 if n == nstart: self.distance = compute_distance(box)
@@ -293,7 +295,7 @@ class svg:
                 if self.select != "":
                     newstr = self.select % fraction
                     data.aselect.test(newstr,ntime)
-                time,boxone,atoms,bonds,tris,lines = data.viz(which)
+                time,boxone,atoms,bonds,tris,lines = vizarray.viz_arrays(data,which)
 
                 if self.boxflag < 2: box = boxone
                 if n == nstart: self.distance = compute_distance(box)
@@ -348,54 +350,32 @@ class svg:
             self.offsetx = matrix[0]*xctr + matrix[3]*yctr + matrix[6]*zctr
             self.offsety = matrix[1]*xctr + matrix[4]*yctr + matrix[7]*zctr
 
+        # rotate all objects of each kind at once, then convert to olist
+
+        rotate = np.array(matrix).reshape(3,3)
         olist = []
 
-        for atom in atoms:
-            atom[0] = 0
-            newatom = self.transform(atom,matrix)
-            olist.append(newatom)
+        olist += svg_objects(0,atoms[:,1],atoms[:,2:5],rotate)
+        olist += svg_objects(1,tris[:,1],tris[:,2:11],rotate)
 
-        for tri in tris:
-            tri[0] = 1
-            newtri = self.transform(tri,matrix)
-            olist.append(newtri)
+        # cut off each side of bond by radius of atom at that end
 
         bound = 0.25 * self.distance
-        for bond in bonds:
-            newbond = [2,bond[1]]
-            dx = bond[5] - bond[2]
-            dy = bond[6] - bond[3]
-            dz = bond[7] - bond[4]
-            r = sqrt(dx*dx+dy*dy+dz*dz)
-            if not r: r = 1
-            rad = self.vizinfo.arad[int(bond[9])]
-            newbond.append(bond[2] + (r/r - rad/r) * dx)
-            newbond.append(bond[3] + (r/r - rad/r) * dy)
-            newbond.append(bond[4] + (r/r - rad/r) * dz)
-
-            # cut off second side of bond
-
-            dx = bond[2] - bond[5]
-            dy = bond[3] - bond[6]
-            dz = bond[4] - bond[7]
-            r  = sqrt(dx*dx+dy*dy+dz*dz)
-            if not r: r = 1
-            rad = self.vizinfo.arad[int(bond[8])]
-            newbond.append(bond[5] + (r/r - rad/r) * dx)
-            newbond.append(bond[6] + (r/r - rad/r) * dy)
-            newbond.append(bond[7] + (r/r - rad/r) * dz)
-
-            if fabs(newbond[2]-newbond[5]) > bound or \
-                   fabs(newbond[3]-newbond[6]) > bound: continue
-
-            newbond = self.transform(newbond,matrix)
+        arad = np.array(self.vizinfo.arad,dtype=np.float64)
+        delta = bonds[:,5:8] - bonds[:,2:5]
+        r = np.sqrt((delta*delta).sum(axis=1))
+        r[r == 0.0] = 1.0
+        end1 = bonds[:,2:5] + (1.0 - arad[bonds[:,9].astype(int)]/r)[:,None] * delta
+        end2 = bonds[:,5:8] - (1.0 - arad[bonds[:,8].astype(int)]/r)[:,None] * delta
+        keep = (np.fabs(end1[:,0]-end2[:,0]) <= bound) & \
+            (np.fabs(end1[:,1]-end2[:,1]) <= bound)
+        newbonds = svg_objects(2,bonds[keep,1],
+                               np.column_stack((end1,end2))[keep],rotate)
+        for newbond in newbonds:
             if newbond[4] < newbond[7]: newbond[4] = newbond[7]
-            olist.append(newbond)
+        olist += newbonds
 
-        for line in lines:
-            line[0] = 3
-            newline = self.transform(line,matrix)
-            olist.append(newline)
+        olist += svg_objects(3,lines[:,1],lines[:,2:8],rotate)
 
         if self.boxflag:
             x1,y1,z1 = box[0],box[1],box[2]
@@ -629,6 +609,16 @@ class svg:
     def lrad(self,ltypes,radii):
         self.vizinfo.setradii("line",ltypes,radii)
 
+# --------------------------------------------------------------------
+# return list of svg objects [kind,type,x1,y1,z1,...] of one kind
+# coords = N x 3M array of M points per object, rotated by 3x3 rotate
+
+def svg_objects(kind,types,coords,rotate):
+    n = len(coords)
+    if not n: return []
+    points = np.dot(coords.reshape(-1,3),rotate).reshape(n,-1)
+    return np.column_stack((np.full(n,kind),types,points)).tolist()
+
 # --------------------------------------------------------------------
 # compare function for the sort method, orders according to z coordinate
 
@@ -17,6 +17,9 @@ t = tdump("dump.*")               wildcard expands to multiple files
 t = tdump("dump.*",0)             two args = store filenames, but don't read
 
   incomplete and duplicate snapshots are deleted
+  atoms of a snapshot are read from its file when first used,
+    so files should not be changed while t exists (except gzipped ones)
+    a non-number in a row after the 1st is only found then, error names snapshot
   no column name assignment is performed
 
 time = t.next()                   read next snapshot from dump files
@@ -32,6 +35,7 @@ t.map(1,"id",3,"x")               assign names to atom columns (1-N)
   must assign id,type,corner1x,corner1y,corner1z,corner2x,corner2y,corner2z,corner3x,corner3y,corner3z
 
 time,box,atoms,bonds,tris,lines = t.viz(index)   return list of viz objects
+time,box,atoms,bonds,tris,lines = t.viz_arrays(index)   return 2d arrays
 
   viz() returns line info for specified timestep index
     can also call as viz(time,1) and will find index of preceding snapshot
@@ -42,6 +46,7 @@ time,box,atoms,bonds,tris,lines = t.viz(index)   return list of viz objects
     tris = id,type,x1,y1,z1,x2,y2,z2,x3,y3,z3 for each tri as 2d array
       id,type are from associated atom
     lines = NULL
+  viz_arrays() returns same info as 2d NumPy arrays, no rows for NULL
 
 t.owrap(...)                      wrap tris to same image as their atoms
 
@@ -51,6 +56,8 @@ t.owrap(...)                      wrap tris to same image as their atoms
 
 # History
 #   4/11, Steve Plimpton (SNL): original version
+#   10/26, snapshots read via dumpread, atoms parsed in bulk on 1st use
+#   10/26, viz() and owrap() done as column operations on atoms array
 
 # Variables
 #   flist = list of dump file names
@@ -70,8 +77,6 @@ t.owrap(...)                      wrap tris to same image as their atoms
 # Imports and external programs
 
 import sys, subprocess, re, glob, types
-from math import sqrt
-from os import popen
 
 try:
     import numpy as np
@@ -80,8 +85,7 @@ except:
     import Numeric as np
     oldnumeric = True
 
-try: from DEFAULTS import PIZZA_GUNZIP
-except: PIZZA_GUNZIP = "gunzip"
+import vizarray, dumpread
 
 # Class definition
 
@@ -115,27 +119,18 @@ class tdump:
     def read_all(self):
 
         # read all snapshots from each file
-        # test for gzipped files
+        # atoms of each snapshot are read on 1st use
 
         for file in self.flist:
-            if file[-3:] == ".gz":
-                f = popen("%s -c %s" % (PIZZA_GUNZIP,file),'r')
-            else: f = open(file)
-
-            snap = self.read_snapshot(f)
-            while snap:
+            for snap in dumpread.snapshots(file,Snap,self.read_header,1):
                 self.snaps.append(snap)
                 print(snap.time, end=' ')
                 sys.stdout.flush()
-                snap = self.read_snapshot(f)
-
-            f.close()
         print()
 
         # sort entries by timestep, cull duplicates
 
-        self.snaps.sort(self.compare_time)
-        self.cull()
+        dumpread.sort_cull(self.snaps)
         self.nsnaps = len(self.snaps)
         print("read %d snapshots" % self.nsnaps)
 
@@ -151,9 +146,9 @@ class tdump:
         # if new snapshot time stamp already exists, read next snapshot
 
         while 1:
-            f = open(self.flist[self.nextfile],'rb')
+            f = dumpread.open_file(self.flist[self.nextfile])
             f.seek(self.eof)
-            snap = self.read_snapshot(f)
+            snap = dumpread.read_snapshot(f,Snap(),self.read_header)
             if not snap:
                 self.nextfile += 1
                 if self.nextfile == len(self.flist): return -1
@@ -174,46 +169,23 @@ class tdump:
         return snap.time
 
     # --------------------------------------------------------------------
-    # read a single snapshot from file f
-    # return snapshot or 0 if failed
-
-    def read_snapshot(self,f):
-        try:
-            snap = Snap()
-            item = f.readline()
-            snap.time = int(f.readline().split()[0])    # just grab 1st field
-            item = f.readline()
-            snap.natoms = int(f.readline())
-
-            item = f.readline()
-            words = f.readline().split()
-            snap.xlo,snap.xhi = float(words[0]),float(words[1])
-            words = f.readline().split()
-            snap.ylo,snap.yhi = float(words[0]),float(words[1])
-            words = f.readline().split()
-            snap.zlo,snap.zhi = float(words[0]),float(words[1])
-
-            item = f.readline()
-
-            if snap.natoms:
-                words = f.readline().split()
-                ncol = len(words)
-                for i in range(1,snap.natoms):
-                    words += f.readline().split()
-                floats = list(map(float,words))
-                if oldnumeric: atoms = np.zeros((snap.natoms,ncol),np.Float)
-                else: atoms = np.zeros((snap.natoms,ncol),np.float)
-                start = 0
-                stop = ncol
-                for i in range(snap.natoms):
-                    atoms[i] = floats[start:stop]
-                    start = stop
-                    stop += ncol
-            else: atoms = None
-            snap.atoms = atoms
-            return snap
-        except:
-            return 0
+    # read header of a snapshot from file f, after its timestep
+    # return name of snap attribute for the atoms and # of atoms
+
+    def read_header(self,f,snap):
+        item = dumpread.readline(f)
+        snap.natoms = int(dumpread.readline(f))
+
+        item = dumpread.readline(f)
+        words = dumpread.readline(f).split()
+        snap.xlo,snap.xhi = float(words[0]),float(words[1])
+        words = dumpread.readline(f).split()
+        snap.ylo,snap.yhi = float(words[0]),float(words[1])
+        words = dumpread.readline(f).split()
+        snap.zlo,snap.zhi = float(words[0]),float(words[1])
+
+        item = dumpread.readline(f)
+        return "atoms",snap.natoms
 
     # --------------------------------------------------------------------
     # map atom column names
@@ -236,40 +208,25 @@ class tdump:
             i += 1
         return vec
 
-    # --------------------------------------------------------------------
-    # sort snapshots on time stamp
-
-    def compare_time(self,a,b):
-        if a.time < b.time:
-            return -1
-        elif a.time > b.time:
-            return 1
-        else:
-            return 0
-
     # --------------------------------------------------------------------
 
     def findtime(self,n):
-        for i in range(self.nsnaps):
-            if self.snaps[i].time == n: return i
-        raise Exception("no step %d exists" % n)
+        return dumpread.findtime(self,n)
 
     # --------------------------------------------------------------------
-    # delete successive snapshots with duplicate time stamp
-
-    def cull(self):
-        i = 1
-        while i < len(self.snaps):
-            if self.snaps[i].time == self.snaps[i-1].time:
-                del self.snaps[i]
-            else:
-                i += 1
+    # return list of tris to viz for snapshot isnap
+    # if called with flag, then index is timestep, so convert to snapshot index
+
+    def viz(self,index,flag=0):
+        time,box,atoms,bonds,tris,lines = self.viz_arrays(index,flag)
+        tris = tris.tolist()
+        return time,box,None,None,tris,None
 
     # --------------------------------------------------------------------
-    # return list of lines to viz for snapshot isnap
+    # return 2d array of tris to viz for snapshot isnap
     # if called with flag, then index is timestep, so convert to snapshot index
 
-    def viz(self,index,flag=0):
+    def viz_arrays(self,index,flag=0):
         if not flag: isnap = index
         else:
             times = self.time()
@@ -283,103 +240,51 @@ class tdump:
 
         time = snap.time
         box = [snap.xlo,snap.ylo,snap.zlo,snap.xhi,snap.yhi,snap.zhi]
-        id = self.names["id"]
-        type = self.names["type"]
-        corner1x = self.names["corner1x"]
-        corner1y = self.names["corner1y"]
-        corner1z = self.names["corner1z"]
-        corner2x = self.names["corner2x"]
-        corner2y = self.names["corner2y"]
-        corner2z = self.names["corner2z"]
-        corner3x = self.names["corner3x"]
-        corner3y = self.names["corner3y"]
-        corner3z = self.names["corner3z"]
-
-        # create trid list from id,type,corner1x,...corner3z
-        # don't add tri if all 4 values are 0 since not a line
-
-        tris = []
-        for i in range(snap.natoms):
-            atom = snap.atoms[i]
-            c1 = [atom[corner1x],atom[corner1y],atom[corner1z]]
-            c2 = [atom[corner2x],atom[corner2y],atom[corner2z]]
-            c3 = [atom[corner3x],atom[corner3y],atom[corner3z]]
-            n = normal(c1,c2,c3)
-            if c1[0] == 0.0 and c1[1] == 0.0 and c1[2] == 0.0 and \
-                    c2[0] == 0.0 and c2[1] == 0.0 and c2[2] == 0.0: continue
-            tris.append([atom[id],atom[type]] + c1 + c2 + c3 + n)
+        cols = [self.names["id"],self.names["type"],
+                self.names["corner1x"],self.names["corner1y"],self.names["corner1z"],
+                self.names["corner2x"],self.names["corner2y"],self.names["corner2z"],
+                self.names["corner3x"],self.names["corner3y"],self.names["corner3z"]]
 
-        return time,box,None,None,tris,None
+        # gather id,type,corners for all rows at once
+        # drop rows with 1st and 2nd corner = 0 since not a tri
+
+        if snap.natoms: tris = snap.atoms[:,cols]
+        else: tris = np.zeros((0,len(cols)))
+        tris = tris[np.any(tris[:,2:8] != 0.0,axis=1)]
+        n = vizarray.normals(tris[:,2:5],tris[:,5:8],tris[:,8:11])
+        tris = np.column_stack((tris,n))
+
+        return time,box,np.zeros((0,vizarray.NATOM)), \
+            np.zeros((0,vizarray.NBOND)),tris,np.zeros((0,vizarray.NLINE))
 
     # --------------------------------------------------------------------
     # wrap tri corner points associated with atoms thru periodic boundaries
     # invoked by dump() when it does an owrap() on its atoms
 
     def owrap(self,time,xprd,yprd,zprd,idsdump,atomsdump,iother,ix,iy,iz):
-        id = self.names["id"]
-        corner1x = self.names["corner1x"]
-        corner1y = self.names["corner1y"]
-        corner1z = self.names["corner1z"]
-        corner2x = self.names["corner2x"]
-        corner2y = self.names["corner2y"]
-        corner2z = self.names["corner2z"]
-        corner3x = self.names["corner3x"]
-        corner3y = self.names["corner3y"]
-        corner3z = self.names["corner3z"]
+        cols = [self.names["corner1x"],self.names["corner1y"],self.names["corner1z"],
+                self.names["corner2x"],self.names["corner2y"],self.names["corner2z"],
+                self.names["corner3x"],self.names["corner3y"],self.names["corner3z"]]
 
         isnap = self.findtime(time)
         snap = self.snaps[isnap]
+        if not snap.natoms: return
         atoms = snap.atoms
 
-        # idump = index of my line I in dump's atoms
+        # idump = index of my tri I in dump's atoms, via idsdump = dump's IDs
         # jdump = atom J in dump's atoms that atom I was owrapped on
-        # delx,dely = offset applied to atom I and thus to line I
-
-        for i in range(snap.natoms):
-            tag = atoms[i][id]
-            idump = idsdump[tag]
-            jdump = idsdump[atomsdump[idump][iother]]
-            delx = (atomsdump[idump][ix]-atomsdump[jdump][ix])*xprd
-            dely = (atomsdump[idump][iy]-atomsdump[jdump][iy])*yprd
-            delz = (atomsdump[idump][iz]-atomsdump[jdump][iz])*zprd
-            atoms[i][corner1x] += delx
-            atoms[i][corner1y] += dely
-            atoms[i][corner1z] += delz
-            atoms[i][corner2x] += delx
-            atoms[i][corner2y] += dely
-            atoms[i][corner2z] += delz
-            atoms[i][corner3x] += delx
-            atoms[i][corner3y] += dely
-            atoms[i][corner3z] += delz
+        # delta = x,y,z offset applied to atom I and thus to all corners of tri I
+
+        idump,found = vizarray.lookup(idsdump,atoms[:,self.names["id"]])
+        if not found.all(): raise Exception("tdump owrap() tri ID not in dump")
+        jdump = vizarray.lookup(idsdump,atomsdump[idump,iother])[0]
+        image = atomsdump[:,[ix,iy,iz]]
+        delta = (image[idump] - image[jdump])*[xprd,yprd,zprd]
+        atoms[:,cols] += np.tile(delta,3)
 
 # --------------------------------------------------------------------
 # one snapshot
 
 class Snap:
-    pass
-
-# --------------------------------------------------------------------
-# compute normal for a triangle with 3 vertices
-
-def normal(x,y,z):
-    v1 = 3*[0]
-    v1[0] = y[0] - x[0]
-    v1[1] = y[1] - x[1]
-    v1[2] = y[2] - x[2]
-
-    v2 = 3*[0]
-    v2[0] = z[0] - y[0]
-    v2[1] = z[1] - y[1]
-    v2[2] = z[2] - y[2]
-
-    n = 3*[0]
-    n[0] = v1[1]*v2[2] - v1[2]*v2[1]
-    n[1] = v1[2]*v2[0] - v1[0]*v2[2]
-    n[2] = v1[0]*v2[1] - v1[1]*v2[0]
-
-    length = sqrt(n[0]*n[0] + n[1]*n[1] + n[2]*n[2])
-    n[0] /= length
-    n[1] /= length
-    n[2] /= length
-
-    return n
+    def __getattr__(self,name):
+        return dumpread.load(self,name)
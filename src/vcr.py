@@ -44,6 +44,17 @@ v.clipyhi(1.0)
 v.clipzlo(0.2)             clip in z
 v.clipzhi(1.0)
 
+v.prefetch(8)              extract next 8 frames on a background thread
+v.prefetch(0)              turn off prefetching (default)
+
+  prefetch switches gl windows to on-demand frame loading (preload = 0)
+  frames ahead of current one in play/back direction are extracted in advance
+  prefetched frames are discarded when the frame is set elsewhere or reversed
+  a frame that fails to extract in the background raises its error
+    when it is displayed
+  view.fetch() of different frames may run on both threads at once,
+    never for the same frame
+
 v.save()                   save current scene to file.png
 v.file("image")            set filename
 v.saveall()                toggle save-all checkbox
@@ -52,6 +63,7 @@ v.saveall()                toggle save-all checkbox
 # History
 #   8/05, Matt Jones (BYU): original version
 #   9/05, Steve Plimpton: modified for GL viewer
+#   10/26: background prefetch of frames during play/back
 
 # ToDo list
 
@@ -63,11 +75,12 @@ v.saveall()                toggle save-all checkbox
 #               set to 0 when stop is pushed
 #   delay_value = delay between frames (secs)
 #   delay_msec = delay in millisec
+#   prefetcher = prefetch class that extracts frames ahead of display, or None
 
 # Imports and external programs
 
 from tkinter import *
-import types
+import types, threading
 
 # Class definition
 
@@ -84,6 +97,7 @@ class vcr:
         self.loop_flag = 0
         self.delay_value = 0.0
         self.delay_msec = 0
+        self.prefetcher = None
 
         # load data for each viewer
         # if each viewer has different data set, nframes is for 1st viewer
@@ -205,9 +219,28 @@ class vcr:
 
     def add(self,view):
         self.viewlist.append(view)
+        if self.prefetcher:
+            view.preload = 0
+            self.prefetcher.stop()
+            self.prefetcher = prefetch(self.viewlist,self.nframes,
+                                       self.prefetcher.depth)
         view.reload()
         view.display(self.index)
 
+    # --------------------------------------------------------------------
+    # turn on/off extraction of upcoming frames on a background thread
+
+    def prefetch(self,n):
+        if self.prefetcher:
+            self.prefetcher.stop()
+            self.prefetcher = None
+        for view in self.viewlist:
+            view.preload = not n
+            view.reload()
+        self.nframes = self.viewlist[0].nframes
+        if n: self.prefetcher = prefetch(self.viewlist,self.nframes,n)
+        self.display()
+
     # --------------------------------------------------------------------
 
     def first(self):
@@ -390,6 +423,7 @@ class vcr:
     # --------------------------------------------------------------------
 
     def reload(self):
+        if self.prefetcher: self.prefetcher.clear()
         for view in self.viewlist: view.reload()
         self.display()
 
@@ -503,8 +537,130 @@ class vcr:
     # --------------------------------------------------------------------
     # display index frame and set status strings
 
+    # use prefetched frames if available, then prefetch ahead of this one
+
     def display(self):
-        for view in self.viewlist: time,natoms = view.display(self.index)
+        if self.prefetcher:
+            frames = self.prefetcher.get(self.index)
+            for i,view in enumerate(self.viewlist):
+                time,natoms = view.display(self.index,frames and frames[i])
+            direction = self.loop_flag
+            if not direction: direction = 1
+            self.prefetcher.seek(self.index+direction,direction)
+        else:
+            for view in self.viewlist: time,natoms = view.display(self.index)
         self.label_frame.config(text="Frame: %d" % self.index)
         self.label_time.config(text="Time: %d" % time)
         self.label_atoms.config(text="Atoms: %d" % natoms)
+
+# --------------------------------------------------------------------
+# prefetch class
+# background thread extracts frames via each gl view's fetch()
+# frames held in a window of depth frames starting at start in direction
+# frames outside the window are discarded when seek() moves it
+# errors = exception of each frame in window whose extraction failed
+
+class prefetch:
+
+    def __init__(self,views,nframes,depth):
+        self.views = list(views)
+        self.nframes = nframes
+        self.depth = depth
+        self.start = 0
+        self.direction = 1
+        self.frames = {}
+        self.errors = {}
+        self.inflight = -1
+        self.done = 0
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    # --------------------------------------------------------------------
+    # list of frame indices in current window
+
+    def window(self):
+        indices = []
+        for i in range(self.depth):
+            index = self.start + i*self.direction
+            if index < 0 or index >= self.nframes: break
+            indices.append(index)
+        return indices
+
+    # --------------------------------------------------------------------
+    # move window to start at index, discard frames outside of it
+
+    def seek(self,index,direction):
+        with self.cond:
+            self.start = index
+            self.direction = direction
+            window = self.window()
+            for key in list(self.frames.keys()):
+                if key not in window: del self.frames[key]
+            for key in list(self.errors.keys()):
+                if key not in window: del self.errors[key]
+            self.cond.notify_all()
+
+    # --------------------------------------------------------------------
+    # return list of frames (one per view) for index and remove it
+    # wait if background thread is extracting it
+    # raise its error if extraction failed
+    # return None if not prefetched, caller extracts it
+    #   window moves past index so background thread does not extract it too
+
+    def get(self,index):
+        with self.cond:
+            while self.inflight == index: self.cond.wait()
+            if index in self.errors:
+                error = self.errors.pop(index)
+                raise Exception("prefetch of frame %d failed: %s" % \
+                                (index,error)) from error
+            frames = self.frames.pop(index,None)
+            if frames is None and index in self.window():
+                self.start = index + self.direction
+            return frames
+
+    # --------------------------------------------------------------------
+
+    def clear(self):
+        with self.cond:
+            self.frames = {}
+            self.errors = {}
+            self.cond.notify_all()
+
+    # --------------------------------------------------------------------
+
+    def stop(self):
+        with self.cond:
+            self.done = 1
+            self.frames = {}
+            self.cond.notify_all()
+
+    # --------------------------------------------------------------------
+    # thread loop: extract 1st frame in window not already held or failed
+
+    def run(self):
+        while 1:
+            with self.cond:
+                index = -1
+                while not self.done:
+                    for i in self.window():
+                        if i not in self.frames and i not in self.errors:
+                            index = i
+                            break
+                    if index >= 0: break
+                    self.cond.wait()
+                if self.done: return
+                self.inflight = index
+
+            error = None
+            try: frames = [view.fetch(index) for view in self.views]
+            except Exception as exception: error = exception
+
+            with self.cond:
+                self.inflight = -1
+                if index in self.window():
+                    if error: self.errors[index] = error
+                    else: self.frames[index] = frames
+                self.cond.notify_all()
@@ -0,0 +1,143 @@
+# Pizza.py toolkit, www.cs.sandia.gov/~sjplimp/pizza.html
+# Steve Plimpton, sjplimp@sandia.gov, Sandia National Laboratories
+#
+# Copyright (2005) Sandia Corporation.  Under the terms of Contract
+# DE-AC04-94AL85000 with Sandia Corporation, the U.S. Government retains
+# certain rights in this software.  This software is distributed under
+# the GNU General Public License.
+
+# vizarray functions, not a top-level Pizza.py tool
+
+# History
+#   10/26: original version
+
+# ToDo list
+
+# Variables
+#   NATOM,NBOND,NTRI,NLINE = # of columns in each kind of viz object
+#     atoms = id,type,x,y,z
+#     bonds = id,type,x1,y1,z1,x2,y2,z2,t1,t2
+#     tris = id,type,x1,y1,z1,x2,y2,z2,x3,y3,z3,nx,ny,nz
+#     lines = id,type,x1,y1,z1,x2,y2,z2
+
+# Imports and external programs
+
+import numpy as np
+
+NATOM = 5
+NBOND = 10
+NTRI = 14
+NLINE = 8
+
+# --------------------------------------------------------------------
+# return time,box,atoms,bonds,tris,lines for snapshot index of obj
+# atoms,bonds,tris,lines are 2d float arrays, one row per object
+# use obj.viz_arrays() if obj provides it, else convert lists from obj.viz()
+
+def viz_arrays(obj,index,flag=0):
+    if hasattr(obj,"viz_arrays"):
+        if flag: return obj.viz_arrays(index,flag)
+        return obj.viz_arrays(index)
+
+    if flag: time,box,atoms,bonds,tris,lines = obj.viz(index,flag)
+    else: time,box,atoms,bonds,tris,lines = obj.viz(index)
+    return time,box,array(atoms,NATOM),array(bonds,NBOND), \
+        array(tris,NTRI),array(lines,NLINE)
+
+# --------------------------------------------------------------------
+# convert list of viz objects to 2d float array
+# None or empty list becomes array with 0 rows and ncol columns
+
+def array(objs,ncol):
+    if objs is None or len(objs) == 0: return np.zeros((0,ncol))
+    if isinstance(objs,np.ndarray) and objs.ndim == 2: return objs
+    objs = np.array(objs,dtype=np.float64)
+    return objs.reshape(len(objs),-1)
+
+# --------------------------------------------------------------------
+# return list-of-lists version of viz arrays, as returned by viz()
+# empty arrays become empty lists
+
+def lists(*arrays):
+    out = []
+    for a in arrays:
+        if a is None: out.append(a)
+        else: out.append(a.tolist())
+    return out
+
+# --------------------------------------------------------------------
+# unit normals for triangles with corners c1,c2,c3, each an N x 3 array
+# same orientation as (c2-c1) x (c3-c2)
+# degenerate triangles get a zero normal
+
+def normals(c1,c2,c3):
+    n = np.cross(c2-c1,c3-c2)
+    length = np.sqrt((n*n).sum(axis=1))
+    nonzero = length > 0.0
+    n[nonzero] /= length[nonzero,None]
+    return n
+
+# --------------------------------------------------------------------
+# find rows of ids that hold each value in query
+# return index into ids and boolean mask of which query values were found
+
+def lookup(ids,query):
+    ids = np.asarray(ids)
+    query = np.asarray(query)
+    if len(ids) == 0:
+        return np.zeros(len(query),dtype=np.intp),np.zeros(len(query),dtype=bool)
+    order = np.argsort(ids,kind="stable")
+    pos = np.searchsorted(ids,query,sorter=order)
+    pos[pos == len(ids)] = 0
+    index = order[pos]
+    return index,ids[index] == query
+
+# --------------------------------------------------------------------
+# find edge neighbors of each triangle in a triangulated surface
+# triangles = N x 3 vertex indices, any base (0 for SPARTA, 1 for ChemCell)
+# return N x 6 int array, 2 values per edge (v1-v2, v2-v3, v3-v1):
+#   1-based index of lowest-numbered other triangle sharing the edge,
+#   which edge of that triangle it is (1,2,3), both 0 if no neighbor
+# edges are keyed by (min vertex, max vertex) and grouped with a sort
+
+def edge_connect(triangles):
+    tri = np.asarray(triangles,dtype=np.int64).reshape(-1,3)
+    ntri = len(tri)
+    connections = np.zeros((ntri,6),dtype=np.int64)
+    if ntri == 0: return connections
+
+    v1 = tri.ravel()
+    v2 = np.roll(tri,-1,axis=1).ravel()
+    lo = np.minimum(v1,v2)
+    hi = np.maximum(v1,v2)
+    base = lo.min()
+    lo -= base
+    hi -= base
+    key = lo*(hi.max()+1) + hi
+    owner = np.repeat(np.arange(ntri),3)
+    slot = np.tile(np.arange(3),ntri)
+
+    # sort edges by key, ties by triangle index
+    # first = start of each edge's run of equal keys
+
+    order = np.lexsort((owner,key))
+    key = key[order]
+    owner = owner[order]
+    slot = slot[order]
+    start = np.ones(len(key),dtype=bool)
+    start[1:] = key[1:] != key[:-1]
+    first = np.maximum.accumulate(np.where(start,np.arange(len(key)),0))
+
+    # neighbor = 1st triangle in run, or 2nd if the 1st is the edge's owner
+
+    other = first.copy()
+    other[owner[first] == owner] += 1
+    found = other < len(key)
+    found[found] = key[other[found]] == key[found]
+    found[found] = owner[other[found]] != owner[found]
+
+    itri = owner[found]
+    iedge = slot[found]
+    connections[itri,2*iedge] = owner[other[found]] + 1
+    connections[itri,2*iedge+1] = slot[other[found]] + 1
+    return connections
@@ -28,6 +28,14 @@ v.data(file[,atomstyle])       load new data file (default atom style 'full')
 v.replace(file[,type])         replace current frames with new file
 v.append(file[,type])          append file to current frame(s)
 v.set(snap,x,y,z,(True|False)) set coordinates from a pizza.py snapshot to new or current frame
+v.play(d)                      send each selected snapshot of d as a new frame
+v.play(d,False)                overwrite current frame with each snapshot in turn
+
+  snap = dump snapshot or 2d array, x,y,z = its coordinate columns
+    atoms are sent in the order of its rows
+  d = dump or other object with atom viz, atoms are sent in ID order
+    current molecule must have as many atoms, a new one is made if none
+  coordinates go through a temporary DCD file VMD reads in binary
 
 v.frame(frame)                 set current frame
 v.flush()                      flush pending input to VMD and update GUI
@@ -39,11 +47,16 @@ v.debug([True|False])          display generated VMD script commands?
 
 # History
 #   11/10, Axel Kohlmeyer (Temple U): original version
+#   10/26, coordinates sent as binary DCD file, added play()
+
+# Variables
+#   dcdfile = temporary file that holds frame set() or play() sends to VMD
 
 # Imports and external programs
 
-import types, os
+import sys, types, os, tempfile, struct
 import numpy
+import vizarray
 
 try: from DEFAULTS import PIZZA_VMDNAME
 except: PIZZA_VMDNAME = "vmd"
@@ -95,6 +108,9 @@ class vmd:
         # open pipe to vmd and wait until we have a prompt
         self.VMD = pexpect.spawn(self.vmdexe)
         self.VMD.expect('vmd >')
+        fd,self.dcdfile = tempfile.mkstemp(suffix=".dcd")
+        os.close(fd)
+        self.__call__(REPLACE)
 
     # --------------------------------------------------------------------
     # post command to vmd and wait until the prompt returns.
@@ -111,6 +127,7 @@ class vmd:
     def stop(self):
         self.__call__("quit")
         del self.VMD
+        if os.path.exists(self.dcdfile): os.remove(self.dcdfile)
 
     # --------------------------------------------------------------------
     # force VMD display and GUI update.
@@ -205,13 +222,74 @@ class vmd:
     # --------------------------------------------------------------------
     # add or overwrite coordinates with coordinates in a snapshot
     def set(self,snap,x,y,z,append=True):
-        self.__call__('set vmdsel [atomselect top all]')
-        if append:
-            self.__call__('animate dup [molinfo top]')
-        cmd = '$vmdsel set {x y z} {'
-        for idx in range(0,snap.natoms):
-            cmd += ' {'+str(snap[idx,x])+' '+str(snap[idx,y])+' '+str(snap[idx,z])+'}'
-        cmd += '}'
-        self.__call__(cmd)
-        self.__call__('$vmdsel delete ; unset vmdsel')
+        if hasattr(snap,"atoms"): snap = snap.atoms
+        snap = numpy.asarray(snap)
+        self.send(snap[:,[x,y,z]],None,append)
         self.flush()
+
+    # --------------------------------------------------------------------
+    # send atoms of each selected snapshot of d as a frame, sorted by ID
+    def play(self,d,append=True):
+        n = flag = 0
+        while 1:
+            which,time,flag = d.iterator(flag)
+            if flag == -1: break
+            time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(d,which)
+            atoms = atoms[numpy.argsort(atoms[:,0],kind="stable")]
+            self.send(atoms[:,2:5],box,append)
+            self.flush()
+            print(time, end=' ')
+            sys.stdout.flush()
+            n += 1
+        print("\nsent %d snapshots to VMD" % n)
+
+    # --------------------------------------------------------------------
+    # write one frame of N x 3 coords to dcdfile, have VMD read it
+    # append = add as new frame, else copy into current frame
+    def send(self,xyz,box,append):
+        write_dcd(self.dcdfile,xyz,box)
+        file = '{' + self.dcdfile + '}'
+        self.__call__('if {[molinfo num] == 0} {mol new atoms %d}' % len(xyz))
+        if append:
+            self.__call__('mol addfile ' + file + ' type dcd mol top waitfor all')
+        else:
+            self.__call__('pizza_replace ' + file)
+
+# --------------------------------------------------------------------
+# Tcl proc to overwrite current frame of top molecule with 1st frame of file
+# file is read as a new last frame, copied within VMD, then deleted
+
+REPLACE = 'proc pizza_replace {file} { ' \
+    'set cur [molinfo top get frame] ; ' \
+    'mol addfile $file type dcd mol top waitfor all ; ' \
+    'set last [expr {[molinfo top get numframes] - 1}] ; ' \
+    'if {$cur < 0 || $cur == $last} return ; ' \
+    'set src [atomselect top all frame $last] ; ' \
+    'set dst [atomselect top all frame $cur] ; ' \
+    '$dst set {x y z} [$src get {x y z}] ; ' \
+    '$src delete ; $dst delete ; ' \
+    'animate delete beg $last end $last top ; animate goto $cur }'
+
+# --------------------------------------------------------------------
+# write N x 3 coords as a single frame CHARMM-style DCD file
+# box = xlo,ylo,zlo,xhi,yhi,zhi stored as unit cell, None for no cell
+
+def write_dcd(file,xyz,box=None):
+    xyz = numpy.asarray(xyz,dtype="<f4")
+    n = len(xyz)
+    icntrl = [1,0,1] + 6*[0] + [0] + [box is not None] + 8*[0] + [24]
+
+    f = open(file,'wb')
+    f.write(struct.pack("<i4s9if10ii",84,b"CORD",*icntrl[:9],0.0,*icntrl[10:],84))
+    title = b"Pizza.py vmd tool".ljust(80)
+    f.write(struct.pack("<ii80si",84,1,title,84))
+    f.write(struct.pack("<iii",4,n,4))
+    if box is not None:
+        xlo,ylo,zlo,xhi,yhi,zhi = box
+        f.write(struct.pack("<i6di",48,xhi-xlo,90.0,yhi-ylo,90.0,90.0,zhi-zlo,48))
+    marker = struct.pack("<i",4*n)
+    for i in range(3):
+        f.write(marker)
+        f.write(numpy.ascontiguousarray(xyz[:,i]).tobytes())
+        f.write(marker)
+    f.close()
@@ -35,6 +35,8 @@ v.single(N,"file")      write snapshot for timestep N to file.vtk
 # Imports and external programs
 
 import sys
+import numpy as np
+import vizarray
 
 # Class definition
 
@@ -54,27 +56,25 @@ class vtk:
 
         n = flag = 0
         which,time,flag = self.data.iterator(flag)
-        time,box,atoms,bonds,tris,lines = self.data.viz(which)
+        time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(self.data,which)
         print(time, end=' ')
         sys.stdout.flush()
 
         if len(tris): surface(tris)
 
-        allatoms = []
-        for atom in atoms:
-            allatoms.append(atom)
+        allatoms = [atoms]
 
         while 1:
             which,time,flag = self.data.iterator(flag)
             if flag == -1: break
-            time,box,atoms,bonds,tris,lines = self.data.viz(which)
+            time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(self.data,which)
 
-            for atom in atoms: allatoms.append(atom)
+            allatoms.append(atoms)
             print(time, end=' ')
             sys.stdout.flush()
             n += 1
 
-        particle(file,allatoms)
+        particle(file,np.concatenate(allatoms))
         print("\nwrote %d snapshots to %s in VTK format" % (n,file))
 
     # --------------------------------------------------------------------
@@ -88,7 +88,7 @@ class vtk:
         while 1:
             which,time,flag = self.data.iterator(flag)
             if flag == -1: break
-            time,box,atoms,bonds,tris,lines = self.data.viz(which)
+            time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(self.data,which)
 
             if surfflag == 0 and len(tris):
                 surfflag = 1
@@ -119,42 +119,31 @@ class vtk:
         else: file = args[0] + ".vtk"
 
         which = self.data.findtime(time)
-        time,box,atoms,bonds,tris,lines = self.data.viz(which)
+        time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(self.data,which)
         if len(tris): surface(tris)
         particle(file,atoms)
 
 # --------------------------------------------------------------------
-# write list of triangles into VTK surface files: SURF1.vtk, SURF2.vtk, ...
+# write array of triangles into VTK surface files: SURF1.vtk, SURF2.vtk, ...
 # all triangles of one type constitute 1 surface = 1 file
-# create list of unique vertices (via dictionary) from triangle list
+# create array of unique vertices (via np.unique) from triangle array
+# vertices are numbered in order of first appearance
 
 def surface(tris):
-    ntypes = tris[-1][1]
+    ntypes = int(tris[-1][1])
 
     for i in range(ntypes):
         itype = i+1
-        v = {}
-        nvert = ntri = 0
-        for tri in tris:
-            if tri[1] == itype:
-                ntri += 1
-                vert = (tri[2],tri[3],tri[4])
-                if vert not in v:
-                    v[vert] = nvert
-                    nvert += 1
-                vert = (tri[5],tri[6],tri[7])
-                if vert not in v:
-                    v[vert] = nvert
-                    nvert += 1
-                vert = (tri[8],tri[9],tri[10])
-                if vert not in v:
-                    v[vert] = nvert
-                    nvert += 1
-
-        keys = list(v.keys())
-        vinverse = {}
-        for key in keys:
-            vinverse[v[key]] = key
+        corners = tris[tris[:,1] == itype][:,2:11].reshape(-1,3)
+        ntri = len(corners) // 3
+        unique,first,inverse = np.unique(corners,axis=0,return_index=True,
+                                         return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty(len(order),dtype=int)
+        rank[order] = np.arange(len(order))
+        verts = unique[order]
+        ivert = rank[inverse.reshape(-1)].reshape(ntri,3)
+        nvert = len(verts)
 
         filename = "SURF" + str(itype) + ".vtk"
         f = open(filename,"w")
@@ -164,19 +153,11 @@ def surface(tris):
         print("ASCII", file=f)
         print("DATASET POLYDATA", file=f)
         print("POINTS %d float" % nvert, file=f)
-        for i in range(nvert):
-            tuple = vinverse[i]
-            print(tuple[0],tuple[1],tuple[2], file=f)
+        for vert in verts.tolist():
+            print(vert[0],vert[1],vert[2], file=f)
         print("POLYGONS",ntri,4*ntri, file=f)
-        for tri in tris:
-            if tri[1] == itype:
-                vert = (tri[2],tri[3],tri[4])
-                ivert1 = v[vert]
-                vert = (tri[5],tri[6],tri[7])
-                ivert2 = v[vert]
-                vert = (tri[8],tri[9],tri[10])
-                ivert3 = v[vert]
-                print(3,ivert1,ivert2,ivert3, file=f)
+        for ivert1,ivert2,ivert3 in ivert.tolist():
+            print(3,ivert1,ivert2,ivert3, file=f)
         print(file=f)
         print("CELL_DATA",ntri, file=f)
         print("POINT_DATA",nvert, file=f)
@@ -194,7 +175,7 @@ def particle(file,atoms):
     print("ASCII", file=f)
     print("DATASET POLYDATA", file=f)
     print("POINTS %d float" % len(atoms), file=f)
-    for atom in atoms:
+    for atom in atoms.tolist():
         print(atom[2],atom[3],atom[4], file=f)
     print("VERTICES",len(atoms),2*len(atoms), file=f)
     for i in range(len(atoms)):
@@ -202,8 +183,7 @@ def particle(file,atoms):
     print("POINT_DATA",len(atoms), file=f)
     print("SCALARS atom_type int 1", file=f)
     print("LOOKUP_TABLE default", file=f)
-    for atom in atoms:
-        itype = int(atom[1])
+    for itype in atoms[:,1].astype(int).tolist():
         print(itype, end=' ', file=f)
     print(file=f)
 
@@ -32,6 +32,7 @@ x.single(N,"file")      write snapshot for timestep N to file.xyz
 # Imports and external programs
 
 import sys
+import vizarray
 
 # Class definition
 
@@ -54,13 +55,9 @@ class xyz:
         while 1:
             which,time,flag = self.data.iterator(flag)
             if flag == -1: break
-            time,box,atoms,bonds,tris,lines = self.data.viz(which)
+            time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(self.data,which)
 
-            print(len(atoms), file=f)
-            print("Atoms", file=f)
-            for atom in atoms:
-                itype = int(atom[1])
-                print(itype,atom[2],atom[3],atom[4], file=f)
+            write_atoms(f,atoms)
 
             print(time, end=' ')
             sys.stdout.flush()
@@ -79,7 +76,7 @@ class xyz:
         while 1:
             which,time,flag = self.data.iterator(flag)
             if flag == -1: break
-            time,box,atoms,bonds,tris,lines = self.data.viz(which)
+            time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(self.data,which)
 
             if n < 10:
                 file = root + "000" + str(n)
@@ -91,11 +88,7 @@ class xyz:
                 file = root + str(n)
             file += ".xyz"
             f = open(file,"w")
-            print(len(atoms), file=f)
-            print("Atoms", file=f)
-            for atom in atoms:
-                itype = int(atom[1])
-                print(itype,atom[2],atom[3],atom[4], file=f)
+            write_atoms(f,atoms)
             print(time, end=' ')
             sys.stdout.flush()
             f.close()
@@ -111,11 +104,16 @@ class xyz:
         else: file = args[0] + ".xyz"
 
         which = self.data.findtime(time)
-        time,box,atoms,bonds,tris,lines = self.data.viz(which)
+        time,box,atoms,bonds,tris,lines = vizarray.viz_arrays(self.data,which)
         f = open(file,"w")
-        print(len(atoms), file=f)
-        print("Atoms", file=f)
-        for atom in atoms:
-            itype = int(atom[1])
-            print(itype,atom[2],atom[3],atom[4], file=f)
+        write_atoms(f,atoms)
         f.close()
+
+# --------------------------------------------------------------------
+# write one snapshot of atoms from viz array to open file in XYZ format
+
+def write_atoms(f,atoms):
+    lines = ["%d %s %s %s\n" % (atom[1],atom[2],atom[3],atom[4])
+             for atom in atoms.tolist()]
+    f.write("%d\nAtoms\n" % len(atoms))
+    f.write("".join(lines))